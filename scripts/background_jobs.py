@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Фоновые задачи для интерактивных скриптов (экспорт, отчеты).
+
+Задача выполняется в пуле потоков и сама сообщает прогресс (сколько записей
+обработано из скольких); интерфейс в это время продолжает принимать команды
+и показывает состояние задач строкой с индикатором.
+
+Пример:
+    jobs = JobRunner()
+
+    def export(job, clients):
+        for done, client in enumerate(clients, 1):
+            ...
+            job.advance(done)
+        return {"Записей": done}
+
+    jobs.submit("Экспорт в CSV", export, clients, total=len(clients))
+    for job in jobs.jobs:
+        print(job.status_line())
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+PROGRESS_WIDTH = 20
+
+
+def progress_bar(done, total, width=PROGRESS_WIDTH):
+    """Текстовый индикатор вида [#######.............]."""
+    filled = width if not total else min(width, done * width // total)
+    return "[" + "#" * filled + "." * (width - filled) + "]"
+
+
+class Job:
+    """
+    Фоновая задача: прогресс, время выполнения и результат.
+
+    Функция задачи получает Job первым аргументом и вызывает advance(done)
+    по мере работы; ее результат (словарь «подпись: значение») и ошибка
+    сохраняются в result и error.
+    """
+
+    def __init__(self, title, total=None):
+        self.title = title
+        self.total = total
+        self.done = 0
+        self.state = RUNNING
+        self.result = None
+        self.error = None
+        self.started = time.perf_counter()
+        self.finished = None
+        self.future = None
+
+    def advance(self, done, total=None):
+        """Сообщает прогресс (обработано done из total)."""
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def running(self):
+        return self.state == RUNNING
+
+    def _run(self, func, args, kwargs):
+        try:
+            self.result = func(self, *args, **kwargs)
+            state = DONE
+        except Exception as e:
+            self.error = e
+            state = FAILED
+        # Состояние меняется последним: интерфейс читает его из другого потока
+        self.finished = time.perf_counter()
+        self.state = state
+
+    def status_line(self):
+        """Одна строка состояния для экрана."""
+        if self.state == FAILED:
+            return f"  [ERROR] {self.title}: {self.error}"
+        if self.state == DONE:
+            return f"  [OK] {self.title} — готово за {self.elapsed:.1f} с"
+        if self.total:
+            percent = 100 * self.done // self.total
+            return (f"  {progress_bar(self.done, self.total)} {percent:>3}% {self.title} "
+                    f"({self.done:,}/{self.total:,}, {self.elapsed:.1f} с)")
+        return f"  [...] {self.title} ({self.done:,}, {self.elapsed:.1f} с)"
+
+
+class JobRunner:
+    """Пул потоков для фоновых задач и список запущенных задач."""
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.jobs = []
+
+    def submit(self, title, func, *args, total=None, **kwargs):
+        """Запускает func(job, *args, **kwargs) в фоне; возвращает Job."""
+        job = Job(title, total)
+        job.future = self._executor.submit(job._run, func, args, kwargs)
+        self.jobs.append(job)
+        return job
+
+    @property
+    def active(self):
+        return [job for job in self.jobs if job.running]
+
+    def pop_finished(self):
+        """Забирает завершенные задачи из списка (для показа результатов)."""
+        finished = [job for job in self.jobs if not job.running]
+        self.jobs = [job for job in self.jobs if job.running]
+        return finished
+
+    def wait(self, timeout=None, on_progress=None, interval=0.2):
+        """
+        Ждет завершения всех задач; on_progress(jobs) вызывается каждые interval секунд.
+        Возвращает True, если все задачи завершились до timeout.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            active = self.active
+            if not active:
+                return True
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            if on_progress is not None:
+                on_progress(active)
+            wait_futures([job.future for job in active], timeout=interval)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк расчета health score и обработки портфеля.
+
+Генерирует синтетический портфель (от 10^3 до 10^7 клиентов, реалистичные
+распределения, пропуски NPS), замеряет время и пиковую память для
+поштучного, пакетного, потокового и параллельного расчета и сохраняет
+результаты в JSON, чтобы регрессии между версиями были видны сразу.
+
+Каждый замер выполняется в отдельном процессе — пиковая память (RSS)
+одного сценария не влияет на другие.
+
+Примеры запуска:
+    python benchmark.py                                  # 10^3, 10^4, 10^5
+    python benchmark.py --sizes 1e3,1e6 --workers 4 -o bench_v2.json
+    python benchmark.py --compare bench_v1.json          # сравнить с прошлым запуском
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import cs_score_calculator as calc
+
+try:
+    import numpy as np
+except ImportError:  # Без NumPy пакетный расчет замеряется только на чистом Python
+    np = None
+
+SEGMENTS = ("Startup", "Business", "Enterprise")
+SEGMENT_WEIGHTS = (0.5, 0.35, 0.15)
+
+# Сценарии: имя -> (функция, максимальный размер по умолчанию; None — без ограничения).
+# Функция либо выполняет замер сама (клиенты генерируются потоково, и генерация
+# входит во время — см. сценарий generate), либо готовит данные и возвращает
+# функцию для замера, либо возвращает False, если сценарий недоступен.
+CASES = {}
+
+
+def benchmark_case(name, max_size=None):
+    """Регистрирует сценарий бенчмарка."""
+    def register(func):
+        CASES[name] = (func, max_size)
+        return func
+    return register
+
+
+# =================== СИНТЕТИЧЕСКИЙ ПОРТФЕЛЬ ===================
+def iter_clients(n, seed=42, nps_missing=0.3):
+    """
+    Лениво генерирует n клиентов с реалистичными распределениями.
+
+    Логины и MRR — логнормальные, число функций — гамма, дни с оплаты —
+    экспоненциальные (большинство платит ежемесячно, есть "хвост" должников),
+    NPS смещен в положительную сторону и пропущен у доли nps_missing клиентов.
+    """
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "id": i + 1,
+            "name": f"Клиент {i + 1}",
+            "type": rng.choices(SEGMENTS, SEGMENT_WEIGHTS)[0],
+            "logins": int(rng.lognormvariate(2.3, 0.8)),
+            "features": min(int(rng.gammavariate(2.0, 2.5)), 30),
+            "days_payment": int(rng.expovariate(1 / 35)),
+            "nps": None if rng.random() < nps_missing else round(rng.triangular(-10, 10, 7)),
+            "mrr": round(rng.lognormvariate(10.5, 0.9), -2),
+        }
+
+
+def generate_columns(n, seed=42, nps_missing=0.3):
+    """Тот же портфель в колоночном виде (NumPy-генератор, если библиотека есть)."""
+    if np is None:
+        columns = {field: [] for field in calc.INPUT_FIELDS}
+        for client in iter_clients(n, seed, nps_missing):
+            for field in calc.INPUT_FIELDS:
+                columns[field].append(client[field])
+        return columns
+    rng = np.random.default_rng(seed)
+    missing = rng.random(n) < nps_missing
+    return {
+        "logins": rng.lognormal(2.3, 0.8, n).astype(np.int64),
+        "features": np.minimum(rng.gamma(2.0, 2.5, n).astype(np.int64), 30),
+        "days_payment": rng.exponential(35, n).astype(np.int64),
+        "nps": np.where(missing, 0, np.round(rng.triangular(-10, 7, 10, n))),
+        "nps_missing": missing,
+    }
+
+
+def write_portfolio_csv(path, n, seed=42):
+    """Записывает синтетический портфель в CSV (для потоковых сценариев)."""
+    fields = ["id", "name", "type", "logins", "features", "days_payment", "nps", "mrr"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for client in iter_clients(n, seed):
+            writer.writerow(["" if client[field] is None else client[field] for field in fields])
+
+
+# =================== СЦЕНАРИИ ===================
+@benchmark_case("generate")
+def bench_generate(n, options):
+    for _ in iter_clients(n):
+        pass
+
+
+@benchmark_case("per_client", max_size=10**6)
+def bench_per_client(n, options):
+    for c in iter_clients(n):
+        calc.calculate_client_health_score(c["logins"], c["features"], c["days_payment"], c["nps"])
+
+
+@benchmark_case("per_client_no_details", max_size=10**6)
+def bench_per_client_no_details(n, options):
+    for c in iter_clients(n):
+        calc.calculate_client_health_score(c["logins"], c["features"], c["days_payment"], c["nps"],
+                                           with_details=False)
+
+
+@benchmark_case("portfolio_summary")
+def bench_portfolio_summary(n, options):
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        calc.analyze_client_portfolio(iter_clients(n), segment_field="type", level="summary", stream=devnull)
+
+
+@benchmark_case("portfolio_full_text", max_size=10**5)
+def bench_portfolio_full_text(n, options):
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        calc.analyze_client_portfolio(iter_clients(n), stream=devnull)
+
+
+@benchmark_case("batch_python", max_size=10**6)
+def bench_batch_python(n, options):
+    columns = generate_columns(n)
+    if np is not None:
+        columns = {field: values.tolist() for field, values in columns.items()}
+    return lambda: calc.calculate_health_scores_batch(columns, use_numpy=False)
+
+
+@benchmark_case("batch_numpy")
+def bench_batch_numpy(n, options):
+    if np is None:
+        return False
+    columns = generate_columns(n)
+    return lambda: calc.calculate_health_scores_batch(columns, use_numpy=True)
+
+
+@benchmark_case("stream_file", max_size=10**6)
+def bench_stream_file(n, options):
+    path = options["csv_path"]
+    stats = calc.PortfolioAggregator("type")
+    with open(path, encoding="utf-8", newline="") as source, open(os.devnull, "w") as sink:
+        calc.score_stream(calc.read_clients(source, "csv"), stats, calc.ResultWriter(sink, "jsonl"))
+
+
+@benchmark_case("parallel_file", max_size=10**6)
+def bench_parallel_file(n, options):
+    if options["workers"] < 2:
+        return False
+    return lambda: calc.score_file_parallel(options["csv_path"], "csv", os.devnull, "jsonl",
+                                            options["workers"], segment_field="type")
+
+
+def _run_case(name, n, options):
+    """
+    Выполняется в отдельном процессе: подготовка данных (не входит в замер),
+    сам замер и пиковая память процесса.
+    """
+    func, _ = CASES[name]
+    started = time.perf_counter()
+    prepared = func(n, options)
+    if prepared is False:
+        return None
+    if callable(prepared):
+        # Сценарий вернул функцию: подготовка данных не входит в замер
+        started = time.perf_counter()
+        prepared()
+    elapsed = time.perf_counter() - started
+    # ru_maxrss: килобайты в Linux, байты в macOS; для parallel_file учитываем и воркеры
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    peak_mb = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    return {"seconds": round(elapsed, 4), "peak_rss_mb": round(peak_mb, 1)}
+
+
+def _environment():
+    """Сведения о версии кода и окружении для сравнения запусков."""
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "numpy": np.__version__ if np is not None else None,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmarks(sizes, cases, workers=1, repeat=1, full=False):
+    """
+    Прогоняет сценарии для всех размеров портфеля.
+
+    Аргументы:
+        sizes (list): Размеры портфеля.
+        cases (list): Имена сценариев из CASES.
+        workers (int): Число процессов для parallel_file.
+        repeat (int): Повторов на сценарий (берется лучшее время).
+        full (bool): Игнорировать ограничения размера для медленных сценариев.
+
+    Возвращает:
+        list: Результаты — словари case/size/seconds/rows_per_sec/peak_rss_mb.
+    """
+    results = []
+    mp_context = get_context("spawn")  # чистый процесс на каждый замер
+    with tempfile.TemporaryDirectory(prefix="health_bench_") as tmp_dir:
+        for n in sizes:
+            options = {"workers": workers, "csv_path": os.path.join(tmp_dir, f"portfolio_{n}.csv")}
+            runnable = []
+            for name in cases:
+                _, max_size = CASES[name]
+                if max_size is not None and n > max_size and not full:
+                    print(f"   {name:<24} n={n:<10,} пропущен (больше {max_size:,}; --full для запуска)")
+                else:
+                    runnable.append(name)
+            # Файл портфеля пишется, только если его прочитает хотя бы один сценарий этого размера
+            if any(name in ("stream_file", "parallel_file") for name in runnable):
+                write_portfolio_csv(options["csv_path"], n)
+            for name in runnable:
+                best = None
+                for _ in range(repeat):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=mp_context) as pool:
+                        measured = pool.submit(_run_case, name, n, options).result()
+                    if measured is None:
+                        break
+                    if best is None or measured["seconds"] < best["seconds"]:
+                        best = measured
+                if best is None:
+                    continue
+                rate = n / best["seconds"] if best["seconds"] > 0 else None
+                result = {"case": name, "size": n, **best,
+                          "rows_per_sec": round(rate) if rate else None}
+                results.append(result)
+                print(f"   {name:<24} n={n:<10,} {best['seconds']:>9.3f} с "
+                      f"{result['rows_per_sec'] or 0:>12,} строк/с  пик {best['peak_rss_mb']:>8.1f} МБ")
+    return results
+
+
+def compare_results(current, previous):
+    """Печатает изменение времени относительно прошлого запуска (+ — медленнее)."""
+    before = {(r["case"], r["size"]): r for r in previous["results"]}
+    print(f"\n📊 СРАВНЕНИЕ С {previous['meta'].get('git_revision') or previous['meta']['timestamp']}:")
+    for result in current:
+        old = before.get((result["case"], result["size"]))
+        if not old or not old["seconds"]:
+            continue
+        change = (result["seconds"] / old["seconds"] - 1) * 100
+        flag = "⚠️ " if change > 10 else "  "
+        print(f"{flag} {result['case']:<24} n={result['size']:<10,} {change:+7.1f}% время, "
+              f"память {old['peak_rss_mb']} → {result['peak_rss_mb']} МБ")
+
+
+def _parse_sizes(text):
+    return [int(float(part)) for part in text.split(",") if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк расчета Customer Health Score.")
+    parser.add_argument("--sizes", type=_parse_sizes, default=[10**3, 10**4, 10**5],
+                        help="Размеры портфеля через запятую (например 1e3,1e5,1e7)")
+    parser.add_argument("--cases", help=f"Сценарии через запятую (по умолчанию все: {', '.join(CASES)})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Процессов для parallel_file (по умолчанию число ядер)")
+    parser.add_argument("--repeat", type=int, default=1, help="Повторов на сценарий (лучшее время)")
+    parser.add_argument("--full", action="store_true", help="Не пропускать медленные сценарии на больших размерах")
+    parser.add_argument("-o", "--output", help="Файл результатов JSON (по умолчанию benchmark_<дата>.json)")
+    parser.add_argument("--compare", help="JSON прошлого запуска для сравнения")
+    args = parser.parse_args(argv)
+
+    cases = args.cases.split(",") if args.cases else list(CASES)
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        print(f"❌ Неизвестные сценарии: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    print("=" * 70)
+    print("⏱️  БЕНЧМАРК HEALTH SCORE")
+    print("=" * 70)
+    meta = _environment()
+    results = run_benchmarks(args.sizes, cases, args.workers, args.repeat, args.full)
+
+    output = args.output or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"\n[OK] Результаты сохранены в {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_results(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Потоковая выгрузка портфеля клиентов.
+
+CSV пишется пачками обычным csv.writer прямо из источника (ClientStore.select):
+пачка форматируется в буфер в памяти и одной записью уходит в файл, при
+необходимости через сжатие на лету (.gz — gzip, .zst — zstd, если установлен
+пакет zstandard). В памяти держится только текущая пачка; предпросмотр —
+первые строки первой пачки из того же буфера, файл заново не читается.
+
+Колонки — как в экспорте дашборда (ID, Name, Type, Health, MRR, Risk, Status),
+файл в utf-8 с BOM, чтобы Excel сразу открывал кириллицу.
+
+Выгрузка в .cols — колоночный файл (columnar.py) с типизированными колонками
+CLIENT_FIELDS: его читают дашборд (open_store) и cs_score_calculator.py без
+разбора CSV.
+
+Пример запуска:
+    python client_export.py portfolio.db -o risk.csv.gz --status "At Risk" --health 0 40
+    python client_export.py portfolio.csv -o portfolio.cols
+"""
+
+import argparse
+import codecs
+import csv
+import gzip
+import io
+import sys
+import time
+
+from client_store import CLIENT_FIELDS, ClientFilter, open_store
+from columnar import COLUMNAR_SUFFIX, ColumnBuffer
+from cs_score_calculator import iter_chunks
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXPORT_HEADER = ("ID", "Name", "Type", "Health", "MRR", "Risk", "Status")
+EXPORT_BATCH = 5000
+PREVIEW_ROWS = 3
+
+# gzip -6: почти тот же размер, что и максимальное сжатие, в несколько раз быстрее
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Типы колонок в .cols (числовые определяются по значениям)
+COLUMN_TYPES = {"name": "string", "type": "category", "status": "category"}
+
+
+def available_compressions():
+    """Доступные виды сжатия (расширения файлов)."""
+    return ("gz", "zst") if zstandard is not None else ("gz",)
+
+
+def detect_compression(path):
+    """Сжатие по расширению файла: "gz", "zst" или None."""
+    name = path.lower()
+    if name.endswith(".gz"):
+        return "gz"
+    if name.endswith((".zst", ".zstd")):
+        return "zst"
+    return None
+
+
+def open_export(path, compression=None):
+    """Бинарный поток для записи выгрузки со сжатием на лету."""
+    if compression == "gz":
+        return gzip.open(path, "wb", compresslevel=GZIP_LEVEL)
+    if compression == "zst":
+        if zstandard is None:
+            raise RuntimeError("Для сжатия zstd нужен пакет zstandard (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(open(path, "wb"), closefd=True)
+    if compression is not None:
+        raise ValueError(f"Неизвестное сжатие: {compression}")
+    return open(path, "wb")
+
+
+def export_row(client):
+    """Строка CSV для клиента (порядок EXPORT_HEADER)."""
+    risk = client["risk"]
+    return (client["id"], client["name"], client["type"], client["health"], client["mrr"],
+            "" if risk is None else f"{risk}%", client["status"])
+
+
+def export_csv(clients, path, compression=None, progress=None, batch_size=EXPORT_BATCH):
+    """
+    Пишет клиентов в CSV пачками по batch_size строк.
+
+    Аргументы:
+        clients: Поток записей клиента (ClientStore, ClientStore.select(...)).
+        path: Файл выгрузки.
+        compression: "gz", "zst" или None (по умолчанию — по расширению path).
+        progress: Функция progress(записано) — вызывается после каждой пачки.
+
+    Возвращает:
+        tuple: (число записей, предпросмотр — заголовок и первые PREVIEW_ROWS строк CSV).
+    """
+    if compression is None:
+        compression = detect_compression(path)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+    exported = 0
+    preview = None
+
+    with open_export(path, compression) as out:
+        out.write(codecs.BOM_UTF8)
+        for batch in iter_chunks(map(export_row, clients), batch_size):
+            if preview is None:
+                writer.writerows(batch[:PREVIEW_ROWS])
+                preview = buffer.getvalue().splitlines()
+                writer.writerows(batch[PREVIEW_ROWS:])
+            else:
+                writer.writerows(batch)
+            out.write(buffer.getvalue().encode("utf-8"))
+            buffer.seek(0)
+            buffer.truncate()
+            exported += len(batch)
+            if progress is not None:
+                progress(exported)
+        if preview is None:
+            # Пустая выборка — файл только с заголовком
+            preview = buffer.getvalue().splitlines()
+            out.write(buffer.getvalue().encode("utf-8"))
+    return exported, preview
+
+
+def export_columns(clients, path, progress=None, batch_size=EXPORT_BATCH):
+    """
+    Пишет клиентов в колоночный файл .cols (колонки CLIENT_FIELDS).
+
+    Возвращает:
+        tuple: (число записей, предпросмотр — заголовок и первые PREVIEW_ROWS записей).
+    """
+    buffer = ColumnBuffer(CLIENT_FIELDS, COLUMN_TYPES)
+    for batch in iter_chunks(clients, batch_size):
+        buffer.write_rows(batch)
+        if progress is not None:
+            progress(len(buffer))
+    buffer.write(path)
+    preview = [", ".join(CLIENT_FIELDS)]
+    for row in range(min(PREVIEW_ROWS, len(buffer))):
+        preview.append(", ".join(str(buffer.columns[field][row]) for field in CLIENT_FIELDS))
+    return len(buffer), preview
+
+
+def export_clients(clients, path, compression=None, progress=None, batch_size=EXPORT_BATCH):
+    """Выгрузка по расширению файла: .cols — колоночная, иначе CSV (со сжатием по расширению)."""
+    if path.lower().endswith(COLUMNAR_SUFFIX):
+        return export_columns(clients, path, progress, batch_size)
+    return export_csv(clients, path, compression, progress, batch_size)
+
+
+def main(argv=None):
+    """Выгрузка портфеля (CSV/JSONL/SQLite/.cols) в CSV или .cols с фильтром и сжатием."""
+    parser = argparse.ArgumentParser(description="Потоковая выгрузка портфеля клиентов в CSV или .cols.")
+    parser.add_argument("source", help="Портфель: CSV, JSONL, SQLite или .cols")
+    parser.add_argument("-o", "--output", required=True, help="Файл выгрузки (.csv, .csv.gz, .csv.zst, .cols)")
+    parser.add_argument("--table", default="clients", help="Таблица SQLite (по умолчанию clients)")
+    parser.add_argument("--type", action="append", default=[], help="Тип клиента (можно несколько раз)")
+    parser.add_argument("--status", action="append", default=[], help="Статус: Active, At Risk (можно несколько раз)")
+    parser.add_argument("--health", nargs=2, type=float, metavar=("MIN", "MAX"),
+                        help="Диапазон health score (включительно)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH, help="Строк в пачке записи")
+    args = parser.parse_args(argv)
+
+    client_filter = ClientFilter(args.type, args.status, *(args.health or (None, None)))
+    started = time.perf_counter()
+    try:
+        with open_store(args.source, args.table) as store:
+            exported, preview = export_clients(store.select(client_filter), args.output,
+                                               batch_size=args.batch_size)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ Ошибка! {e}", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ Выгружено: {exported:,} клиентов ({client_filter.describe()}) → {args.output} | ⏱️ {elapsed:.2f} с")
+    for line in preview:
+        print(f"   {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,876 @@
+#!/usr/bin/env python3
+"""
+Источники данных портфеля для CSM Dashboard.
+
+Клиенты читаются из CSV, JSONL, SQLite или колоночного файла .cols
+(columnar.py) и отдаются страницами: дашборд
+запрашивает только строки, которые помещаются на экран. Для файлов при
+открытии выполняется один проход — запоминаются смещения строк и считаются
+метрики портфеля, сами записи в памяти не хранятся.
+
+Поля клиента: id, name, type, health, mrr, risk, status. Названия колонок
+нечувствительны к регистру (читается и экспорт дашборда: ID, Name, Risk "5%"...);
+вместо health подойдет score из результатов cs_score_calculator.py.
+
+Пример:
+    store = open_store("portfolio.csv")
+    print(store.summary())
+    for client in store.page(0, 20): ...
+"""
+
+import copy
+import csv
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+from array import array
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from itertools import count, islice
+
+from columnar import COLUMNAR_SUFFIX, ColumnarTable
+from risk_index import RISK_THRESHOLD
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CLIENT_FIELDS = ("id", "name", "type", "health", "mrr", "risk", "status")
+
+# Поля, которые держат в памяти индексы дашборда (остальное читается из источника)
+INDEX_FIELDS = ("id", "name", "type", "status", "health", "mrr")
+
+STATUS_ACTIVE = "Active"
+STATUS_AT_RISK = "At Risk"
+
+
+def _number(value):
+    """Число из ячейки ("150000", "72.5", "5%"); пустое или нечисловое значение — None."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    value = str(value).strip().rstrip("%").replace(" ", "")
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+
+def normalize_record(row):
+    """
+    Приводит строку источника к записи клиента (словарь CLIENT_FIELDS).
+
+    Возвращает None, если нет id или health. Статус без явного значения
+    определяется по порогу риска.
+    """
+    record = {str(key).strip().lower(): value for key, value in row.items() if key is not None}
+    if record.get("health") in (None, "") and record.get("score") not in (None, ""):
+        record["health"] = record["score"]
+    client_id = _number(record.get("id"))
+    if client_id is None:
+        client_id = record.get("id") or None
+    health = _number(record.get("health"))
+    if client_id is None or health is None:
+        return None
+    status = record.get("status") or (STATUS_AT_RISK if health < RISK_THRESHOLD else STATUS_ACTIVE)
+    return {
+        "id": client_id,
+        "name": record.get("name") or str(client_id),
+        "type": record.get("type") or "—",
+        "health": health,
+        "mrr": _number(record.get("mrr")) or 0,
+        "risk": _number(record.get("risk")),
+        "status": status,
+    }
+
+
+class PortfolioMetrics:
+    """
+    Метрики портфеля с обновлением за O(1).
+
+    Хранит суммы (MRR, health, клиенты в риске) в целом и по типам клиентов;
+    добавление, удаление и изменение клиента только корректируют суммы,
+    поэтому шапка и панель метрик не требуют прохода по портфелю.
+    Health суммируется в десятых долях целым числом — как в
+    PortfolioAggregator, чтобы удаления не накапливали ошибку округления.
+    """
+
+    def __init__(self):
+        self.total_clients = 0
+        self.total_mrr = 0
+        self.at_risk = 0
+        self._health_tenths = 0
+        self._by_type = {}   # type -> [клиентов, MRR, health * 10, в риске]
+
+    def _apply(self, client, sign):
+        tenths = round(client["health"] * 10)
+        at_risk = 1 if client["health"] < RISK_THRESHOLD else 0
+        self.total_clients += sign
+        self.total_mrr += sign * client["mrr"]
+        self._health_tenths += sign * tenths
+        self.at_risk += sign * at_risk
+        bucket = self._by_type.setdefault(client["type"], [0, 0, 0, 0])
+        bucket[0] += sign
+        bucket[1] += sign * client["mrr"]
+        bucket[2] += sign * tenths
+        bucket[3] += sign * at_risk
+        if bucket[0] == 0:
+            del self._by_type[client["type"]]
+
+    def add(self, client):
+        self._apply(client, 1)
+
+    def remove(self, client):
+        self._apply(client, -1)
+
+    def replace(self, old, new):
+        """Изменение клиента: старая запись вычитается, новая добавляется."""
+        self._apply(old, -1)
+        self._apply(new, 1)
+
+    def add_group(self, client_type, count, mrr, health_sum, at_risk):
+        """Готовые суммы по типу клиентов (например, из GROUP BY в SQLite)."""
+        tenths = round(health_sum * 10)
+        self.total_clients += count
+        self.total_mrr += mrr
+        self._health_tenths += tenths
+        self.at_risk += at_risk
+        bucket = self._by_type.setdefault(client_type, [0, 0, 0, 0])
+        for i, value in enumerate((count, mrr, tenths, at_risk)):
+            bucket[i] += value
+
+    @property
+    def avg_health(self):
+        return round(self._health_tenths / self.total_clients / 10, 1) if self.total_clients else 0.0
+
+    def summary(self):
+        """Метрики для шапки дашборда: total_mrr, total_clients, avg_health, at_risk."""
+        return {
+            "total_mrr": self.total_mrr,
+            "total_clients": self.total_clients,
+            "avg_health": self.avg_health,
+            "at_risk": self.at_risk,
+        }
+
+    def by_type(self):
+        """Разбивка по типам клиентов (по убыванию MRR): {type: {clients, mrr, avg_health, at_risk}}."""
+        return {
+            client_type: {
+                "clients": count,
+                "mrr": mrr,
+                "avg_health": round(tenths / count / 10, 1),
+                "at_risk": at_risk,
+            }
+            for client_type, (count, mrr, tenths, at_risk)
+            in sorted(self._by_type.items(), key=lambda item: -item[1][1])
+        }
+
+
+class ClientFilter:
+    """
+    Условия выборки клиентов: типы, статусы и диапазон health (границы включительно).
+
+    Пустой фильтр пропускает всех; фильтр вызывается как функция от записи клиента.
+    """
+
+    def __init__(self, types=(), statuses=(), health_min=None, health_max=None):
+        self.types = frozenset(types)
+        self.statuses = frozenset(statuses)
+        self.health_min = health_min
+        self.health_max = health_max
+
+    def __bool__(self):
+        return bool(self.types or self.statuses
+                    or self.health_min is not None or self.health_max is not None)
+
+    def match(self, client_type, status, health):
+        if self.types and client_type not in self.types:
+            return False
+        if self.statuses and status not in self.statuses:
+            return False
+        if self.health_min is not None and health < self.health_min:
+            return False
+        return self.health_max is None or health <= self.health_max
+
+    def __call__(self, client):
+        return self.match(client["type"], client["status"], client["health"])
+
+    def describe(self):
+        """Описание фильтра для экрана ("тип Enterprise; health 0–50")."""
+        parts = []
+        if self.types:
+            parts.append("тип " + ", ".join(sorted(self.types)))
+        if self.statuses:
+            parts.append("статус " + ", ".join(sorted(self.statuses)))
+        if self.health_min is not None or self.health_max is not None:
+            low = "" if self.health_min is None else self.health_min
+            high = "" if self.health_max is None else self.health_max
+            parts.append(f"health {low}–{high}")
+        return "; ".join(parts) or "все клиенты"
+
+
+def _name_tokens(name):
+    """Слова названия в нижнем регистре ("OOO 'TermoProfit'" -> ooo, termoprofit)."""
+    return set(re.findall(r"\w+", str(name).lower()))
+
+
+class ClientIndex:
+    """
+    Вторичные индексы клиентов: префикс названия, тип и статус.
+
+    Поиск по началу любого слова названия — бинарный по отсортированному
+    списку (слово, id); выборки по типу и статусу — множества id.
+    Поиск по id дает сам источник (ClientStore.get) за O(1).
+    Индекс обновляется вместе с источником: add / remove / replace.
+    """
+
+    def __init__(self):
+        self._tokens = []    # (слово, порядковый номер, id) — по возрастанию слова
+        self._entries = {}   # id -> (name, type, status, порядковый номер)
+        self._by_type = {}
+        self._by_status = {}
+        self._counter = count()
+
+    @classmethod
+    def from_items(cls, items):
+        """Строит индекс по кортежам INDEX_FIELDS одной сортировкой."""
+        index = cls()
+        for client_id, name, client_type, status, *_ in items:
+            index._register(client_id, name, client_type, status)
+        index._tokens.sort(key=lambda item: (item[0], item[1]))
+        return index
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, client_id):
+        return client_id in self._entries
+
+    def _register(self, client_id, name, client_type, status, insert=False):
+        order = next(self._counter)
+        self._entries[client_id] = (name, client_type, status, order)
+        self._by_type.setdefault(client_type, set()).add(client_id)
+        self._by_status.setdefault(status, set()).add(client_id)
+        for token in _name_tokens(name):
+            if insert:
+                insort(self._tokens, (token, order, client_id), key=lambda item: (item[0], item[1]))
+            else:
+                self._tokens.append((token, order, client_id))
+
+    def add(self, client):
+        if client["id"] in self._entries:
+            self.remove(client["id"])
+        self._register(client["id"], client["name"], client["type"], client["status"], insert=True)
+
+    def remove(self, client_id):
+        """Удаляет клиента из индексов (KeyError, если его нет)."""
+        name, client_type, status, order = self._entries.pop(client_id)
+        for token in _name_tokens(name):
+            position = bisect_left(self._tokens, (token, order), key=lambda item: (item[0], item[1]))
+            del self._tokens[position]
+        for groups, key in ((self._by_type, client_type), (self._by_status, status)):
+            groups[key].discard(client_id)
+            if not groups[key]:
+                del groups[key]
+
+    def replace(self, old, new):
+        self.remove(old["id"])
+        self.add(new)
+
+    def _prefix_range(self, prefix):
+        """Границы записей списка слов, начинающихся с prefix."""
+        key = lambda item: item[0]
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return bisect_left(self._tokens, prefix, key=key), bisect_left(self._tokens, upper, key=key)
+
+    def search(self, query, limit=20):
+        """
+        Клиенты, в названии которых есть слова, начинающиеся со слов запроса
+        ("sid" найдет "IP Sidorov A.V.", "gk str" — "GK 'StroyGrad'").
+
+        Возвращает:
+            list: До limit пар (id, name), отсортированных по названию.
+        """
+        words = _name_tokens(query)
+        if not words:
+            return []
+        # Кандидаты — по самому редкому слову запроса, остальные проверяются по названию
+        ranges = sorted(((self._prefix_range(word), word) for word in words),
+                        key=lambda item: item[0][1] - item[0][0])
+        (start, end), _ = ranges[0]
+        entries = self._entries
+        matches = {client_id for _, _, client_id in self._tokens[start:end]}
+        for _, word in ranges[1:]:
+            matches = {client_id for client_id in matches
+                       if any(token.startswith(word) for token in _name_tokens(entries[client_id][0]))}
+        found = heapq.nsmallest(limit, matches, key=lambda client_id: str(entries[client_id][0]).lower())
+        return [(client_id, entries[client_id][0]) for client_id in found]
+
+    def ids_by_type(self, client_type):
+        return self._by_type.get(client_type, set())
+
+    def ids_by_status(self, status):
+        return self._by_status.get(status, set())
+
+    def types(self):
+        """Число клиентов по типам."""
+        return {client_type: len(ids) for client_type, ids in self._by_type.items()}
+
+    def statuses(self):
+        """Число клиентов по статусам."""
+        return {status: len(ids) for status, ids in self._by_status.items()}
+
+
+class ClientStore:
+    """
+    Базовый источник клиентов.
+
+    Подклассы реализуют __len__, __iter__ (все записи потоком) и page();
+    metrics(), index_items() и get() по умолчанию считаются проходом по записям.
+    Изменяемые источники также реализуют put() и delete().
+    """
+
+    skipped = 0   # строк без id или health
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        raise NotImplementedError
+
+    def page(self, offset, limit):
+        """Записи с offset по offset + limit в порядке источника."""
+        raise NotImplementedError
+
+    def select(self, client_filter=None):
+        """Записи, прошедшие фильтр (ClientFilter), в порядке источника."""
+        if not client_filter:
+            return iter(self)
+        return filter(client_filter, self)
+
+    writable = False
+
+    def metrics(self):
+        """Метрики портфеля (PortfolioMetrics) — считаются один раз, дальше обновляются."""
+        metrics = PortfolioMetrics()
+        for client in self:
+            metrics.add(client)
+        return metrics
+
+    def summary(self):
+        """Метрики портфеля: total_mrr, total_clients, avg_health, at_risk."""
+        return self.metrics().summary()
+
+    def index_items(self):
+        """Кортежи INDEX_FIELDS для построения индексов (RiskIndex, ClientIndex)."""
+        return [tuple(client[field] for field in INDEX_FIELDS) for client in self]
+
+    def get(self, client_id):
+        """Клиент по id или None."""
+        return next((client for client in self if client["id"] == client_id), None)
+
+    def put(self, client):
+        """Добавляет или заменяет клиента (по id); возвращает прежнюю запись или None."""
+        raise NotImplementedError(f"Источник {type(self).__name__} открыт только для чтения")
+
+    def delete(self, client_id):
+        """Удаляет клиента; возвращает удаленную запись или None."""
+        raise NotImplementedError(f"Источник {type(self).__name__} открыт только для чтения")
+
+    def reader(self):
+        """
+        Источник для чтения из другого потока (фоновый экспорт, отчеты):
+        свой файл или соединение, не мешающие постраничному чтению дашборда.
+        """
+        return self
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MemoryStore(ClientStore):
+    """Клиенты из списка словарей (демо-данные, тесты)."""
+
+    writable = True
+
+    def __init__(self, clients):
+        self.clients = []
+        self._position = {}
+        for row in clients:
+            client = normalize_record(row)
+            if client is None:
+                self.skipped += 1
+            else:
+                self._position[client["id"]] = len(self.clients)
+                self.clients.append(client)
+
+    def __len__(self):
+        return len(self.clients)
+
+    def __iter__(self):
+        return iter(self.clients)
+
+    def page(self, offset, limit):
+        return self.clients[offset:offset + limit]
+
+    def get(self, client_id):
+        position = self._position.get(client_id)
+        return None if position is None else self.clients[position]
+
+    def put(self, client):
+        position = self._position.get(client["id"])
+        if position is None:
+            self._position[client["id"]] = len(self.clients)
+            self.clients.append(client)
+            return None
+        old, self.clients[position] = self.clients[position], client
+        return old
+
+    def delete(self, client_id):
+        position = self._position.pop(client_id, None)
+        if position is None:
+            return None
+        old = self.clients.pop(position)
+        for client in self.clients[position:]:
+            self._position[client["id"]] -= 1
+        return old
+
+    def reader(self):
+        # Снимок списка: последующие put/delete не меняют то, что читает фоновая задача
+        snapshot = MemoryStore(())
+        snapshot.clients = list(self.clients)
+        snapshot._position = dict(self._position)
+        return snapshot
+
+
+class _LineFileStore(ClientStore):
+    """
+    Файл, где каждая запись — строка (CSV, JSONL).
+
+    При открытии один проход запоминает смещения записей (8 байт на строку),
+    метрики и тройки для индекса риска; страница читается одним seek.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._offsets = array("Q")
+        self._row_by_id = {}
+        self._index_items = []
+        self._metrics = PortfolioMetrics()
+        self._read_header()
+        while True:
+            offset = self._file.tell()
+            line = self._read_record()
+            if not line:
+                break
+            client = self._parse(line)
+            if client is None:
+                if line.strip():
+                    self.skipped += 1
+                continue
+            self._row_by_id[client["id"]] = len(self._offsets)
+            self._offsets.append(offset)
+            self._index_items.append(tuple(client[field] for field in INDEX_FIELDS))
+            self._metrics.add(client)
+
+    def _read_header(self):
+        pass
+
+    def _read_record(self):
+        return self._file.readline()
+
+    def _parse(self, line):
+        raise NotImplementedError
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _read(self, start, stop):
+        if start >= stop:
+            return []
+        self._file.seek(self._offsets[start])
+        clients = []
+        while len(clients) < stop - start:
+            line = self._read_record()
+            if not line:
+                break
+            client = self._parse(line)
+            if client is not None:
+                clients.append(client)
+        return clients
+
+    def __iter__(self):
+        chunk = 10000
+        for start in range(0, len(self), chunk):
+            yield from self._read(start, min(start + chunk, len(self)))
+
+    def page(self, offset, limit):
+        return self._read(offset, min(offset + limit, len(self)))
+
+    def select(self, client_filter=None):
+        # Тип, статус и health есть в тройках индекса — читаются и разбираются только подходящие строки
+        if not client_filter:
+            return iter(self)
+        match = client_filter.match
+        return self._read_rows(row for row, (_, _, client_type, status, health, _)
+                               in enumerate(self._index_items) if match(client_type, status, health))
+
+    def _read_rows(self, rows):
+        # Seek только при разрыве: между записями могут быть пропущенные строки (без health, пустые)
+        position = None
+        for row in rows:
+            offset = self._offsets[row]
+            if offset != position:
+                self._file.seek(offset)
+            line = self._read_record()
+            position = offset + len(line)
+            client = self._parse(line)
+            if client is not None:
+                yield client
+
+    def metrics(self):
+        return self._metrics
+
+    def index_items(self):
+        return self._index_items
+
+    def get(self, client_id):
+        row = self._row_by_id.get(client_id)
+        return None if row is None else self._read(row, row + 1)[0]
+
+    def reader(self):
+        # Смещения и метрики общие (файл неизменяем), позиция чтения — своя
+        other = copy.copy(self)
+        other._file = open(self.path, "rb")
+        return other
+
+    def close(self):
+        self._file.close()
+
+
+class CsvStore(_LineFileStore):
+    """CSV с заголовком (в том числе экспорт дашборда в utf-8-sig)."""
+
+    def _read_header(self):
+        header = self._file.readline().decode("utf-8-sig")
+        self._fields = next(csv.reader([header]))
+
+    def _read_record(self):
+        line = self._file.readline()
+        # Поле в кавычках может содержать перевод строки — дочитываем запись
+        while line and line.count(b'"') % 2 == 1:
+            more = self._file.readline()
+            if not more:
+                break
+            line += more
+        return line
+
+    def _parse(self, line):
+        values = next(csv.reader([line.decode("utf-8")]), None)
+        if not values:
+            return None
+        return normalize_record(dict(zip(self._fields, values)))
+
+
+class JsonlStore(_LineFileStore):
+    """JSON Lines: один клиент — один объект в строке."""
+
+    def _parse(self, line):
+        if not line.strip():
+            return None
+        try:
+            row = json.loads(line)
+        except ValueError:   # оборванная строка или не utf-8 — пропускается, как запись без health
+            return None
+        return normalize_record(row) if isinstance(row, dict) else None
+
+
+class SqliteStore(ClientStore):
+    """
+    Таблица SQLite с колонками CLIENT_FIELDS.
+
+    Метрики и страницы считает сама база — в Python попадают только
+    строки текущей страницы.
+    """
+
+    writable = True
+
+    def __init__(self, path, table="clients"):
+        if not table.isidentifier():
+            raise ValueError(f"Некорректное имя таблицы: {table!r}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self.table = table
+        self.conn = self._connect()
+        self._columns = ", ".join(CLIENT_FIELDS)
+        # Те же условия, что у normalize_record: ячейки вроде 'n/a' в health не считаются клиентами
+        self._valid = "NULLIF(id, '') IS NOT NULL AND cell_number(health) IS NOT NULL"
+        # Поиск по id — через индекс базы, а не полным просмотром таблицы
+        with self.conn:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_id ON {self.table} (id)")
+
+    def _connect(self, **kwargs):
+        # Числа из ячеек разбираются в SQL так же, как при чтении записей (_number)
+        conn = sqlite3.connect(self.path, **kwargs)
+        conn.create_function("cell_number", 1, _number, deterministic=True)
+        return conn
+
+    def _rows(self, sql, params=()):
+        for row in self.conn.execute(sql, params):
+            client = normalize_record(dict(zip(CLIENT_FIELDS, row)))
+            if client is not None:
+                yield client
+
+    def __len__(self):
+        return self.conn.execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE {self._valid}"
+        ).fetchone()[0]
+
+    def __iter__(self):
+        return self._rows(f"SELECT {self._columns} FROM {self.table} ORDER BY rowid")
+
+    def page(self, offset, limit):
+        return list(self._rows(
+            f"SELECT {self._columns} FROM {self.table} "
+            f"WHERE {self._valid} ORDER BY rowid LIMIT ? OFFSET ?",
+            (limit, offset),
+        ))
+
+    def select(self, client_filter=None):
+        # Тип и диапазон health фильтрует база; статус может выводиться из health — проверяется здесь
+        if not client_filter:
+            return iter(self)
+        conditions, params = [self._valid], []
+        if client_filter.types:
+            conditions.append(f"COALESCE(NULLIF(type, ''), '—') IN ({', '.join('?' * len(client_filter.types))})")
+            params.extend(client_filter.types)
+        if client_filter.health_min is not None:
+            conditions.append("cell_number(health) >= ?")
+            params.append(client_filter.health_min)
+        if client_filter.health_max is not None:
+            conditions.append("cell_number(health) <= ?")
+            params.append(client_filter.health_max)
+        rows = self._rows(f"SELECT {self._columns} FROM {self.table} "
+                          f"WHERE {' AND '.join(conditions)} ORDER BY rowid", params)
+        return filter(client_filter, rows)
+
+    def metrics(self):
+        metrics = PortfolioMetrics()
+        for row in self.conn.execute(
+            f"SELECT COALESCE(NULLIF(type, ''), '—'), COUNT(*), COALESCE(SUM(cell_number(mrr)), 0), "
+            f"SUM(cell_number(health)), SUM(cell_number(health) < ?) FROM {self.table} "
+            f"WHERE {self._valid} GROUP BY 1",
+            (RISK_THRESHOLD,),
+        ):
+            metrics.add_group(*row)
+        return metrics
+
+    def get(self, client_id):
+        return next(self._rows(f"SELECT {self._columns} FROM {self.table} WHERE id = ?", (client_id,)), None)
+
+    def put(self, client):
+        old = self.get(client["id"])
+        values = [client[field] for field in CLIENT_FIELDS]
+        with self.conn:
+            if old is None:
+                self.conn.execute(f"INSERT INTO {self.table} ({self._columns}) "
+                                  f"VALUES ({', '.join('?' * len(CLIENT_FIELDS))})", values)
+            else:
+                # UPDATE, а не INSERT OR REPLACE: строка сохраняет место (rowid) в списке
+                assignments = ", ".join(f"{field} = ?" for field in CLIENT_FIELDS[1:])
+                self.conn.execute(f"UPDATE {self.table} SET {assignments} WHERE id = ?",
+                                  values[1:] + values[:1])
+        return old
+
+    def delete(self, client_id):
+        old = self.get(client_id)
+        if old is not None:
+            with self.conn:
+                self.conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (client_id,))
+        return old
+
+    def reader(self):
+        # Отдельное соединение; создается здесь, а используется в потоке задачи
+        other = copy.copy(self)
+        other.conn = self._connect(check_same_thread=False)
+        return other
+
+    def close(self):
+        self.conn.close()
+
+
+class ColumnarStore(ClientStore):
+    """
+    Колоночный файл .cols (экспорт дашборда или client_export.py).
+
+    Файл открывается через mmap без чтения записей; метрики считаются по
+    колонкам (с NumPy — векторно), колонки для индексов и фильтров читаются
+    один раз по запросу, в словари превращаются только строки страницы.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.table = ColumnarTable(path)
+        # Результаты cs_score_calculator.py: балл в колонке score
+        self._health = "health" if "health" in self.table else "score"
+        if "id" not in self.table or self._health not in self.table:
+            self.table.close()
+            raise ValueError(f"{path}: нужны колонки id и health (или score)")
+        self._columns = None
+        self._row_by_id = None
+
+    def __len__(self):
+        return len(self.table)
+
+    def _records(self, start, stop):
+        rows = self.table.rows(start, stop)
+        if self._health != "health":
+            for row in rows:
+                row["health"] = row[self._health]
+        return [client for client in map(normalize_record, rows) if client is not None]
+
+    def __iter__(self):
+        chunk = 10000
+        for start in range(0, len(self), chunk):
+            yield from self._records(start, start + chunk)
+
+    def page(self, offset, limit):
+        return self._records(offset, min(offset + limit, len(self)))
+
+    def _index_columns(self):
+        """Колонки INDEX_FIELDS списками, с теми же умолчаниями, что и normalize_record."""
+        if self._columns is None:
+            table = self.table
+            names = [name for name in INDEX_FIELDS if name in table and name != "health"]
+            read = table.read(names + [self._health], use_numpy=False)
+            columns = {name: values if isinstance(values, list) else values.tolist()
+                       for name, values in read.items()}
+            size = len(table)
+            ids = columns["id"]
+            # Пропуск в целочисленной колонке приходит как None — приводим к NaN, как во float64
+            health = [math.nan if value is None else value for value in columns.pop(self._health)]
+            names = columns.get("name") or [""] * size
+            mrr = columns.get("mrr") or [0] * size
+            self._columns = {
+                "id": ids,
+                "name": [name or str(client_id) for name, client_id in zip(names, ids)],
+                "type": [client_type or "—" for client_type in columns.get("type") or [""] * size],
+                "status": [status or (STATUS_AT_RISK if score < RISK_THRESHOLD else STATUS_ACTIVE)
+                           for status, score in zip(columns.get("status") or [""] * size, health)],
+                "health": health,
+                "mrr": [value if value == value and value else 0 for value in mrr],
+            }
+        return self._columns
+
+    def metrics(self):
+        table = self.table
+        if np is None or "type" not in table or table.type_of("type") != "category":
+            return super().metrics()
+        # Суммы по типам одним bincount по кодам категорий
+        health = np.asarray(table.column(self._health), dtype=np.float64)
+        codes, categories = table.codes("type")
+        valid = ~np.isnan(health)
+        codes, health = codes[valid], health[valid]
+        if "mrr" in table:
+            mrr = np.asarray(table.column("mrr"), dtype=np.float64)[valid]
+            mrr = np.where(np.isnan(mrr), 0, mrr)
+        else:
+            mrr = np.zeros(len(health))
+        size = len(categories)
+        counts = np.bincount(codes, minlength=size)
+        mrr_sums = np.bincount(codes, weights=mrr, minlength=size)
+        tenths = np.bincount(codes, weights=np.rint(health * 10), minlength=size)
+        at_risk = np.bincount(codes[health < RISK_THRESHOLD], minlength=size)
+        integer_mrr = "mrr" not in table or table.type_of("mrr") == "int64"
+        metrics = PortfolioMetrics()
+        for i, client_type in enumerate(categories):
+            if counts[i]:
+                mrr_sum = int(round(mrr_sums[i])) if integer_mrr else float(mrr_sums[i])
+                metrics.add_group(client_type or "—", int(counts[i]), mrr_sum,
+                                  float(tenths[i]) / 10, int(at_risk[i]))
+        return metrics
+
+    def index_items(self):
+        columns = self._index_columns()
+        return [item for item in zip(*(columns[field] for field in INDEX_FIELDS)) if item[4] == item[4]]
+
+    def select(self, client_filter=None):
+        # Фильтр проверяется по колонкам; записи собираются только для пачек с совпадениями
+        if not client_filter:
+            return iter(self)
+        columns = self._index_columns()
+        match = client_filter.match
+        rows = [row for row, (client_type, status, health)
+                in enumerate(zip(columns["type"], columns["status"], columns["health"]))
+                if health == health and match(client_type, status, health)]
+        return self._read_rows(rows)
+
+    def _read_rows(self, rows):
+        chunk = 10000
+        position = 0
+        while position < len(rows):
+            start = rows[position]
+            stop = start + chunk
+            end = bisect_left(rows, stop, position)
+            records = self.table.rows(start, min(stop, len(self)))
+            for row in rows[position:end]:
+                record = records[row - start]
+                if self._health != "health":
+                    record["health"] = record[self._health]
+                client = normalize_record(record)
+                if client is not None:
+                    yield client
+            position = end
+
+    def get(self, client_id):
+        if self._row_by_id is None:
+            self._row_by_id = {value: row for row, value in enumerate(self._index_columns()["id"])}
+        row = self._row_by_id.get(client_id)
+        return None if row is None else next(iter(self._records(row, row + 1)), None)
+
+    def reader(self):
+        return ColumnarStore(self.path)
+
+    def close(self):
+        self.table.close()
+
+
+@contextmanager
+def open_reader(store):
+    """Читатель источника для фоновой задачи; по выходу из with закрывается он, а не сам источник."""
+    source = store.reader()
+    try:
+        yield source
+    finally:
+        if source is not store:
+            source.close()
+
+
+def open_store(path, table="clients"):
+    """Открывает источник по расширению: .csv, .jsonl/.ndjson, .db/.sqlite/.sqlite3, .cols."""
+    name = path.lower()
+    if name.endswith(COLUMNAR_SUFFIX):
+        return ColumnarStore(path)
+    if name.endswith((".jsonl", ".ndjson")):
+        return JsonlStore(path)
+    if name.endswith((".db", ".sqlite", ".sqlite3")):
+        return SqliteStore(path, table)
+    if name.endswith(".csv"):
+        return CsvStore(path)
+    raise ValueError(f"Неизвестный формат источника: {path} (ожидается .csv, .jsonl, .db или .cols)")
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Колоночный бинарный формат для данных портфеля (.cols).
+
+Каждая колонка хранится отдельным непрерывным блоком с типом, поэтому файл
+открывается через mmap за миллисекунды, а читаются только нужные колонки
+(проекция) — без разбора CSV. С NumPy числовые колонки отдаются как массивы
+прямо поверх mmap (без копирования), без NumPy — как memoryview.
+
+Устройство файла (все числа little-endian):
+    b"CSMCOL1\\n"                  — сигнатура
+    длина заголовка (8 байт)
+    заголовок JSON: {"rows": N, "columns": [{"name", "type", "offset", "length", ...}]}
+    блоки колонок, каждый выровнен по 64 байтам (смещения — от начала блоков)
+
+Типы колонок:
+    int64, float64 — значения подряд (пропуск во float64 — NaN; в int64 —
+                     0 и маска пропусков: байт на строку после значений);
+    category       — коды int32 + список значений в заголовке (тип, статус);
+    string         — смещения int64 (N + 1) + байты utf-8 подряд.
+
+Пример:
+    write_columns("scores.cols", {"id": ids, "score": scores, "status": statuses})
+    with ColumnarTable("scores.cols") as table:
+        scores = table.column("score")          # без копирования
+        page = table.rows(0, 20, ["id", "score"])
+"""
+
+import json
+import math
+import mmap
+import struct
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"CSMCOL1\n"
+ALIGN = 64
+COLUMNAR_SUFFIX = ".cols"
+
+# Тип колонки -> (код array/memoryview, dtype NumPy)
+NUMERIC_TYPES = {"int64": ("q", "<i8"), "float64": ("d", "<f8")}
+CODE_TYPE = ("i", "<i4")
+OFFSET_TYPE = ("q", "<i8")
+MASK_TYPE = ("B", "u1")
+COLUMN_TYPES = ("int64", "float64", "category", "string")
+
+# Строковая колонка с не более чем CATEGORY_LIMIT разными значениями хранится кодами
+CATEGORY_LIMIT = 1024
+
+_SWAP = sys.byteorder != "little"
+
+
+def infer_type(values):
+    """Тип колонки по значениям: int64 (в том числе с пропусками), float64, category или string."""
+    if np is not None and isinstance(values, np.ndarray) and values.dtype != object:
+        if values.dtype.kind in "iub":
+            return "int64"
+        if values.dtype.kind == "f":
+            return "float64"
+    numeric = integer = True
+    distinct = set()
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, float):
+            integer = False
+        elif isinstance(value, bool) or not isinstance(value, int):
+            numeric = integer = False
+            if len(distinct) <= CATEGORY_LIMIT:
+                distinct.add(value)
+    if integer:
+        return "int64"
+    if numeric:
+        return "float64"
+    return "category" if len(distinct) <= CATEGORY_LIMIT else "string"
+
+
+def _pack(values, column_type):
+    """Колонка -> (байты блока, метаданные заголовка)."""
+    if column_type in NUMERIC_TYPES:
+        code, dtype = NUMERIC_TYPES[column_type]
+        if np is not None and isinstance(values, np.ndarray):
+            return np.ascontiguousarray(values, dtype=dtype).tobytes(), {}
+        if column_type == "float64":
+            values = (math.nan if value is None else value for value in values)
+            mask = None
+        else:
+            values = list(values)
+            mask = bytes(value is None for value in values) if None in values else None
+            if mask is not None:
+                values = [0 if value is None else value for value in values]
+        packed = array(code, values)
+        if _SWAP:
+            packed.byteswap()
+        if mask is None:
+            return packed.tobytes(), {}
+        # Целые с пропусками: значения (пропуск — 0), затем маска пропусков
+        data = packed.tobytes()
+        padding = -len(data) % ALIGN
+        return data + b"\0" * padding + mask, {"nulls": len(data) + padding}
+
+    values = ["" if value is None else str(value) for value in values]
+    if column_type == "category":
+        positions = {}
+        codes = array(CODE_TYPE[0], (positions.setdefault(value, len(positions)) for value in values))
+        if _SWAP:
+            codes.byteswap()
+        return codes.tobytes(), {"categories": list(positions)}
+
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = array(OFFSET_TYPE[0], [0])
+    total = 0
+    for item in encoded:
+        total += len(item)
+        offsets.append(total)
+    if _SWAP:
+        offsets.byteswap()
+    offsets_bytes = offsets.tobytes()
+    padding = -len(offsets_bytes) % ALIGN
+    return offsets_bytes + b"\0" * padding + b"".join(encoded), {"data": len(offsets_bytes) + padding}
+
+
+def write_columns(path, columns, types=None):
+    """
+    Записывает колонки в файл .cols.
+
+    Аргументы:
+        columns (dict): Имя колонки -> значения (список, array или массив NumPy)
+            одинаковой длины.
+        types (dict): Явные типы колонок (COLUMN_TYPES); остальные определяются
+            по значениям (infer_type).
+
+    Возвращает:
+        int: Число строк.
+    """
+    types = types or {}
+    rows = None
+    blocks, metas = [], []
+    offset = 0
+    for name, values in columns.items():
+        if rows is None:
+            rows = len(values)
+        elif len(values) != rows:
+            raise ValueError(f"Колонка {name}: {len(values)} значений вместо {rows}")
+        column_type = types.get(name) or infer_type(values)
+        if column_type not in COLUMN_TYPES:
+            raise ValueError(f"Колонка {name}: неизвестный тип {column_type}")
+        block, meta = _pack(values, column_type)
+        metas.append(dict(meta, name=name, type=column_type, offset=offset, length=len(block)))
+        blocks.append(block)
+        offset += len(block) + -len(block) % ALIGN
+
+    header = json.dumps({"rows": rows or 0, "columns": metas}, ensure_ascii=False).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        f.write(b"\0" * (-f.tell() % ALIGN))
+        for block in blocks:
+            f.write(block)
+            f.write(b"\0" * (-len(block) % ALIGN))
+    return rows or 0
+
+
+class ColumnBuffer:
+    """
+    Накопление строк-словарей по колонкам для write_columns.
+
+    Колонки — names или ключи первой строки; отсутствующее в строке поле — None.
+    """
+
+    def __init__(self, names=None, types=None):
+        self.names = list(names) if names else None
+        self.types = types or {}
+        self.columns = {name: [] for name in self.names} if self.names else None
+        self.rows = 0
+
+    def __len__(self):
+        return self.rows
+
+    def write_rows(self, rows):
+        if not rows:
+            return
+        if self.columns is None:
+            self.names = list(rows[0])
+            self.columns = {name: [] for name in self.names}
+        for name, column in self.columns.items():
+            column.extend([row.get(name) for row in rows])
+        self.rows += len(rows)
+
+    def write(self, path):
+        """Записывает накопленные колонки в файл; возвращает число строк."""
+        return write_columns(path, self.columns or {}, self.types)
+
+
+class ColumnarTable:
+    """
+    Файл .cols, открытый через mmap (только чтение).
+
+    column(name) — колонка целиком, rows(start, stop, names) — строки-словари
+    с выбранными колонками, read(names, start, stop) — срез колонок.
+    Массивы, полученные из таблицы, действительны, пока таблица открыта.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path}: не колоночный файл (.cols)")
+        header_length, = struct.unpack_from("<Q", self._mm, len(MAGIC))
+        header_end = len(MAGIC) + 8 + header_length
+        header = json.loads(self._mm[len(MAGIC) + 8:header_end].decode("utf-8"))
+        self._base = header_end + -header_end % ALIGN
+        self.rows_count = header["rows"]
+        self._columns = {meta["name"]: meta for meta in header["columns"]}
+
+    @property
+    def names(self):
+        return list(self._columns)
+
+    def type_of(self, name):
+        return self._columns[name]["type"]
+
+    def __len__(self):
+        return self.rows_count
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def _meta(self, name):
+        try:
+            return self._columns[name]
+        except KeyError:
+            raise KeyError(f"{self.path}: нет колонки {name}") from None
+
+    def _array(self, offset, types, count, use_numpy):
+        """Массив поверх mmap без копирования (NumPy или memoryview)."""
+        code, dtype = types
+        if use_numpy:
+            return np.frombuffer(self._mm, dtype=dtype, count=count, offset=self._base + offset)
+        size = array(code).itemsize
+        view = memoryview(self._mm)[self._base + offset:self._base + offset + count * size]
+        if _SWAP:
+            swapped = array(code, view.tobytes())
+            swapped.byteswap()
+            return swapped
+        return view.cast(code)
+
+    def codes(self, name, use_numpy=None):
+        """Коды и значения категориальной колонки: (коды, список значений)."""
+        meta = self._meta(name)
+        if meta["type"] != "category":
+            raise TypeError(f"Колонка {name} не категориальная")
+        use_numpy = np is not None if use_numpy is None else use_numpy
+        return self._array(meta["offset"], CODE_TYPE, self.rows_count, use_numpy), meta["categories"]
+
+    def column(self, name, use_numpy=None):
+        """
+        Колонка целиком.
+
+        Числовые — массив NumPy (или memoryview) поверх mmap без копирования;
+        категориальные — массив object NumPy (или список) значений; строковые — список.
+        """
+        return self.read([name], use_numpy=use_numpy)[name]
+
+    def read(self, names=None, start=0, stop=None, use_numpy=None):
+        """Срез [start, stop) выбранных колонок: {имя: значения}."""
+        use_numpy = np is not None if use_numpy is None else use_numpy
+        stop = self.rows_count if stop is None else min(stop, self.rows_count)
+        start = min(start, stop)
+        result = {}
+        for name in names or self.names:
+            meta = self._meta(name)
+            column_type = meta["type"]
+            if column_type in NUMERIC_TYPES:
+                values = self._array(meta["offset"], NUMERIC_TYPES[column_type], self.rows_count, use_numpy)
+                result[name] = values[start:stop] if "nulls" not in meta else \
+                    self._nullable(values, meta, start, stop, use_numpy)
+            elif column_type == "category":
+                codes = self._array(meta["offset"], CODE_TYPE, self.rows_count, use_numpy)[start:stop]
+                categories = meta["categories"]
+                if use_numpy:
+                    result[name] = np.asarray(categories, dtype=object)[codes] if categories else \
+                        np.empty(len(codes), dtype=object)
+                else:
+                    result[name] = [categories[code] for code in codes]
+            else:
+                result[name] = self._strings(meta, start, stop)
+        return result
+
+    def _nullable(self, values, meta, start, stop, use_numpy):
+        """Целые с пропусками: с NumPy — float64 с NaN (как и колонки float64), иначе список с None."""
+        nulls = self._array(meta["offset"] + meta["nulls"], MASK_TYPE, self.rows_count, use_numpy)[start:stop]
+        if use_numpy:
+            result = values[start:stop].astype(np.float64)
+            result[nulls.astype(bool)] = np.nan
+            return result
+        return [None if null else value for value, null in zip(values[start:stop].tolist(), nulls)]
+
+    def _strings(self, meta, start, stop):
+        offsets = self._array(meta["offset"], OFFSET_TYPE, self.rows_count + 1, False)[start:stop + 1].tolist()
+        if not offsets:
+            return []
+        data_start = self._base + meta["offset"] + meta["data"]
+        blob = self._mm[data_start + offsets[0]:data_start + offsets[-1]]
+        first = offsets[0]
+        return [blob[a - first:b - first].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+
+    def rows(self, start, stop, names=None):
+        """Строки [start, stop) как словари с выбранными колонками (пропуски — None)."""
+        names = names or self.names
+        columns = self.read(names, start, stop, use_numpy=False)
+        values = []
+        for name in names:
+            column = columns[name]
+            if not isinstance(column, list):
+                column = column.tolist()
+                if self._columns[name]["type"] == "float64":
+                    column = [None if value != value else value for value in column]
+            values.append(column)
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def close(self):
+        try:
+            self._mm.close()
+        except BufferError:
+            # На mmap еще ссылаются выданные массивы — память освободится вместе с ними
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -6,14 +6,33 @@ CSM DASHBOARD PRO v3.5
 
 import os
 import sys
-import csv
-import time
+import math
+import argparse
 from datetime import datetime
 
+from background_jobs import JobRunner
+from client_export import available_compressions, export_clients
+from client_store import ClientFilter, ClientIndex, MemoryStore, normalize_record, open_reader, open_store
+from portfolio_report import REPORT_FORMATS, REPORT_KINDS, ReportEngine
+from risk_index import RiskIndex
+from terminal_screen import Screen
+
+# Демонстрационный портфель (когда источник данных не указан)
+DEMO_CLIENTS = [
+    {"id": 1, "name": "OOO 'TermoProfit'", "type": "Enterprise", "health": 86, "mrr": 150000, "risk": 5, "status": "Active"},
+    {"id": 2, "name": "GK 'StroyGrad'", "type": "Business", "health": 72, "mrr": 75000, "risk": 15, "status": "Active"},
+    {"id": 3, "name": "IP Sidorov A.V.", "type": "Startup", "health": 42, "mrr": 25000, "risk": 65, "status": "At Risk"},
+    {"id": 4, "name": "OOO 'MediaGroup'", "type": "Business", "health": 88, "mrr": 95000, "risk": 8, "status": "Active"}
+]
+
+# Строк таблицы клиентов на одной странице
+PAGE_SIZE = 20
+
+# Снимки портфеля для изменений за неделю в отчетах
+REPORT_HISTORY = "csm_report_history.json"
+
 # ================== УНИКАЛЬНАЯ CSM ASCII КАРТИНКА ==================
-def display_logo():
-    """Уникальная CSM ASCII картинка в стиле terminal"""
-    logo = """
+LOGO = """
      _____ _____ __  __   ____  _   _ _____ 
     / ____/ ____|  \/  | / __ \| \ | |  __ \\
    | |   | |    | \  / || |  | |  \| | |  | |
@@ -24,86 +43,178 @@ def display_logo():
         CUSTOMER SUCCESS MANAGER DASHBOARD
                   Version 3.5
     """
-    print(logo)
+
+# Экран дашборда: меньше строк таблицы — сначала убираются быстрые действия, затем логотип
+MIN_PAGE_ROWS = 5
+CLIENT_TABLE_CHROME = 7   # заголовок таблицы, нижняя черта, строка страниц, пустая строка
+PROMPT_LINES = 2          # строка ввода и строка, на которую переходит курсор после Enter
+
+def display_logo():
+    """Уникальная CSM ASCII картинка в стиле terminal"""
+    print(LOGO)
 
 class Dashboard:
-    def __init__(self):
+    def __init__(self, store=None):
         if os.name == 'nt':
             os.system('chcp 65001 > nul')
         
-        self.clients = [
-            {"id": 1, "name": "OOO 'TermoProfit'", "type": "Enterprise", "health": 86, "mrr": 150000, "risk": 5, "status": "Active"},
-            {"id": 2, "name": "GK 'StroyGrad'", "type": "Business", "health": 72, "mrr": 75000, "risk": 15, "status": "Active"},
-            {"id": 3, "name": "IP Sidorov A.V.", "type": "Startup", "health": 42, "mrr": 25000, "risk": 65, "status": "At Risk"},
-            {"id": 4, "name": "OOO 'MediaGroup'", "type": "Business", "health": 88, "mrr": 95000, "risk": 8, "status": "Active"}
-        ]
-        
-        self.metrics = {
-            "total_mrr": sum(c["mrr"] for c in self.clients),
-            "total_clients": len(self.clients),
-            "avg_health": 82.0,
-            "at_risk": 1
-        }
+        # Источник клиентов (CSV/JSONL/SQLite) — читается постранично, по умолчанию демо-портфель
+        self.store = store if store is not None else MemoryStore(DEMO_CLIENTS)
+        self.page = 0
+        self.page_size = PAGE_SIZE
+        self.status = ""
+        
+        # Регионы экрана, зависящие от данных, кешируются до следующего изменения портфеля
+        self._version = 0
+        self._regions = {}
+        
+        # Экспорт и отчеты выполняются в фоне, меню в это время доступно
+        self.jobs = JobRunner()
+        
+        # Отчеты одной версии портфеля строятся из общих агрегатов (один проход по клиентам)
+        self.reports = ReportEngine(REPORT_HISTORY)
+        
+        # Индекс по health score: топ рисковых и выборки по порогу без сортировки портфеля
+        # Вторичные индексы: поиск по началу названия, выборки по типу и статусу
+        items = self.store.index_items()
+        if not isinstance(items, list):
+            items = list(items)
+        self.risk_index = RiskIndex()
+        self.risk_index.extend((client_id, health, mrr) for client_id, *_, health, mrr in items)
+        self.client_index = ClientIndex.from_items(items)
+        
+        # Метрики портфеля считаются по данным один раз, дальше обновляются за O(1)
+        self.portfolio = self.store.metrics()
+        self._synced_mrr = self.portfolio.total_mrr
+    
+    @property
+    def metrics(self):
+        """Метрики для шапки и панели: total_mrr, total_clients, avg_health, at_risk."""
+        return self.portfolio.summary()
+    
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.store) // self.page_size))
+    
+    def set_page_size(self, size):
+        """Меняет число строк на странице, оставаясь на странице с тем же первым клиентом."""
+        if size != self.page_size:
+            self.page = self.page * self.page_size // size
+            self.page_size = size
+    
+    def add_client(self, client):
+        """Добавляет или заменяет клиента; метрики и индекс риска обновляются без пересчета."""
+        client = normalize_record(client)
+        if client is None:
+            raise ValueError("У клиента должны быть id и health")
+        old = self.store.put(client)
+        if old is None:
+            self.portfolio.add(client)
+            self.client_index.add(client)
+        else:
+            self.portfolio.replace(old, client)
+            self.client_index.replace(old, client)
+        self.risk_index.update(client["id"], client["health"], client["mrr"])
+        self._version += 1
+        return client
+    
+    def update_client(self, client_id, **changes):
+        """Изменяет поля клиента (health, mrr, type, ...)."""
+        old = self.store.get(client_id)
+        if old is None:
+            raise KeyError(client_id)
+        return self.add_client(dict(old, **changes))
+    
+    def remove_client(self, client_id):
+        """Удаляет клиента из источника, метрик и индекса риска."""
+        old = self.store.delete(client_id)
+        if old is not None:
+            self.portfolio.remove(old)
+            self.risk_index.remove(client_id)
+            self.client_index.remove(client_id)
+            self._version += 1
+        return old
 
-    def display_header(self):
+    def _region(self, name, key, build):
+        """Строки региона экрана из кеша, пока не изменился ключ (страница, версия данных)."""
+        cached = self._regions.get(name)
+        if cached is None or cached[0] != key:
+            cached = self._regions[name] = (key, build())
+        return cached[1]
+
+    def header_lines(self):
         """Заголовок с информацией"""
-        print("=" * 70)
-        print("ДАТА: 15 декабря 2023, Понедельник")
-        print("МЕНЕДЖЕР: Иван Иванов | Email: ivan@company.com")
-        print(f"ПОРТФЕЛЬ: {self.metrics['total_clients']} активных клиентов | MRR: {self.metrics['total_mrr']:,} руб.")
-        print("=" * 70)
-        print()
+        return [
+            "=" * 70,
+            "ДАТА: 15 декабря 2023, Понедельник",
+            "МЕНЕДЖЕР: Иван Иванов | Email: ivan@company.com",
+            f"ПОРТФЕЛЬ: {self.metrics['total_clients']} активных клиентов | MRR: {self.metrics['total_mrr']:,} руб.",
+            "=" * 70,
+            "",
+        ]
 
-    def display_metrics(self):
+    def metrics_lines(self):
         """Ключевые метрики"""
-        print("КЛЮЧЕВЫЕ МЕТРИКИ ПОРТФЕЛЯ")
-        print("-" * 50)
-        
-        print(f"  MRR: {self.metrics['total_mrr']:,} руб.")
-        print(f"  Клиенты: {self.metrics['total_clients']}")
-        print(f"  Health Score: {self.metrics['avg_health']}/100")
-        print(f"  NPS: 8.0/10")
-        print(f"  Клиентов в риске: {self.metrics['at_risk']}")
-        print(f"  Ушедших клиентов: 0")
-        print()
+        lines = [
+            "КЛЮЧЕВЫЕ МЕТРИКИ ПОРТФЕЛЯ",
+            "-" * 50,
+            f"  MRR: {self.metrics['total_mrr']:,} руб.",
+            f"  Клиенты: {self.metrics['total_clients']}",
+            f"  Health Score: {self.metrics['avg_health']}/100",
+            f"  NPS: 8.0/10",
+            f"  Клиентов в риске: {self.metrics['at_risk']}",
+            f"  Ушедших клиентов: 0",
+        ]
+        for client_type, stats in self.portfolio.by_type().items():
+            lines.append(f"    {client_type:<12} {stats['clients']:>6} клиентов | MRR {stats['mrr']:>14,} руб. | "
+                         f"Health {stats['avg_health']:>5} | в риске {stats['at_risk']}")
+        lines.append("")
+        return lines
 
-    def display_clients(self):
-        """Таблица клиентов"""
-        print("ОБЗОР КЛИЕНТСКОГО ПОРТФЕЛЯ")
-        print("=" * 70)
-        print("ID  Клиент                 Тип        Health  MRR          Риск    Статус")
-        print("-" * 70)
-        
-        for client in self.clients:
+    def client_lines(self):
+        """Таблица клиентов (текущая страница)"""
+        lines = [
+            "ОБЗОР КЛИЕНТСКОГО ПОРТФЕЛЯ",
+            "=" * 70,
+            "ID  Клиент                 Тип        Health  MRR          Риск    Статус",
+            "-" * 70,
+        ]
+        for client in self.store.page(self.page * self.page_size, self.page_size):
             status_text = "Активный" if client["status"] == "Active" else "В риске"
-            print(f"{client['id']:<3} "
-                  f"{client['name'][:20]:<22} "
-                  f"{client['type']:<10} "
-                  f"{client['health']:<7} "
-                  f"{client['mrr']:<12,} "
-                  f"{client['risk']:<6}% "
-                  f"{status_text:<10}")
-        
-        print("=" * 70)
-        print()
+            risk = f"{client['risk']:<6}%" if client['risk'] is not None else f"{'—':<7}"
+            lines.append(f"{client['id']:<3} "
+                         f"{client['name'][:20]:<22} "
+                         f"{client['type']:<10} "
+                         f"{client['health']:<7} "
+                         f"{client['mrr']:<12,} "
+                         f"{risk} "
+                         f"{status_text:<10}")
+        lines.append("=" * 70)
+        if self.page_count > 1:
+            lines.append(f"Страница {self.page + 1}/{self.page_count} (n — следующая, p — предыдущая)")
+        lines.append("")
+        return lines
 
-    def display_ai_recommendations(self):
+    def recommendation_lines(self):
         """AI рекомендации"""
-        print("AI РЕКОМЕНДАЦИИ")
-        print("-" * 50)
-        
+        lines = ["AI РЕКОМЕНДАЦИИ", "-" * 50]
         if self.metrics['at_risk'] > 0:
-            print(f"[WARN] {self.metrics['at_risk']} клиентов под угрозой ухода")
-            print(f"       Рекомендация: Провести emergency call сегодня")
+            lines.append(f"[WARN] {self.metrics['at_risk']} клиентов под угрозой ухода")
+            lines.append(f"       Рекомендация: Провести emergency call сегодня")
+            for client_id, health, mrr in self.risk_index.riskiest_by_mrr(3):
+                # Запись могла исчезнуть из источника (удалена другим процессом) — показываем ID
+                client = self.store.get(client_id)
+                name = client['name'] if client is not None else f"ID {client_id}"
+                lines.append(f"       • {name} (Health {health}, MRR {mrr:,} руб.)")
         else:
-            print("[OK] Все клиенты в порядке!")
-            print("     Рекомендация: Продолжайте в том же духе")
-        print()
+            lines.append("[OK] Все клиенты в порядке!")
+            lines.append("     Рекомендация: Продолжайте в том же духе")
+        lines.append("")
+        return lines
 
-    def display_quick_actions(self):
+    def quick_action_lines(self):
         """Быстрые действия"""
-        print("БЫСТРЫЕ ДЕЙСТВИЯ")
-        print("-" * 50)
+        lines = ["БЫСТРЫЕ ДЕЙСТВИЯ", "-" * 50]
         
         actions = [
             ("Email Campaign", "Запустить email-рассылку"),
@@ -120,15 +231,15 @@ class Dashboard:
             title1, desc1 = actions[i]
             if i + 1 < len(actions):
                 title2, desc2 = actions[i + 1]
-                print(f"  {title1:<15} {desc1:<25} {title2:<15} {desc2}")
+                lines.append(f"  {title1:<15} {desc1:<25} {title2:<15} {desc2}")
             else:
-                print(f"  {title1:<15} {desc1}")
-        print()
+                lines.append(f"  {title1:<15} {desc1}")
+        lines.append("")
+        return lines
 
-    def display_menu(self):
+    def menu_lines(self):
         """Основное меню"""
-        print("ИНТЕРАКТИВНОЕ МЕНЮ")
-        print("-" * 50)
+        lines = ["ИНТЕРАКТИВНОЕ МЕНЮ", "-" * 50]
         
         menu_items = [
             ("1", "Детальный анализ клиента"),
@@ -145,64 +256,153 @@ class Dashboard:
             num1, text1 = menu_items[i]
             if i + 1 < len(menu_items):
                 num2, text2 = menu_items[i + 1]
-                print(f"  {num1}. {text1:<30} {num2}. {text2}")
+                lines.append(f"  {num1}. {text1:<30} {num2}. {text2}")
         
-        print("-" * 50)
+        lines.append("-" * 50)
+        return lines
+
+    def job_lines(self):
+        """Фоновые задачи и их прогресс"""
+        if not self.jobs.jobs:
+            return []
+        lines = ["ФОНОВЫЕ ЗАДАЧИ", "-" * 50]
+        lines.extend(job.status_line() for job in self.jobs.jobs)
+        if len(self.jobs.active) < len(self.jobs.jobs):
+            lines.append("  j — результаты завершенных задач")
+        lines.append("")
+        return lines
+
+    def screen_lines(self, rows):
+        """
+        Кадр дашборда под высоту терминала rows.
+        
+        Таблица клиентов получает все строки, оставшиеся от остальных регионов;
+        если их меньше MIN_PAGE_ROWS, убираются быстрые действия, затем логотип.
+        """
+        optional = [
+            ("logo", self._region("logo", None, lambda: LOGO.split("\n"))),
+            ("quick", self._region("quick", None, self.quick_action_lines)),
+        ]
+        header = self.header_lines()
+        metrics = self.metrics_lines()
+        recommendations = self._region("recommendations", self._version, self.recommendation_lines)
+        jobs = self.job_lines()
+        menu = self._region("menu", None, self.menu_lines) + [self.status]
+        
+        fixed = (len(header) + len(metrics) + len(recommendations) + len(jobs) + len(menu)
+                 + CLIENT_TABLE_CHROME + PROMPT_LINES)
+        free = rows - fixed - sum(len(lines) for _, lines in optional)
+        while optional and free < MIN_PAGE_ROWS:
+            free += len(optional.pop()[1])
+        self.set_page_size(max(free, MIN_PAGE_ROWS))
+        
+        clients = self._region("clients", (self.page, self.page_size, self._version), self.client_lines)
+        shown = dict(optional)
+        return [*shown.get("logo", ()), *header, *metrics, *clients,
+                *recommendations, *shown.get("quick", ()), *jobs, *menu]
+
+    def display_header(self):
+        print("\n".join(self.header_lines()))
+
+    def display_metrics(self):
+        print("\n".join(self.metrics_lines()))
+
+    def display_clients(self):
+        print("\n".join(self.client_lines()))
+
+    def display_ai_recommendations(self):
+        print("\n".join(self.recommendation_lines()))
+
+    def display_quick_actions(self):
+        print("\n".join(self.quick_action_lines()))
+
+    def handle_choice(self, choice):
+        """
+        Выполняет пункт меню.
+        
+        Возвращает True, если действие выводило текст поверх экрана дашборда
+        (экран нужно перерисовать целиком); листание, пустой ввод (обновить
+        прогресс фоновых задач) и неверный ввод только меняют кадр.
+        """
+        actions = {
+            "1": self.client_detail,
+            "2": self.email_generator,
+            "3": self.create_report,
+            "4": self.schedule_meetings,
+            "5": self.update_data,
+            "6": self.export_csv,
+            "7": self.settings,
+            "8": self.exit_program,
+            "j": self.job_results,
+        }
+        self.status = ""
+        if choice.lower() in actions:
+            actions[choice.lower()]()
+            return True
+        if not choice:
+            pass
+        elif choice.lower() == "n":
+            self.page = min(self.page + 1, self.page_count - 1)
+        elif choice.lower() == "p":
+            self.page = max(self.page - 1, 0)
+        else:
+            self.status = "[ERROR] Неверный выбор"
+        return False
+
+    def display_menu(self):
+        """Основное меню (без экранной модели: печать, ввод и выполнение пункта)"""
+        print("\n".join(self.menu_lines()))
         
         try:
-            choice = input("\nВыберите действие (1-8): ").strip()
-            
-            if choice == "1":
-                self.client_detail()
-            elif choice == "2":
-                self.email_generator()
-            elif choice == "3":
-                self.create_report()
-            elif choice == "4":
-                self.schedule_meetings()
-            elif choice == "5":
-                self.update_data()
-            elif choice == "6":
-                self.export_csv()
-            elif choice == "7":
-                self.settings()
-            elif choice == "8":
-                self.exit_program()
-            else:
-                print("\n[ERROR] Неверный выбор")
-                time.sleep(1)
-                
+            self.handle_choice(input("\nВыберите действие (1-8): ").strip())
+            if self.status:
+                print(f"\n{self.status}")
         except KeyboardInterrupt:
             print("\n\n[EXIT] Программа прервана")
             sys.exit(0)
 
+    def find_client(self, query):
+        """Клиент по ID или по началу слов названия (при нескольких совпадениях — выбор из списка)."""
+        client_id = int(query) if query.isdigit() else query
+        client = self.store.get(client_id) if client_id in self.client_index else None
+        if client is not None or not query:
+            return client
+        
+        matches = self.client_index.search(query, limit=10)
+        if len(matches) == 1:
+            return self.store.get(matches[0][0])
+        if not matches:
+            return None
+        print("\nНайдено несколько клиентов:")
+        for match_id, name in matches:
+            print(f"  {match_id:<8} {name}")
+        choice = input("\nВведите ID из списка: ").strip()
+        return self.store.get(int(choice) if choice.isdigit() else choice)
+
     def client_detail(self):
         """Детали клиента"""
         print("\nДЕТАЛЬНЫЙ АНАЛИЗ КЛИЕНТА")
         print("=" * 50)
         
-        try:
-            client_id = int(input(f"\nВведите ID клиента (1-{len(self.clients)}): "))
-            client = next((c for c in self.clients if c["id"] == client_id), None)
-            
-            if client:
-                print(f"\nКлиент: {client['name']}")
-                print(f"Тип: {client['type']}")
-                print(f"Health Score: {client['health']}/100")
-                print(f"MRR: {client['mrr']:,} руб.")
-                print(f"Риск оттока: {client['risk']}%")
-                print(f"Статус: {client['status']}")
-                print(f"\nКонтактная информация:")
-                print(f"  Email: contact@{client['name'].split()[0].lower()}.ru")
-                print(f"  Телефон: +7 (999) XXX-XX-XX")
-            else:
-                print("\n[ERROR] Клиент не найден")
-            
-            input("\nНажмите Enter для продолжения...")
-            
-        except ValueError:
-            print("\n[ERROR] Введите число")
-            time.sleep(1)
+        query = input(f"\nВведите ID клиента или начало названия (всего клиентов: {len(self.store)}): ").strip()
+        client = self.find_client(query)
+        
+        if client:
+            print(f"\nКлиент: {client['name']}")
+            print(f"Тип: {client['type']}")
+            print(f"Health Score: {client['health']}/100")
+            print(f"MRR: {client['mrr']:,} руб.")
+            print(f"Риск оттока: {client['risk']}%")
+            print(f"Статус: {client['status']}")
+            print(f"\nКонтактная информация:")
+            print(f"  Email: contact@{client['name'].split()[0].lower()}.ru")
+            print(f"  Телефон: +7 (999) XXX-XX-XX")
+        elif query:
+            print(f"\n[ERROR] Клиент '{query}' не найден: нет такого ID или названия")
+        else:
+            print("\n[ERROR] Введите ID клиента или начало названия")
+        
+        input("\nНажмите Enter для продолжения...")
 
     def email_generator(self):
         """Генератор писем"""
@@ -247,38 +447,51 @@ class Dashboard:
         print("  1. Еженедельный отчет")
         print("  2. Отчет по рискам")
         print("  3. Отчет по MRR")
-        print("  4. Назад")
-        
-        choice = input("\nВыберите тип (1-4): ")
-        
-        if choice in ["1", "2", "3"]:
-            print("\n[SYNC] Генерация отчета...")
-            time.sleep(1)
+        print("  4. Все отчеты")
+        print("  5. Назад")
+        
+        choice = input("\nВыберите тип (1-5): ")
+        kinds = {"1": ["weekly"], "2": ["risk"], "3": ["mrr"], "4": list(REPORT_KINDS)}.get(choice)
+        
+        if kinds:
+            answer = input(f"Форматы через запятую ({' / '.join(REPORT_FORMATS)}, Enter — все): ")
+            formats = [item.strip().lower() for item in answer.split(",") if item.strip()] or list(REPORT_FORMATS)
+            unknown = [fmt for fmt in formats if fmt not in REPORT_FORMATS]
+            if unknown:
+                print(f"\n[ERROR] Неизвестный формат: {', '.join(unknown)}")
+                input("\nНажмите Enter для продолжения...")
+                return
             
-            print("\n[OK] Отчет успешно создан!")
-            print(f"Тип: {'Еженедельный' if choice == '1' else 'Рисковый' if choice == '2' else 'MRR'}")
-            print(f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M')}")
-            print(f"Клиентов: {self.metrics['total_clients']}")
+            prefix = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            title = REPORT_KINDS[kinds[0]] if len(kinds) == 1 else "Все отчеты"
+            self.jobs.submit(f"Отчет ({title})", self._report_job, kinds, formats, prefix, self._version,
+                             total=len(kinds) * len(formats))
             
-            filename = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(f"Отчет по портфелю клиентов\n")
-                f.write(f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n")
-                f.write(f"Клиентов: {self.metrics['total_clients']}\n")
-                f.write(f"MRR: {self.metrics['total_mrr']:,} руб.\n")
-            
-            print(f"Файл: {filename}")
+            print("\n[SYNC] Отчет формируется в фоне — прогресс на главном экране")
+            print(f"Файлы: {prefix}_* ({', '.join(formats)})")
         
         input("\nНажмите Enter для продолжения...")
 
+    def _report_job(self, job, kinds, formats, prefix, version):
+        """Фоновая задача: отчеты по портфелю; агрегаты этой версии данных берутся из кеша."""
+        def load_items():
+            with open_reader(self.store) as source:
+                return list(source.index_items())
+        
+        files = self.reports.generate(load_items, kinds, formats, prefix, key=version, progress=job.advance)
+        return {"Отчеты": ", ".join(REPORT_KINDS[kind] for kind in kinds), "Файлы": files}
+
     def schedule_meetings(self):
         """Планирование встреч"""
         print("\nПЛАНИРОВАНИЕ ВСТРЕЧ")
         print("=" * 50)
         
         print("\nПредстоящие встречи:")
-        for client in self.clients:
+        upcoming = self.store.page(0, 10)
+        for client in upcoming:
             print(f"  • {client['name']} - {datetime.now().strftime('%d.%m')}")
+        if len(self.store) > len(upcoming):
+            print(f"  ... и еще {len(self.store) - len(upcoming):,}")
         
         print("\nДоступные действия:")
         print("  1. Запланировать новую встречу")
@@ -299,11 +512,8 @@ class Dashboard:
         print("\nОБНОВЛЕНИЕ ДАННЫХ")
         print("=" * 50)
         
-        print("\n[SYNC] Обновление метрик...")
-        time.sleep(1)
-        
-        old_mrr = self.metrics['total_mrr']
-        self.metrics['total_mrr'] = sum(c["mrr"] for c in self.clients)
+        # Метрики поддерживаются при каждом изменении — пересчет портфеля не нужен
+        old_mrr, self._synced_mrr = self._synced_mrr, self.metrics['total_mrr']
         
         print("\n[OK] Данные обновлены!")
         print(f"Текущий MRR: {self.metrics['total_mrr']:,} руб.")
@@ -315,47 +525,103 @@ class Dashboard:
         
         input("\nНажмите Enter для продолжения...")
 
+    def count_matching(self, client_filter):
+        """Сколько клиентов пройдет фильтр — по индексам, без чтения источника."""
+        if not client_filter:
+            return len(self.store)
+        ids = None
+        if client_filter.types:
+            ids = set().union(*map(self.client_index.ids_by_type, client_filter.types))
+        if client_filter.statuses:
+            by_status = set().union(*map(self.client_index.ids_by_status, client_filter.statuses))
+            ids = by_status if ids is None else ids & by_status
+        if client_filter.health_min is not None or client_filter.health_max is not None:
+            low = -math.inf if client_filter.health_min is None else client_filter.health_min
+            high = math.inf if client_filter.health_max is None else client_filter.health_max
+            by_health = {key for key, score in self.risk_index.in_range(low, math.inf) if score <= high}
+            ids = by_health if ids is None else ids & by_health
+        return len(ids)
+
+    def _ask_export_filter(self):
+        """Фильтр выгрузки по ответам пользователя (ValueError — некорректный диапазон health)."""
+        types = {client_type.lower(): client_type for client_type in self.client_index.types()}
+        statuses = {status.lower(): status for status in self.client_index.statuses()}
+
+        print("\nФильтр (Enter — без ограничения):")
+        answer = input(f"  Типы через запятую ({', '.join(sorted(types.values()))}): ")
+        selected_types = [types.get(item.strip().lower(), item.strip()) for item in answer.split(",") if item.strip()]
+        answer = input(f"  Статус ({' / '.join(sorted(statuses.values()))}): ").strip()
+        selected_statuses = [statuses.get(answer.lower(), answer)] if answer else []
+        low, _, high = input("  Health от-до (например 0-50): ").partition("-")
+        return ClientFilter(selected_types, selected_statuses,
+                            float(low) if low.strip() else None, float(high) if high.strip() else None)
+
     def export_csv(self):
         """Экспорт в CSV"""
         print("\nЭКСПОРТ В CSV")
         print("=" * 50)
-        
-        filename = f"csm_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        
+
         try:
-            print("\n[SAVE] Экспорт данных...")
-            time.sleep(1)
-            
-            with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                fieldnames = ['ID', 'Name', 'Type', 'Health', 'MRR', 'Risk', 'Status']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for client in self.clients:
-                    writer.writerow({
-                        'ID': client['id'],
-                        'Name': client['name'],
-                        'Type': client['type'],
-                        'Health': client['health'],
-                        'MRR': client['mrr'],
-                        'Risk': f"{client['risk']}%",
-                        'Status': client['status']
-                    })
-            
-            print("\n[OK] Данные успешно экспортированы!")
-            print(f"Файл: {filename}")
-            print(f"Записей: {len(self.clients)}")
-            
-            preview = input("\nПоказать первые 3 строки? (y/n): ").lower()
-            if preview == 'y':
-                print("\nПРЕДПРОСМОТР:")
-                with open(filename, 'r', encoding='utf-8-sig') as f:
-                    for i, line in enumerate(f):
-                        if i < 4:
-                            print(f"  {line.strip()}")
-            
-        except Exception as e:
-            print(f"\n[ERROR] Ошибка экспорта: {e}")
+            client_filter = self._ask_export_filter()
+        except ValueError:
+            print("\n[ERROR] Health: введите числа, например 0-50")
+            input("\nНажмите Enter для продолжения...")
+            return
+        extension = input("  Формат (csv / cols — колоночный, Enter — csv): ").strip().lower() or "csv"
+        if extension not in ("csv", "cols"):
+            print(f"\n[ERROR] Неизвестный формат: {extension}")
+            input("\nНажмите Enter для продолжения...")
+            return
+        compression = None
+        if extension == "csv":
+            compressions = available_compressions()
+            compression = input(f"  Сжатие ({' / '.join(compressions)} / Enter — без сжатия): ").strip().lower() or None
+            if compression is not None and compression not in compressions:
+                print(f"\n[ERROR] Неизвестное сжатие: {compression}")
+                input("\nНажмите Enter для продолжения...")
+                return
+
+        total = self.count_matching(client_filter)
+        if not total:
+            print(f"\n[INFO] Нет клиентов по фильтру: {client_filter.describe()}")
+            input("\nНажмите Enter для продолжения...")
+            return
+
+        filename = f"csm_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        if compression:
+            filename += f".{compression}"
+        self.jobs.submit(f"Экспорт в {extension.upper()}", self._export_job, filename, client_filter, total=total)
+
+        print("\n[SAVE] Экспорт запущен в фоне — прогресс на главном экране")
+        print(f"Файл: {filename}")
+        print(f"Фильтр: {client_filter.describe()}")
+        print(f"Записей: {total}")
+
+        input("\nНажмите Enter для продолжения...")
+
+    def _export_job(self, job, filename, client_filter):
+        """Фоновая задача: потоковая выгрузка клиентов по фильтру с прогрессом по пачкам."""
+        with open_reader(self.store) as source:
+            exported, preview = export_clients(source.select(client_filter), filename, progress=job.advance)
+        return {"Файл": filename, "Фильтр": client_filter.describe(), "Записей": exported, "Предпросмотр": preview}
+
+    def job_results(self):
+        """Результаты завершенных фоновых задач"""
+        print("\nРЕЗУЛЬТАТЫ ФОНОВЫХ ЗАДАЧ")
+        print("=" * 50)
+        
+        finished = self.jobs.pop_finished()
+        if not finished:
+            print("\n[INFO] Завершенных задач нет")
+        for job in finished:
+            print(f"\n{job.status_line().strip()}")
+            for label, value in (job.result or {}).items():
+                if isinstance(value, list):
+                    print(f"{label}:")
+                    for line in value:
+                        print(f"  {line}")
+                else:
+                    print(f"{label}: {value}")
         
         input("\nНажмите Enter для продолжения...")
 
@@ -389,36 +655,39 @@ class Dashboard:
         print("\nВЫХОД ИЗ ПРОГРАММЫ")
         print("=" * 50)
         
-        print("\n[SAVE] Сохранение данных...")
-        time.sleep(1)
+        if self.jobs.active:
+            print("\n[SAVE] Завершение фоновых задач...")
+            self.jobs.wait(on_progress=lambda active: print(
+                "\r" + " | ".join(job.status_line().strip() for job in active), end="", flush=True))
+            print()
+        self.jobs.shutdown()
         
         print("\n[OK] Статистика за сессию:")
-        print(f"  • Клиентов просмотрено: {len(self.clients)}")
+        print(f"  • Клиентов просмотрено: {len(self.store)}")
         print(f"  • Общий MRR: {self.metrics['total_mrr']:,} руб.")
         print(f"  • Средний Health Score: {self.metrics['avg_health']}")
         print(f"  • Клиентов в риске: {self.metrics['at_risk']}")
+        self.store.close()
         
         print("\nСпасибо за использование CSM Dashboard Pro!")
-        time.sleep(2)
         sys.exit(0)
 
     def run(self):
-        """Основной цикл"""
+        """Основной цикл: кадр перерисовывается построчно, только изменившиеся строки"""
+        screen = Screen()
         while True:
             try:
-                os.system('cls' if os.name == 'nt' else 'clear')
-                
-                display_logo()
-                self.display_header()
-                self.display_metrics()
-                self.display_clients()
-                self.display_ai_recommendations()
-                self.display_quick_actions()
-                self.display_menu()
+                screen.resize()
+                screen.render(self.screen_lines(screen.rows))
+                if self.handle_choice(input("Выберите действие (1-8, n/p — страницы, Enter — обновить): ").strip()):
+                    screen.invalidate()
                 
+            except (KeyboardInterrupt, EOFError):
+                print("\n\n[EXIT] Программа прервана")
+                sys.exit(0)
             except Exception as e:
-                print(f"\n[ERROR] Неожиданная ошибка: {e}")
-                time.sleep(2)
+                self.status = f"[ERROR] Неожиданная ошибка: {e}"
+                screen.invalidate()
                 continue
 
 # ================== ЗАПУСК ==================
@@ -428,9 +697,12 @@ if __name__ == "__main__":
         print("ЗАПУСК CSM DASHBOARD PRO v3.5")
         print("=" * 70)
         
-        time.sleep(1)
+        parser = argparse.ArgumentParser(description="CSM Dashboard Pro")
+        parser.add_argument("source", nargs="?", help="Портфель: CSV, JSONL, SQLite или .cols (по умолчанию демо-данные)")
+        parser.add_argument("--table", default="clients", help="Таблица SQLite (по умолчанию clients)")
+        args = parser.parse_args()
         
-        app = Dashboard()
+        app = Dashboard(open_store(args.source, args.table) if args.source else None)
         app.run()
         
     except KeyboardInterrupt:
@@ -3,9 +3,255 @@
 Скрипт для расчета "индекса здоровья" клиента (Customer Health Score).
 Анализирует активность, использование функций, своевременность оплат и удовлетворенность (NPS).
 Помогает выявить рисковых клиентов и opportunities для апсейла.
+
+Запуск без аргументов — демонстрация на примере портфеля.
+Потоковый расчет по выгрузке (CSV или JSONL, в т.ч. .gz):
+    python cs_score_calculator.py clients.csv -o scored.jsonl --chunk-size 50000
+Параллельный расчет на нескольких ядрах:
+    python cs_score_calculator.py clients.csv -o scored.csv --workers 8
+Колоночный файл .cols (columnar.py) — на входе и на выходе:
+    python cs_score_calculator.py clients.cols -o scored.cols
 """
 
-def calculate_client_health_score(logins_last_30d, feature_usage, days_since_payment, last_nps):
+import argparse
+import contextlib
+import csv
+import gzip
+import heapq
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from columnar import COLUMNAR_SUFFIX, NUMERIC_TYPES, ColumnarTable, ColumnBuffer
+
+try:
+    import numpy as np
+except ImportError:  # NumPy не обязателен: пакетный расчет работает и на чистом Python
+    np = None
+
+
+# Коды статусов для пакетного расчета (индексы в STATUS_LABELS / RECOMMENDATIONS)
+HEALTHY, STABLE, RISKY = 0, 1, 2
+
+STATUS_LABELS = ("💚 ЗДОРОВЫЙ", "💛 СТАБИЛЬНЫЙ", "🔴 РИСКОВЫЙ")
+
+RECOMMENDATIONS = (
+    "Клиент в отличном состоянии. Возможен апсейл или привлечение к реферальной программе.",
+    "Требуется профилактический контакт. Уточнить удовлетворенность и предложить обучение.",
+    "КРИТИЧЕСКИЙ РИСК ОТТОКА! Срочно назначить звонок, выяснить проблему, подготовить спец. условия.",
+)
+
+
+STATUS_RECOMMENDATIONS = dict(zip(STATUS_LABELS, RECOMMENDATIONS))
+
+METRIC_NAMES_RU = {
+    "activity": "Активность",
+    "usage": "Использование",
+    "payment": "Оплаты",
+    "nps": "Лояльность (NPS)"
+}
+
+# Параметры модели по умолчанию (можно менять под логику бизнеса
+# или задать свои в JSON-файле, см. ScoringModel.from_file)
+DEFAULT_MODEL_CONFIG = {
+    "name": "default",
+    "weights": {
+        "activity": 0.4,   # Вес активности (логины)
+        "usage": 0.3,      # Вес использования функций
+        "payment": 0.2,    # Вес своевременности оплат
+        "nps": 0.1         # Вес лояльности (NPS)
+    },
+    "caps": {
+        "logins": 20,        # 20+ логинов в месяц = 100 баллов
+        "features": 10,      # 10+ функций = 100 баллов
+        "payment_days": 90   # Оплата старше 90 дней = 0 баллов
+    },
+    "nps_default": 50,       # Балл NPS, если он не измерялся
+    "thresholds": {
+        "healthy": 80,       # От 80 баллов — здоровый
+        "stable": 60         # От 60 баллов — стабильный
+    }
+}
+
+
+def _is_number(value):
+    """Число из конфигурации модели: int или float, но не bool, NaN или бесконечность."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+class ScoringModel:
+    """
+    Модель расчета health score: веса, нормировки и пороги статусов.
+    
+    Конфигурация проверяется один раз при создании, после чего параметры
+    "компилируются" в замыкание со связанными константами (для поштучного
+    расчета) и в кортеж коэффициентов (для векторного расчета). Несколько
+    моделей можно применять к одним и тем же колонкам для A/B-сравнения.
+    """
+    
+    def __init__(self, config=None):
+        """
+        Аргументы:
+            config (dict): Параметры в формате DEFAULT_MODEL_CONFIG; отсутствующие
+                разделы берутся из значений по умолчанию.
+        """
+        config = config or {}
+        if not isinstance(config, dict):
+            raise ValueError("Конфигурация модели должна быть объектом JSON")
+        for section in ("weights", "caps", "thresholds"):
+            if not isinstance(config.get(section, {}), dict):
+                raise ValueError(f"Раздел {section} должен быть объектом {{параметр: число}}")
+        self.name = str(config.get("name", DEFAULT_MODEL_CONFIG["name"]))
+        self.weights = {**DEFAULT_MODEL_CONFIG["weights"], **config.get("weights", {})}
+        self.caps = {**DEFAULT_MODEL_CONFIG["caps"], **config.get("caps", {})}
+        self.nps_default = config.get("nps_default", DEFAULT_MODEL_CONFIG["nps_default"])
+        self.thresholds = {**DEFAULT_MODEL_CONFIG["thresholds"], **config.get("thresholds", {})}
+        self._validate(config)
+        self._compile()
+    
+    @classmethod
+    def from_file(cls, path):
+        """Загружает модель из JSON-файла конфигурации."""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+    
+    def _validate(self, config):
+        unknown = set(config) - set(DEFAULT_MODEL_CONFIG)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры модели: {', '.join(sorted(unknown))}")
+        if set(self.weights) != set(DEFAULT_MODEL_CONFIG["weights"]):
+            raise ValueError("Веса должны задаваться для activity, usage, payment и nps")
+        if any(not _is_number(w) or w < 0 for w in self.weights.values()):
+            raise ValueError("Веса должны быть неотрицательными числами")
+        if abs(sum(self.weights.values()) - 1) > 1e-9:
+            raise ValueError(f"Сумма весов должна быть равна 1, получено {sum(self.weights.values())}")
+        if set(self.caps) != set(DEFAULT_MODEL_CONFIG["caps"]):
+            raise ValueError("Нормировки должны задаваться для logins, features и payment_days")
+        if any(not _is_number(c) or c <= 0 for c in self.caps.values()):
+            raise ValueError("Нормировки должны быть положительными числами")
+        if not _is_number(self.nps_default) or not 0 <= self.nps_default <= 100:
+            raise ValueError("nps_default должен быть числом в диапазоне 0..100")
+        if set(self.thresholds) != set(DEFAULT_MODEL_CONFIG["thresholds"]):
+            raise ValueError("Пороги должны задаваться только для healthy и stable")
+        if not all(map(_is_number, self.thresholds.values())):
+            raise ValueError("Пороги должны быть числами")
+        if not 0 <= self.thresholds["stable"] < self.thresholds["healthy"] <= 100:
+            raise ValueError("Пороги должны удовлетворять 0 <= stable < healthy <= 100")
+    
+    def _compile(self):
+        """Связывает параметры в локальные константы и коэффициенты."""
+        cap_logins, cap_features = self.caps["logins"], self.caps["features"]
+        cap_days = self.caps["payment_days"]
+        w_activity, w_usage = self.weights["activity"], self.weights["usage"]
+        w_payment, w_nps = self.weights["payment"], self.weights["nps"]
+        nps_default = self.nps_default
+        healthy, stable = self.thresholds["healthy"], self.thresholds["stable"]
+        
+        # Коэффициенты для векторного расчета
+        self.coefficients = (cap_logins, cap_features, cap_days,
+                             w_activity, w_usage, w_payment, w_nps,
+                             nps_default, healthy, stable)
+        
+        def components(logins, features, days_payment, nps):
+            return (
+                min(logins / cap_logins, 1) * 100,
+                min(features / cap_features, 1) * 100,
+                max(0, (cap_days - days_payment) / cap_days) * 100,
+                ((nps + 10) / 20) * 100 if nps is not None else nps_default,
+            )
+        
+        def total(logins, features, days_payment, nps):
+            activity, usage, payment, nps_score = components(logins, features, days_payment, nps)
+            return activity * w_activity + usage * w_usage + payment * w_payment + nps_score * w_nps
+        
+        def status_code(total_score):
+            if total_score >= healthy:
+                return HEALTHY
+            if total_score >= stable:
+                return STABLE
+            return RISKY
+        
+        self.components = components
+        self.total = total
+        self.status_code = status_code
+    
+    def to_dict(self):
+        """Конфигурация модели (для сохранения и сравнения)."""
+        return {
+            "name": self.name,
+            "weights": dict(self.weights),
+            "caps": dict(self.caps),
+            "nps_default": self.nps_default,
+            "thresholds": dict(self.thresholds),
+        }
+    
+    @property
+    def signature(self):
+        """Строка, однозначно описывающая параметры модели (без имени)."""
+        config = self.to_dict()
+        del config["name"]
+        return json.dumps(config, sort_keys=True)
+    
+    # Замыкания не сериализуются pickle — передаем в процессы только конфигурацию
+    def __getstate__(self):
+        return self.to_dict()
+    
+    def __setstate__(self, state):
+        self.__init__(state)
+    
+    def __repr__(self):
+        return f"ScoringModel({self.name!r})"
+
+
+DEFAULT_MODEL = ScoringModel()
+
+# Веса модели по умолчанию (оставлены для обратной совместимости)
+WEIGHTS = DEFAULT_MODEL.weights
+
+
+def format_score_details(logins_last_30d, feature_usage, days_since_payment, last_nps, model=None):
+    """
+    Формирует детализацию баллов по метрикам (для отчетов и карточки клиента).
+    
+    Вызывается только по требованию: при массовом расчете строки не форматируются.
+    """
+    model = model or DEFAULT_MODEL
+    activity_score, usage_score, payment_score, nps_score = model.components(
+        logins_last_30d, feature_usage, days_since_payment, last_nps
+    )
+    weights = model.weights
+    return {
+        "activity": {
+            "value": logins_last_30d,
+            "score": round(activity_score),
+            "weight": f"{weights['activity']*100:.0f}%"
+        },
+        "usage": {
+            "value": feature_usage,
+            "score": round(usage_score),
+            "weight": f"{weights['usage']*100:.0f}%"
+        },
+        "payment": {
+            "value": f"{days_since_payment} дн. назад",
+            "score": round(payment_score),
+            "weight": f"{weights['payment']*100:.0f}%"
+        },
+        "nps": {
+            "value": last_nps,
+            "score": round(nps_score),
+            "weight": f"{weights['nps']*100:.0f}%"
+        }
+    }
+
+
+def calculate_client_health_score(logins_last_30d, feature_usage, days_since_payment, last_nps,
+                                  with_details=True, model=None):
     """
     Рассчитывает интегральный показатель здоровья клиента от 0 до 100.
     
@@ -14,159 +260,1000 @@ def calculate_client_health_score(logins_last_30d, feature_usage, days_since_pay
         feature_usage (int): Количество используемых функций продукта.
         days_since_payment (int): Дней с момента последней оплаты.
         last_nps (int): Последний Net Promoter Score от клиента (шкала -10 до +10).
+        with_details (bool): Добавлять ли детализацию баллов по метрикам.
+        model (ScoringModel): Модель расчета (по умолчанию DEFAULT_MODEL).
     
     Возвращает:
         dict: Словарь с результатами расчета, статусом и рекомендациями.
     """
-    # Веса критериев (можно менять под логику бизнеса)
-    weights = {
-        'activity': 0.4,   # Вес активности (логины)
-        'usage': 0.3,      # Вес использования функций
-        'payment': 0.2,    # Вес своевременности оплат
-        'nps': 0.1         # Вес лояльности (NPS)
-    }
+    model = model or DEFAULT_MODEL
     
-    # 1. НОРМАЛИЗАЦИЯ КАЖДОЙ МЕТРИКИ ДО 100 БАЛЛОВ
-    # Активность: 20+ логинов в месяц = идеально (100 баллов)
-    activity_score = min(logins_last_30d / 20, 1) * 100
+    # 1-2. НОРМАЛИЗАЦИЯ МЕТРИК ДО 100 БАЛЛОВ И ИТОГОВЫЙ SCORE С УЧЕТОМ ВЕСОВ
+    total_score = model.total(logins_last_30d, feature_usage, days_since_payment, last_nps)
     
-    # Использование функций: 10+ функций = идеально (100 баллов)
-    usage_score = min(feature_usage / 10, 1) * 100
+    # 3. ОПРЕДЕЛЕНИЕ СТАТУСА И РЕКОМЕНДАЦИЙ
+    code = model.status_code(total_score)
     
-    # Оплаты: если оплата была в последние 90 дней - 100 баллов, позже - снижается
-    payment_score = max(0, (90 - days_since_payment) / 90) * 100
+    # 4. ФОРМИРОВАНИЕ РЕЗУЛЬТАТА
+    result = {
+        "score": round(total_score, 1),
+        "status": STATUS_LABELS[code],
+        "recommendation": RECOMMENDATIONS[code],
+    }
+    if with_details:
+        result["details"] = format_score_details(
+            logins_last_30d, feature_usage, days_since_payment, last_nps, model
+        )
+    return result
+
+
+def _round1_numpy(values):
+    """
+    Округляет массив до 0.1 так же, как встроенный round().
     
-    # NPS: преобразуем из шкалы -10..+10 в 0..100 баллов
-    nps_score = ((last_nps + 10) / 20) * 100 if last_nps is not None else 50  # 50 по умолчанию
+    np.round умножает на 10 и может ошибиться на пограничных значениях вида x.x5,
+    поэтому такие элементы доокругляются через round().
+    """
+    rounded = np.round(values, 1)
+    scaled = values * 10
+    suspicious = np.nonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)[0]
+    for i in suspicious:
+        rounded[i] = round(float(values[i]), 1)
+    return rounded
+
+
+def prepare_columns(columns, use_numpy=None):
+    """
+    Приводит колонки к виду для пакетного расчета (один раз на несколько моделей).
     
-    # 2. РАСЧЕТ ИТОГОВОГО SCORE С УЧЕТОМ ВЕСОВ
-    total_score = (
-        activity_score * weights['activity'] +
-        usage_score * weights['usage'] +
-        payment_score * weights['payment'] +
-        nps_score * weights['nps']
-    )
+    Возвращает:
+        tuple: (logins, features, days_payment, nps, nps_missing) — массивы NumPy
+        либо списки (без NumPy; пропуски NPS — None, маска не нужна).
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    logins, features, days_payment = columns["logins"], columns["features"], columns["days_payment"]
+    nps, nps_missing = columns["nps"], columns.get("nps_missing")
     
-    # 3. ОПРЕДЕЛЕНИЕ СТАТУСА И РЕКОМЕНДАЦИЙ
-    if total_score >= 80:
-        status = "💚 ЗДОРОВЫЙ"
-        recommendation = "Клиент в отличном состоянии. Возможен апсейл или привлечение к реферальной программе."
-    elif total_score >= 60:
-        status = "💛 СТАБИЛЬНЫЙ"
-        recommendation = "Требуется профилактический контакт. Уточнить удовлетворенность и предложить обучение."
+    if not use_numpy:
+        if nps_missing is not None:
+            nps = [None if missing else v for v, missing in zip(nps, nps_missing)]
+        return list(logins), list(features), list(days_payment), list(nps), None
+    
+    if nps_missing is None:
+        if isinstance(nps, np.ndarray) and nps.dtype != object:
+            nps = nps.astype(np.float64)
+            nps_missing = np.isnan(nps)
+        else:
+            nps_missing = np.array([v is None for v in nps], dtype=bool)
+            nps = np.array([0 if v is None else v for v in nps], dtype=np.float64)
     else:
-        status = "🔴 РИСКОВЫЙ"
-        recommendation = "КРИТИЧЕСКИЙ РИСК ОТТОКА! Срочно назначить звонок, выяснить проблему, подготовить спец. условия."
+        nps_missing = np.asarray(nps_missing, dtype=bool)
+        nps = np.asarray(nps, dtype=np.float64)
+    return (
+        np.asarray(logins, dtype=np.float64),
+        np.asarray(features, dtype=np.float64),
+        np.asarray(days_payment, dtype=np.float64),
+        np.where(nps_missing, 0.0, nps),
+        nps_missing,
+    )
+
+
+def _batch_numpy(prepared, model):
+    """Векторизованный расчет через NumPy (тот же порядок операций, что и в скалярной версии)."""
+    logins, features, days_payment, nps, nps_missing = prepared
+    (cap_logins, cap_features, cap_days, w_activity, w_usage, w_payment, w_nps,
+     nps_default, healthy, stable) = model.coefficients
     
-    # 4. ФОРМИРОВАНИЕ РЕЗУЛЬТАТА
-    return {
-        "score": round(total_score, 1),
-        "status": status,
-        "recommendation": recommendation,
-        "details": {
-            "activity": {
-                "value": logins_last_30d,
-                "score": round(activity_score),
-                "weight": f"{weights['activity']*100:.0f}%"
-            },
-            "usage": {
-                "value": feature_usage,
-                "score": round(usage_score),
-                "weight": f"{weights['usage']*100:.0f}%"
-            },
-            "payment": {
-                "value": f"{days_since_payment} дн. назад",
-                "score": round(payment_score),
-                "weight": f"{weights['payment']*100:.0f}%"
-            },
-            "nps": {
-                "value": last_nps,
-                "score": round(nps_score),
-                "weight": f"{weights['nps']*100:.0f}%"
-            }
-        }
-    }
+    activity = np.minimum(logins / cap_logins, 1) * 100
+    usage = np.minimum(features / cap_features, 1) * 100
+    payment = np.maximum(0, (cap_days - days_payment) / cap_days) * 100
+    nps_score = np.where(nps_missing, float(nps_default), ((nps + 10) / 20) * 100)
+    
+    total = activity * w_activity + usage * w_usage + payment * w_payment + nps_score * w_nps
+    status = np.full(total.shape, RISKY, dtype=np.int8)
+    status[total >= stable] = STABLE
+    status[total >= healthy] = HEALTHY
+    return _round1_numpy(total), status
 
 
-def analyze_client_portfolio(clients_data):
+def _batch_python(prepared, model):
+    """Пакетный расчет на чистом Python (если NumPy не установлен)."""
+    logins, features, days_payment, nps, _ = prepared
+    total, status_code = model.total, model.status_code
+    totals = list(map(total, logins, features, days_payment, nps))
+    return [round(t, 1) for t in totals], list(map(status_code, totals))
+
+
+def calculate_health_scores_batch(columns, use_numpy=None, model=None):
     """
-    Анализирует портфель клиентов и выводит сводный отчет.
+    Пакетный расчет health score для портфеля в колоночном формате.
     
     Аргументы:
-        clients_data (list): Список словарей с данными клиентов.
+        columns (dict): Колонки одинаковой длины — "logins", "features",
+            "days_payment", "nps" (списки или массивы NumPy). Пропуски NPS
+            задаются значением None/NaN или булевой маской "nps_missing".
+        use_numpy (bool): Принудительно включить/выключить NumPy
+            (по умолчанию — если библиотека установлена).
+        model (ScoringModel): Модель расчета (по умолчанию DEFAULT_MODEL).
+    
+    Возвращает:
+        dict: {"score": баллы (округлены до 0.1), "status": коды статусов
+        HEALTHY/STABLE/RISKY}. Подписи статусов — STATUS_LABELS[код].
     """
-    print("\n" + "="*70)
-    print("📊 ПОЛНЫЙ АНАЛИЗ ЗДОРОВЬЯ КЛИЕНТСКОГО ПОРТФЕЛЯ")
-    print("="*70)
+    return score_batch_models(columns, [model or DEFAULT_MODEL], use_numpy)[0]
+
+
+def score_batch_models(columns, models, use_numpy=None):
+    """
+    Считает одни и те же колонки сразу по нескольким моделям (A/B-сравнение весов).
     
-    portfolio_stats = {
-        "💚 ЗДОРОВЫЙ": 0,
-        "💛 СТАБИЛЬНЫЙ": 0, 
-        "🔴 РИСКОВЫЙ": 0
-    }
+    Колонки подготавливаются один раз, каждая модель применяет только
+    свои предкомпилированные коэффициенты.
     
-    for client in clients_data:
-        # Расчет health score для каждого клиента
+    Возвращает:
+        list: Результаты в формате calculate_health_scores_batch — по одному на модель.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    prepared = prepare_columns(columns, use_numpy)
+    batch = _batch_numpy if use_numpy else _batch_python
+    results = []
+    for model in models:
+        scores, statuses = batch(prepared, model)
+        results.append({"score": scores, "status": statuses})
+    return results
+
+
+class PortfolioAggregator:
+    """
+    Потоковый агрегатор статистики по портфелю за один проход.
+    
+    Хранит не список клиентов, а гистограмму баллов с шагом 0.1 (не более
+    ~1000 корзин), поэтому память не растет с размером портфеля, а минимум,
+    максимум и перцентили считаются точно по округленным баллам.
+    """
+    
+    def __init__(self, segment_field=None):
+        """
+        Аргументы:
+            segment_field (str): Поле клиента для разбивки по сегментам
+                (например, "segment" или "type"). None — без разбивки.
+        """
+        self.segment_field = segment_field
+        self.count = 0
+        self.status_counts = dict.fromkeys(STATUS_LABELS, 0)
+        self.segments = {}
+        self._sum_tenths = 0     # Сумма баллов в десятых долях (целое — без ошибок округления)
+        self._histogram = {}     # балл*10 -> количество клиентов
+    
+    def add(self, score, status, segment=None):
+        """Учитывает один рассчитанный балл (score уже округлен до 0.1)."""
+        tenths = round(score * 10)
+        self.count += 1
+        self._sum_tenths += tenths
+        self._histogram[tenths] = self._histogram.get(tenths, 0) + 1
+        self.status_counts[status] += 1
+        if segment is not None:
+            sub = self.segments.get(segment)
+            if sub is None:
+                sub = self.segments[segment] = PortfolioAggregator()
+            sub.add(score, status)
+    
+    def add_batch(self, scores, statuses, segments=None):
+        """
+        Учитывает пачку баллов из calculate_health_scores_batch: scores — округлены
+        до 0.1, statuses — коды HEALTHY/STABLE/RISKY, segments — значения сегмента.
+        """
+        if np is None or not isinstance(scores, np.ndarray):
+            segments = [None] * len(scores) if segments is None else segments
+            for score, code, segment in zip(scores, statuses, segments):
+                self.add(score, STATUS_LABELS[code], segment)
+            return
+        
+        tenths = np.rint(scores * 10).astype(np.int64)
+        values, counts = np.unique(tenths, return_counts=True)
+        for value, n in zip(values.tolist(), counts.tolist()):
+            self._histogram[value] = self._histogram.get(value, 0) + n
+        self.count += len(tenths)
+        self._sum_tenths += int(tenths.sum())
+        for code, n in enumerate(np.bincount(statuses, minlength=len(STATUS_LABELS)).tolist()):
+            self.status_counts[STATUS_LABELS[code]] += n
+        if segments is not None:
+            segments = np.asarray(segments, dtype=object)
+            for segment in set(segments.tolist()):
+                if segment is None:
+                    continue
+                mask = segments == segment
+                sub = self.segments.get(segment)
+                if sub is None:
+                    sub = self.segments[segment] = PortfolioAggregator()
+                sub.add_batch(scores[mask], statuses[mask])
+    
+    def add_client(self, client, model=None):
+        """Рассчитывает health score клиента, учитывает его и возвращает результат."""
         result = calculate_client_health_score(
             logins_last_30d=client["logins"],
             feature_usage=client["features"],
             days_since_payment=client["days_payment"],
-            last_nps=client.get("nps")  # Используем .get() на случай отсутствия NPS
+            last_nps=client.get("nps"),  # Используем .get() на случай отсутствия NPS
+            with_details=False,
+            model=model
         )
+        segment = client.get(self.segment_field) if self.segment_field else None
+        self.add(result["score"], result["status"], segment)
+        return result
+    
+    def consume(self, clients, model=None):
+        """Учитывает клиентов из любого итерируемого источника (списка, генератора, файла)."""
+        for client in clients:
+            self.add_client(client, model)
+        return self
+    
+    def remove(self, score, status, segment=None):
+        """Исключает ранее учтенный балл (для инкрементального пересчета)."""
+        tenths = round(score * 10)
+        self.count -= 1
+        self._sum_tenths -= tenths
+        left = self._histogram[tenths] - 1
+        if left:
+            self._histogram[tenths] = left
+        else:
+            del self._histogram[tenths]
+        self.status_counts[status] -= 1
+        if segment is not None:
+            sub = self.segments[segment]
+            sub.remove(score, status)
+            if not sub.count:
+                del self.segments[segment]
+    
+    def merge(self, other):
+        """Добавляет статистику другого агрегатора (например, по другой части портфеля)."""
+        self.count += other.count
+        self._sum_tenths += other._sum_tenths
+        for tenths, n in other._histogram.items():
+            self._histogram[tenths] = self._histogram.get(tenths, 0) + n
+        for status, n in other.status_counts.items():
+            self.status_counts[status] += n
+        for segment, sub in other.segments.items():
+            if segment not in self.segments:
+                self.segments[segment] = PortfolioAggregator()
+            self.segments[segment].merge(sub)
+        return self
+    
+    def to_dict(self):
+        """Состояние агрегатора для сохранения (JSON-совместимое)."""
+        return {
+            "segment_field": self.segment_field,
+            "count": self.count,
+            "sum_tenths": self._sum_tenths,
+            "histogram": {str(tenths): n for tenths, n in self._histogram.items()},
+            "statuses": dict(self.status_counts),
+            "segments": {str(name): sub.to_dict() for name, sub in self.segments.items()},
+        }
+    
+    @classmethod
+    def from_dict(cls, state):
+        """Восстанавливает агрегатор из состояния, полученного через to_dict()."""
+        stats = cls(state.get("segment_field"))
+        stats.count = state["count"]
+        stats._sum_tenths = state["sum_tenths"]
+        stats._histogram = {int(tenths): n for tenths, n in state["histogram"].items()}
+        stats.status_counts.update(state["statuses"])
+        stats.segments = {name: cls.from_dict(sub) for name, sub in state["segments"].items()}
+        return stats
+    
+    @property
+    def mean(self):
+        """Средний health score (0, если клиентов нет)."""
+        return self._sum_tenths / 10 / self.count if self.count else 0
+    
+    @property
+    def min(self):
+        return min(self._histogram) / 10 if self._histogram else None
+    
+    @property
+    def max(self):
+        return max(self._histogram) / 10 if self._histogram else None
+    
+    def percentile(self, q):
+        """Перцентиль q (0..100) с линейной интерполяцией между соседними значениями."""
+        if not self.count:
+            return None
+        rank = (self.count - 1) * q / 100
+        lower_rank = int(rank)
+        upper_rank = min(lower_rank + 1, self.count - 1)
+        lower = upper = None
+        seen = 0
+        for tenths in sorted(self._histogram):
+            seen += self._histogram[tenths]
+            if lower is None and seen > lower_rank:
+                lower = tenths / 10
+            if seen > upper_rank:
+                upper = tenths / 10
+                break
+        return round(lower + (upper - lower) * (rank - lower_rank), 1)
+    
+    def summary(self):
+        """Сводка в виде словаря (для отчетов и выгрузки)."""
+        return {
+            "clients": self.count,
+            "statuses": dict(self.status_counts),
+            "average_score": round(self.mean, 1),
+            "min_score": self.min,
+            "max_score": self.max,
+            "p25": self.percentile(25),
+            "median": self.percentile(50),
+            "p75": self.percentile(75),
+            "p90": self.percentile(90),
+            "segments": {name: sub.summary() for name, sub in self.segments.items()},
+        }
+
+
+# =================== ФОРМИРОВАНИЕ ОТЧЕТОВ ===================
+REPORT_LEVELS = ("summary", "top", "full")
+REPORT_FORMATS = ("text", "json", "csv")
+CLIENT_REPORT_FIELDS = ("name", "score", "status", "activity", "usage", "payment", "nps")
+
+
+class AtRiskTop:
+    """
+    N клиентов с наименьшим health score (куча фиксированного размера).
+    
+    При равных баллах выше в списке тот, кто встретился раньше; merge()
+    сохраняет этот порядок, поэтому итог по шардам совпадает с однопроцессным.
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self.seen = 0
+        self._heap = []  # (-score, -порядковый номер, запись) — на вершине худший кандидат
+    
+    def _push(self, score, order, record_factory):
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, (-score, -order, record_factory()))
+        elif (score, order) < (-self._heap[0][0], -self._heap[0][1]):
+            heapq.heapreplace(self._heap, (-score, -order, record_factory()))
+    
+    def add_client(self, client, score, status):
+        """Учитывает клиента; запись создается, только если он попадает в топ."""
+        self.seen += 1
+        if self.size > 0:
+            self._push(score, self.seen, lambda: {
+                "id": client.get("id"), "name": client.get("name"), "score": score, "status": status
+            })
+    
+    def merge(self, other):
+        """Добавляет топ другой части портфеля, обработанной после этой."""
+        offset = self.seen
+        for neg_score, neg_order, record in other._heap:
+            self._push(-neg_score, offset - neg_order, lambda record=record: record)
+        self.seen += other.seen
+        return self
+    
+    def items(self):
+        """Записи топа от самого рискового к менее рисковому."""
+        return [record for _, _, record in sorted(self._heap, key=lambda item: (-item[0], -item[1]))]
+
+
+class PortfolioRenderer:
+    """
+    Буферизованный вывод отчета по портфелю.
+    
+    Уровни детализации: "summary" — только сводка, "top" — сводка и топ-N
+    рисковых клиентов, "full" — все клиенты с детализацией баллов.
+    Форматы: "text" (для людей), "json" и "csv" (для последующей обработки).
+    Текст копится в буфере и пишется в поток крупными блоками.
+    """
+    
+    def __init__(self, stream=None, level="full", fmt="text", top_n=10, buffer_size=256 * 1024,
+                 model=None):
+        if level not in REPORT_LEVELS:
+            raise ValueError(f"Неизвестный уровень отчета: {level}")
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Неизвестный формат отчета: {fmt}")
+        self.stream = stream if stream is not None else sys.stdout
+        self.model = model or DEFAULT_MODEL
+        self.level = level
+        self.fmt = fmt
+        self.top = AtRiskTop(top_n if level == "top" else 0)
+        self.buffer_size = buffer_size
+        self._parts = []
+        self._buffered = 0
+        self._csv = csv.writer(self) if fmt == "csv" else None
+        self._first_client = True
+    
+    def write(self, text):
+        """Добавляет текст в буфер (сбрасывается в поток при переполнении)."""
+        self._parts.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+    
+    def flush(self):
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts.clear()
+            self._buffered = 0
+        self.stream.flush()
+    
+    def begin(self):
+        """Заголовок отчета (перед первым клиентом)."""
+        if self.fmt == "text":
+            self.write("\n" + "="*70 + "\n📊 ПОЛНЫЙ АНАЛИЗ ЗДОРОВЬЯ КЛИЕНТСКОГО ПОРТФЕЛЯ\n" + "="*70 + "\n")
+        elif self.fmt == "json":
+            self.write('{"clients": [' if self.level == "full" else "{")
+        elif self.level == "full":
+            self._csv.writerow(CLIENT_REPORT_FIELDS)
+    
+    def add_client(self, client, score, status):
+        """Учитывает клиента в отчете (при уровне "full" — сразу выводит его)."""
+        self.top.add_client(client, score, status)
+        if self.level != "full":
+            return
+        if self.fmt == "text":
+            self._write_client_text(client, score, status)
+            return
         
-        # Сбор статистики
-        portfolio_stats[result["status"]] += 1
+        record = self._client_record(client, score, status)
+        if self.fmt == "json":
+            self.write(("" if self._first_client else ", ") + json.dumps(record, ensure_ascii=False))
+            self._first_client = False
+        else:
+            self._csv.writerow([record[field] for field in CLIENT_REPORT_FIELDS])
+    
+    def _client_record(self, client, score, status):
+        components = self.model.components(
+            client["logins"], client["features"], client["days_payment"], client.get("nps")
+        )
+        record = {"name": client.get("name"), "score": score, "status": status}
+        for metric, value in zip(METRIC_NAMES_RU, components):
+            record[metric] = round(value)
+        return record
+    
+    def _write_client_text(self, client, score, status):
+        details = format_score_details(
+            client["logins"], client["features"], client["days_payment"], client.get("nps"), self.model
+        )
+        lines = [
+            f"\n{'─'*40}",
+            f"👤 КЛИЕНТ: {client['name']}",
+            f"📍 Health Score: {score}/100 → {status}",
+            f"💡 Рекомендация: {STATUS_RECOMMENDATIONS[status]}",
+            f"\n   Детализация баллов:",
+        ]
+        for metric, data in details.items():
+            lines.append(
+                f"   • {METRIC_NAMES_RU[metric]}: {data['value']} → {data['score']} баллов (вес {data['weight']})"
+            )
+        self.write("\n".join(lines) + "\n")
+    
+    def finish(self, stats):
+        """Сводка по портфелю (и топ рисковых клиентов), затем сброс буфера."""
+        if self.fmt == "text":
+            self._write_summary_text(stats)
+        elif self.fmt == "json":
+            if self.level == "full":
+                self.write("], ")
+            if self.level == "top":
+                self.write('"top_at_risk": ' + json.dumps(self.top.items(), ensure_ascii=False) + ", ")
+            self.write('"summary": ' + json.dumps(stats.summary(), ensure_ascii=False) + "}\n")
+        elif self.level == "summary":
+            self._csv.writerow(("metric", "value"))
+            summary = stats.summary()
+            statuses = summary.pop("statuses")
+            segments = summary.pop("segments")
+            self._csv.writerows(summary.items())
+            self._csv.writerows(statuses.items())
+            for segment, sub in segments.items():
+                self._csv.writerow((f"segment:{segment}:clients", sub["clients"]))
+                self._csv.writerow((f"segment:{segment}:average_score", sub["average_score"]))
+        elif self.level == "top":
+            self._csv.writerow(("id", "name", "score", "status"))
+            for record in self.top.items():
+                self._csv.writerow((record["id"], record["name"], record["score"], record["status"]))
+        self.flush()
+    
+    def _write_summary_text(self, stats):
+        portfolio_stats = stats.status_counts
+        total_clients = stats.count
+        lines = ["", "="*70, "📈 СВОДНАЯ СТАТИСТИКА ПО ПОРТФЕЛЮ:", "="*70]
+        
+        for status, count in portfolio_stats.items():
+            percentage = (count / total_clients) * 100 if total_clients > 0 else 0
+            lines.append(f"{status}: {count} клиентов ({percentage:.1f}%)")
         
-        # Вывод деталей по клиенту
-        print(f"\n{'─'*40}")
-        print(f"👤 КЛИЕНТ: {client['name']}")
-        print(f"📍 Health Score: {result['score']}/100 → {result['status']}")
-        print(f"💡 Рекомендация: {result['recommendation']}")
+        lines.append(f"\n📊 Средний Health Score по портфелю: {stats.mean:.1f}/100")
+        if total_clients > 0:
+            lines.append(f"   Мин: {stats.min} | P25: {stats.percentile(25)} | Медиана: {stats.percentile(50)} "
+                         f"| P75: {stats.percentile(75)} | Макс: {stats.max}")
         
-        # Детализация по метрикам (опционально, можно закомментировать)
-        print(f"\n   Детализация баллов:")
-        for metric, data in result["details"].items():
-            metric_name_ru = {
-                "activity": "Активность",
-                "usage": "Использование", 
-                "payment": "Оплаты",
-                "nps": "Лояльность (NPS)"
-            }[metric]
-            print(f"   • {metric_name_ru}: {data['value']} → {data['score']} баллов (вес {data['weight']})")
+        # Разбивка по сегментам
+        if stats.segments:
+            lines.append(f"\n🗂️  ПО СЕГМЕНТАМ:")
+            for segment, sub in sorted(stats.segments.items(), key=lambda item: str(item[0])):
+                at_risk = sub.status_counts[STATUS_LABELS[RISKY]]
+                lines.append(f"   • {segment}: {sub.count} клиентов, средний балл {sub.mean:.1f}, в риске {at_risk}")
+        
+        # Самые рисковые клиенты
+        if self.level == "top":
+            top = self.top.items()
+            lines.append(f"\n🚨 ТОП-{len(top)} КЛИЕНТОВ С НАИМЕНЬШИМ HEALTH SCORE:")
+            for i, record in enumerate(top, 1):
+                lines.append(f"   {i}. {record['name']}: {record['score']}/100 → {record['status']}")
+        
+        # Ключевые рекомендации для менеджера
+        lines.append(f"\n🎯 КЛЮЧЕВЫЕ ДЕЙСТВИЯ НА НЕДЕЛЮ:")
+        if portfolio_stats["🔴 РИСКОВЫЙ"] > 0:
+            lines.append(f"   • Выделить {portfolio_stats['🔴 РИСКОВЫЙ']} рисковых клиентов в приоритет")
+        if portfolio_stats["💛 СТАБИЛЬНЫЙ"] > 3:
+            lines.append(f"   • Запланировать групповое обучение для {portfolio_stats['💛 СТАБИЛЬНЫЙ']} стабильных клиентов")
+        if portfolio_stats["💚 ЗДОРОВЫЙ"] > 2:
+            lines.append(f"   • Провести демо новых функций для {portfolio_stats['💚 ЗДОРОВЫЙ']} здоровых клиентов")
+        
+        lines.append("="*70)
+        self.write("\n".join(lines) + "\n")
+
+
+def analyze_client_portfolio(clients_data, segment_field=None, level="full", fmt="text",
+                             top_n=10, stream=None, model=None):
+    """
+    Анализирует портфель клиентов и выводит сводный отчет.
+    
+    Аргументы:
+        clients_data (iterable): Словари с данными клиентов — список или
+            любой итератор (клиенты читаются за один проход).
+        segment_field (str): Поле для разбивки статистики по сегментам.
+        level (str): Детализация отчета — "summary", "top" или "full".
+        fmt (str): Формат отчета — "text", "json" или "csv".
+        top_n (int): Сколько самых рисковых клиентов показать при level="top".
+        stream: Куда писать отчет (по умолчанию stdout).
+        model (ScoringModel): Модель расчета (по умолчанию DEFAULT_MODEL).
+    
+    Возвращает:
+        PortfolioAggregator: Накопленная статистика по портфелю.
+    """
+    renderer = PortfolioRenderer(stream, level, fmt, top_n, model=model)
+    renderer.begin()
+    
+    stats = PortfolioAggregator(segment_field)
+    for client in clients_data:
+        # Расчет health score для каждого клиента (один раз) и сбор статистики
+        result = stats.add_client(client, model)
+        renderer.add_client(client, result["score"], result["status"])
     
     # 5. СВОДНАЯ СТАТИСТИКА ПО ПОРТФЕЛЮ
-    print("\n" + "="*70)
-    print("📈 СВОДНАЯ СТАТИСТИКА ПО ПОРТФЕЛЮ:")
-    print("="*70)
+    renderer.finish(stats)
+    return stats
+
+
+def print_portfolio_summary(stats, stream=None):
+    """Выводит сводную статистику и ключевые действия по накопленному агрегатору."""
+    PortfolioRenderer(stream, level="summary").finish(stats)
+
+
+# =================== ПОТОКОВАЯ ОБРАБОТКА ВЫГРУЗОК ===================
+INPUT_FIELDS = ("logins", "features", "days_payment", "nps")
+
+
+def open_text(path, mode):
+    """Открывает файл выгрузки как текст; '-' — stdin/stdout, .gz — сжатие на лету."""
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin if "r" in mode else sys.stdout)
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def detect_format(path):
+    """Определяет формат по расширению: .jsonl/.ndjson — JSONL, остальное — CSV."""
+    name = path[:-3] if path.endswith(".gz") else path
+    return "jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def _parse_number(value):
+    """Число из ячейки CSV/JSON; пустое значение — None."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def normalize_client(row):
+    """Приводит поля метрик к числам (на месте). Возвращает None, если строка некорректна."""
+    try:
+        for field in INPUT_FIELDS:
+            row[field] = _parse_number(row.get(field))
+    except (TypeError, ValueError):
+        return None
+    if row["logins"] is None or row["features"] is None or row["days_payment"] is None:
+        return None
+    return row
+
+
+def read_clients(stream, fmt):
+    """
+    Построчно читает клиентов из открытого потока CSV или JSONL (генератор).
+
+    Нераспознанная строка JSONL (оборванная, не объект) отдается пустым
+    словарем: как и некорректная строка CSV, она пропускается и учитывается
+    в счетчике пропущенных при расчете.
+    """
+    if fmt == "jsonl":
+        for line in stream:
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    row = None
+                yield row if isinstance(row, dict) else {}
+    else:
+        yield from csv.DictReader(stream)
+
+
+def read_columnar(path, chunk_size=10000):
+    """Построчно читает клиентов из колоночного файла .cols (генератор словарей)."""
+    with ColumnarTable(path) as table:
+        for start in range(0, len(table), chunk_size):
+            yield from table.rows(start, start + chunk_size)
+
+
+def iter_chunks(iterable, size):
+    """Разбивает поток на списки не длиннее size элементов."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def score_chunk(rows, model=None):
+    """
+    Рассчитывает health score для пачки клиентов одним пакетным вызовом.
     
-    total_clients = len(clients_data)
-    for status, count in portfolio_stats.items():
-        percentage = (count / total_clients) * 100 if total_clients > 0 else 0
-        print(f"{status}: {count} клиентов ({percentage:.1f}%)")
-    
-    # Рассчет среднего health score по портфелю
-    average_score = sum(
-        calculate_client_health_score(
-            c["logins"], c["features"], c["days_payment"], c.get("nps")
-        )["score"] for c in clients_data
-    ) / total_clients if total_clients > 0 else 0
-    
-    print(f"\n📊 Средний Health Score по портфелю: {average_score:.1f}/100")
-    
-    # Ключевые рекомендации для менеджера
-    print(f"\n🎯 КЛЮЧЕВЫЕ ДЕЙСТВИЯ НА НЕДЕЛЮ:")
-    if portfolio_stats["🔴 РИСКОВЫЙ"] > 0:
-        print(f"   • Выделить {portfolio_stats['🔴 РИСКОВЫЙ']} рисковых клиентов в приоритет")
-    if portfolio_stats["💛 СТАБИЛЬНЫЙ"] > 3:
-        print(f"   • Запланировать групповое обучение для {portfolio_stats['💛 СТАБИЛЬНЫЙ']} стабильных клиентов")
-    if portfolio_stats["💚 ЗДОРОВЫЙ"] > 2:
-        print(f"   • Провести демо новых функций для {portfolio_stats['💚 ЗДОРОВЫЙ']} здоровых клиентов")
+    Добавляет в каждую строку поля "score" и "status" и возвращает
+    количество пропущенных (некорректных) строк; они удаляются из rows.
+    """
+    valid = [row for row in map(normalize_client, rows) if row is not None]
+    skipped = len(rows) - len(valid)
+    rows[:] = valid
+    if not valid:
+        return skipped
     
-    print("="*70)
+    columns = {field: [row[field] for row in valid] for field in INPUT_FIELDS}
+    batch = calculate_health_scores_batch(columns, model=model)
+    scores, statuses = batch["score"], batch["status"]
+    if np is not None and isinstance(scores, np.ndarray):
+        scores, statuses = scores.tolist(), statuses.tolist()
+    for row, score, code in zip(valid, scores, statuses):
+        row["score"] = score
+        row["status"] = STATUS_LABELS[code]
+    return skipped
+
+
+class ResultWriter:
+    """Потоковая запись результатов в CSV или JSONL."""
+    
+    def __init__(self, stream, fmt, write_header=True):
+        self.stream = stream
+        self.fmt = fmt
+        self.write_header = write_header
+        self._csv = None
+    
+    def write_rows(self, rows):
+        # Пачка может целиком состоять из пропущенных строк — колонки CSV берутся из первой непустой
+        if not rows:
+            return
+        if self.fmt == "jsonl":
+            self.stream.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+            return
+        if self._csv is None:
+            fieldnames = list(rows[0])
+            self._csv = csv.DictWriter(self.stream, fieldnames=fieldnames, extrasaction="ignore")
+            if self.write_header:
+                self._csv.writeheader()
+        self._csv.writerows(rows)
+
+
+def score_stream(rows, stats, writer=None, chunk_size=10000, renderer=None, model=None):
+    """
+    Считает health score для потока клиентов пачками по chunk_size.
+    
+    Аргументы:
+        rows (iterable): Клиенты (словари) — читаются лениво.
+        stats (PortfolioAggregator): Куда накапливать статистику.
+        writer (ResultWriter): Куда писать результаты (None — не писать).
+        chunk_size (int): Размер пачки; определяет потребление памяти.
+        renderer: PortfolioRenderer или AtRiskTop для отчета по клиентам.
+        model (ScoringModel): Модель расчета (по умолчанию DEFAULT_MODEL).
+    
+    Возвращает:
+        tuple: (обработано строк, пропущено некорректных строк).
+    """
+    processed = skipped = 0
+    segment_field = stats.segment_field
+    for chunk in iter_chunks(rows, chunk_size):
+        skipped += score_chunk(chunk, model)
+        for row in chunk:
+            stats.add(row["score"], row["status"], row.get(segment_field) if segment_field else None)
+        if renderer is not None:
+            for row in chunk:
+                renderer.add_client(row, row["score"], row["status"])
+        if writer is not None:
+            writer.write_rows(chunk)
+        processed += len(chunk)
+    return processed, skipped
+
+
+def score_columnar(path, stats, writer=None, chunk_size=10000, renderer=None, model=None):
+    """
+    Считает health score по колоночному файлу .cols.
+    
+    Для сводки (без выгрузки и отчета по клиентам) при установленном NumPy
+    читаются только колонки метрик и сегмента — поверх mmap, без копирования
+    и без словарей на строку: пачка считается одним пакетным вызовом и
+    учитывается через PortfolioAggregator.add_batch. Иначе строки идут
+    через score_stream.
+    
+    Возвращает:
+        tuple: (обработано строк, пропущено некорректных строк).
+    """
+    with ColumnarTable(path) as table:
+        names = [field for field in INPUT_FIELDS if field in table]
+        vectorized = (np is not None and writer is None and renderer is None
+                      and all(field in names for field in INPUT_FIELDS[:3])
+                      and all(table.type_of(field) in NUMERIC_TYPES for field in names))
+        if not vectorized:
+            return score_stream(read_columnar(path, chunk_size), stats, writer, chunk_size, renderer, model)
+        
+        segment_field = stats.segment_field
+        if segment_field and segment_field in table:
+            names.append(segment_field)
+        processed = skipped = 0
+        for start in range(0, len(table), chunk_size):
+            columns = table.read(names, start, start + chunk_size)
+            size = len(columns[names[0]])
+            if "nps" not in columns:
+                columns["nps"] = np.full(size, np.nan)
+            # Пропуск обязательной метрики (NaN) — некорректная строка, как в normalize_client
+            invalid = np.zeros(size, dtype=bool)
+            for field in INPUT_FIELDS[:3]:
+                if columns[field].dtype.kind == "f":
+                    invalid |= np.isnan(columns[field])
+            if invalid.any():
+                columns = {name: values[~invalid] for name, values in columns.items()}
+                skipped += int(invalid.sum())
+            if segment_field and segment_field not in columns:
+                columns[segment_field] = None
+            batch = calculate_health_scores_batch(columns, model=model)
+            stats.add_batch(batch["score"], batch["status"], columns[segment_field] if segment_field else None)
+            processed += size - int(invalid.sum())
+    return processed, skipped
+
+
+def plan_shards(path, fmt, workers):
+    """
+    Делит файл на workers диапазонов байт, выровненных по началу строк.
+    
+    Предполагается, что одна запись занимает одну строку (для CSV с переносами
+    строк внутри кавычек используйте однопроцессный режим).
+    
+    Возвращает:
+        tuple: (строка заголовка CSV или None, список диапазонов (start, end)).
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline().decode("utf-8") if fmt == "csv" else None
+        data_start = f.tell()
+        boundaries = [data_start]
+        step = (size - data_start) / workers
+        for i in range(1, workers):
+            f.seek(max(int(data_start + step * i), boundaries[-1]))
+            if f.tell() > data_start:
+                f.readline()  # дочитываем строку, на которую попали, до конца
+            boundaries.append(max(f.tell(), boundaries[-1]))
+        boundaries.append(size)
+    shards = [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+    return header, shards
+
+
+def _read_shard_lines(path, start, end):
+    """Построчно читает диапазон байт [start, end) файла."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            line = f.readline()
+            if not line:
+                return
+            position += len(line)
+            yield line.decode("utf-8")
+
+
+def _score_shard(path, fmt, header, start, end, out_path, out_format, write_header,
+                 chunk_size, segment_field, top_n, model):
+    """Обрабатывает один шард в процессе-воркере; результаты пишет в свой файл."""
+    lines = _read_shard_lines(path, start, end)
+    if fmt == "csv":
+        fieldnames = next(csv.reader([header]))
+        rows = csv.DictReader(lines, fieldnames=fieldnames)
+    else:
+        rows = read_clients(lines, fmt)
+    
+    stats = PortfolioAggregator(segment_field)
+    top = AtRiskTop(top_n) if top_n else None
+    with contextlib.ExitStack() as stack:
+        writer = None
+        if out_path:
+            stream = stack.enter_context(open_text(out_path, "w"))
+            writer = ResultWriter(stream, out_format, write_header=write_header)
+        processed, skipped = score_stream(rows, stats, writer, chunk_size, top, model)
+    return stats, processed, skipped, top
+
+
+def score_file_parallel(input_path, in_format, output_path, out_format, workers,
+                        chunk_size=10000, segment_field=None, top=None, model=None):
+    """
+    Считает health score по файлу в нескольких процессах.
+    
+    Файл делится на шарды по числу воркеров, каждый шард обрабатывается
+    в отдельном процессе, затем статистика шардов объединяется, а файлы
+    результатов склеиваются по порядку — итог совпадает с однопроцессным.
+    Если передан top (AtRiskTop), в него объединяются топы рисковых по шардам.
+    
+    Возвращает:
+        tuple: (PortfolioAggregator, обработано строк, пропущено строк).
+    """
+    header, shards = plan_shards(input_path, in_format, workers)
+    stats = PortfolioAggregator(segment_field)
+    processed = skipped = 0
+    
+    with tempfile.TemporaryDirectory(prefix="health_shards_") as tmp_dir:
+        suffix = ".gz" if output_path and output_path.endswith(".gz") else ""
+        part_paths = [
+            os.path.join(tmp_dir, f"part{i:04d}.{out_format}{suffix}") if output_path else None
+            for i in range(len(shards))
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_score_shard, input_path, in_format, header, start, end,
+                            part_path, out_format, i == 0, chunk_size, segment_field,
+                            top.size if top is not None else 0, model)
+                for i, ((start, end), part_path) in enumerate(zip(shards, part_paths))
+            ]
+            # Объединяем строго по порядку шардов
+            for future in futures:
+                shard_stats, shard_processed, shard_skipped, shard_top = future.result()
+                stats.merge(shard_stats)
+                if top is not None and shard_top is not None:
+                    top.merge(shard_top)
+                processed += shard_processed
+                skipped += shard_skipped
+        
+        if output_path:
+            with contextlib.ExitStack() as stack:
+                if output_path == "-":
+                    sys.stdout.flush()
+                    target = sys.stdout.buffer
+                else:
+                    target = stack.enter_context(open(output_path, "wb"))
+                for part_path in part_paths:
+                    if os.path.exists(part_path):
+                        with open(part_path, "rb") as part:
+                            shutil.copyfileobj(part, target, 1024 * 1024)
+                target.flush()
+    
+    return stats, processed, skipped
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(
+        description="Расчет Customer Health Score по выгрузке клиентов (CSV/JSONL)."
+    )
+    parser.add_argument("input", help="Файл выгрузки (CSV, JSONL, можно .gz; .cols) или '-' для stdin")
+    parser.add_argument("-o", "--output", help="Куда писать результаты (файл или '-' для stdout)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Формат входа (по умолчанию — по расширению)")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"], help="Формат выхода (по умолчанию — по расширению)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Размер пачки строк (по умолчанию 10000)")
+    parser.add_argument("--segment-field", help="Поле для разбивки статистики по сегментам")
+    parser.add_argument("--workers", type=int, default=1, help="Число процессов (по умолчанию 1)")
+    parser.add_argument("--report-level", choices=REPORT_LEVELS, default="summary",
+                        help="Детализация отчета: summary, top или full (по умолчанию summary)")
+    parser.add_argument("--report-format", choices=REPORT_FORMATS, default="text",
+                        help="Формат отчета: text, json или csv (по умолчанию text)")
+    parser.add_argument("--top", type=int, default=10, help="Сколько рисковых клиентов в отчете top")
+    parser.add_argument("--model", help="JSON-файл с весами, нормировками и порогами модели")
+    return parser
+
+
+def main(argv=None):
+    """Точка входа командной строки для потокового расчета."""
+    args = _build_parser().parse_args(argv)
+    if args.chunk_size <= 0 or args.workers <= 0:
+        print("❌ Ошибка! --chunk-size и --workers должны быть положительными.", file=sys.stderr)
+        return 2
+    
+    in_format = args.format or ("jsonl" if args.input == "-" else detect_format(args.input))
+    out_format = None
+    if args.output:
+        out_format = args.output_format or ("jsonl" if args.output == "-" else detect_format(args.output))
+    columnar_in = args.input.lower().endswith(COLUMNAR_SUFFIX)
+    columnar_out = bool(args.output) and args.output.lower().endswith(COLUMNAR_SUFFIX)
+    
+    workers = args.workers
+    if workers > 1 and (args.input == "-" or args.input.endswith(".gz")):
+        print("⚠️  stdin и .gz нельзя разбить на шарды — расчет в одном процессе.", file=sys.stderr)
+        workers = 1
+    if workers > 1 and (columnar_in or columnar_out):
+        print("⚠️  Файлы .cols обрабатываются в одном процессе (колонки считаются пакетно).", file=sys.stderr)
+        workers = 1
+    
+    report_level = args.report_level
+    if workers > 1 and report_level == "full":
+        print("⚠️  Полный отчет строится только в одном процессе — выводится топ рисковых.", file=sys.stderr)
+        report_level = "top"
+    
+    # Если результаты идут в stdout, отчет уходит в stderr, чтобы не смешиваться с данными
+    report_stream = sys.stderr if args.output == "-" else sys.stdout
+    try:
+        model = ScoringModel.from_file(args.model) if args.model else DEFAULT_MODEL
+    except (OSError, ValueError) as e:
+        print(f"❌ Ошибка в конфигурации модели: {e}", file=sys.stderr)
+        return 2
+    renderer = PortfolioRenderer(report_stream, report_level, args.report_format, args.top, model=model)
+    if args.report_format != "text" or report_level != "summary":
+        renderer.begin()
+    
+    started = time.perf_counter()
+    
+    if workers > 1:
+        stats, processed, skipped = score_file_parallel(
+            args.input, in_format, args.output, out_format, workers,
+            args.chunk_size, args.segment_field, renderer.top if report_level == "top" else None, model
+        )
+    else:
+        stats = PortfolioAggregator(args.segment_field)
+        with contextlib.ExitStack() as stack:
+            writer = None
+            if columnar_out:
+                writer = ColumnBuffer()
+            elif args.output:
+                writer = ResultWriter(stack.enter_context(open_text(args.output, "w")), out_format)
+            client_renderer = renderer if report_level != "summary" else None
+            if columnar_in:
+                processed, skipped = score_columnar(
+                    args.input, stats, writer, args.chunk_size, client_renderer, model
+                )
+            else:
+                source = stack.enter_context(open_text(args.input, "r"))
+                processed, skipped = score_stream(
+                    read_clients(source, in_format), stats, writer, args.chunk_size, client_renderer, model
+                )
+            if columnar_out:
+                writer.write(args.output)
+    
+    elapsed = time.perf_counter() - started
+    renderer.finish(stats)
+    
+    # Машиночитаемый отчет не смешиваем со служебными сообщениями
+    info_stream = report_stream if args.report_format == "text" else sys.stderr
+    rate = processed / elapsed if elapsed > 0 else 0
+    print(f"⏱️  Обработано {processed:,} строк за {elapsed:.2f} с ({rate:,.0f} строк/с)", file=info_stream)
+    if skipped:
+        print(f"⚠️  Пропущено некорректных строк: {skipped:,}", file=info_stream)
+    return 0
 
 
 # =================== ПРИМЕР ИСПОЛЬЗОВАНИЯ ===================
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    
     # Тестовые данные: портфель из 5 клиентов
     example_portfolio = [
         {
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Точки безубыточности и оптимальный тариф по всему каталогу.
+
+Для каждого клиента (стоимость часа сотрудника, текущий тариф и профиль
+использования) и каждого тарифа каталога аналитически считается:
+    • дополнительная годовая выгода перехода с текущего тарифа;
+    • сколько часов в месяц должен дополнительно экономить тариф при заявленном
+      приросте выручки, чтобы переход окупился (break_even_hours);
+    • какой прирост выручки нужен при заявленной экономии часов (break_even_revenue);
+    • при какой доле заявленного эффекта переход окупается (break_even_usage);
+    • тариф с наибольшей годовой чистой выгодой (оптимальный).
+
+Профиль использования usage — доля заявленного эффекта тарифа (time_saved
+и revenue_impact), которую клиент реально получает: 1.0 — как в каталоге.
+Расчет идет матрицами "клиенты × тарифы" пачками (NumPy, если установлен).
+
+Пример запуска:
+    python plan_solver.py clients.csv --plans plans.json -o solved.csv --all-plans
+"""
+
+import argparse
+import contextlib
+import sys
+import time
+from collections import Counter
+
+from cs_score_calculator import ResultWriter, detect_format, iter_chunks, open_text, read_clients
+from roi_calculator import load_plan_catalog, number
+
+try:
+    import numpy as np
+except ImportError:  # Без NumPy матрицы считаются циклами
+    np = None
+
+INF = float("inf")
+
+# Результаты решателя: матрицы "клиенты × тарифы"
+SOLUTION_FIELDS = ("additional_yearly_gain", "break_even_hours", "break_even_revenue", "break_even_usage")
+
+
+class PlanSolver:
+    """
+    Решатель по каталогу тарифов.
+
+    Тарифы упорядочиваются по стоимости, поэтому при равной выгоде
+    оптимальным считается более дешевый.
+
+    Использование:
+        solver = PlanSolver(load_plan_catalog("plans.json"))
+        solution = solver.solve(hour_rates=[1500, 800], current=["Базовый", None])
+        solver.names[solution["optimal"][0]]
+    """
+
+    def __init__(self, catalog):
+        self.plans = sorted(catalog.values(), key=lambda plan: plan["cost"])
+        self.names = [plan["name"] for plan in self.plans]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self._cost = [float(plan["cost"]) for plan in self.plans]
+        self._hours = [float(plan["time_saved"]) for plan in self.plans]
+        self._revenue = [float(plan["revenue_impact"]) for plan in self.plans]
+
+    def solve(self, hour_rates, usage=None, current=None, use_numpy=None):
+        """
+        Решение для пачки клиентов.
+
+        Аргументы:
+            hour_rates (sequence): Стоимость часа сотрудника по клиентам.
+            usage (sequence): Доля заявленного эффекта тарифов (по умолчанию 1.0).
+            current (sequence): Текущий тариф клиента — название или None
+                (тогда выгода и безубыточность считаются относительно "без тарифа").
+            use_numpy (bool): Принудительно включить/выключить NumPy.
+
+        Возвращает:
+            dict: "optimal" — индекс оптимального тарифа (в self.names) по клиентам;
+            SOLUTION_FIELDS — матрицы "клиенты × тарифы" (массивы NumPy или списки списков).
+            Безубыточность 0 — переход окупается и без дополнительного эффекта,
+            inf — не окупается ни при каком значении.
+        """
+        size = len(hour_rates)
+        usage = [1.0] * size if usage is None else usage
+        current = [None] * size if current is None else current
+        current = [self.index[name] if name is not None else -1 for name in current]
+        if use_numpy is None:
+            use_numpy = np is not None
+        if use_numpy:
+            return self._solve_numpy(hour_rates, usage, current)
+        return self._solve_python(hour_rates, usage, current)
+
+    def _solve_numpy(self, hour_rates, usage, current):
+        cost, hours, revenue = (np.asarray(values) for values in (self._cost, self._hours, self._revenue))
+        rate = np.asarray(hour_rates, dtype=np.float64)[:, None]
+        share = np.asarray(usage, dtype=np.float64)[:, None]
+        current = np.asarray(current, dtype=np.int64)
+
+        # Текущий тариф как точка отсчета; -1 — "без тарифа" (нулевые затраты и эффект)
+        has_plan = (current >= 0)[:, None]
+        base = np.where(current >= 0, current, 0)
+        base_cost = np.where(has_plan, cost[base][:, None], 0.0)
+        base_hours = np.where(has_plan, hours[base][:, None], 0.0)
+        base_revenue = np.where(has_plan, revenue[base][:, None], 0.0)
+
+        extra_cost = cost - base_cost                      # доплата, руб./мес
+        nominal_hours = hours - base_hours                 # дополнительные часы по каталогу
+        nominal_revenue = revenue - base_revenue           # дополнительная выручка по каталогу
+        extra_hours = share * nominal_hours
+        extra_revenue = share * nominal_revenue
+        gain = (extra_hours * rate + extra_revenue - extra_cost) * 12
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shortfall = extra_cost - extra_revenue
+            break_even_hours = np.where(shortfall <= 0, 0.0,
+                                        np.where(rate > 0, shortfall / rate, INF))
+            break_even_revenue = np.maximum(extra_cost - extra_hours * rate, 0.0)
+            nominal_benefit = nominal_hours * rate + nominal_revenue
+            break_even_usage = np.where(extra_cost <= 0, 0.0,
+                                        np.where(nominal_benefit > 0, extra_cost / nominal_benefit, INF))
+
+        # argmax берет первый максимум — при равной выгоде более дешевый тариф
+        annual_net = (share * (hours * rate + revenue) - cost) * 12
+        return {
+            "optimal": np.argmax(annual_net, axis=1),
+            "additional_yearly_gain": gain,
+            "break_even_hours": break_even_hours,
+            "break_even_revenue": break_even_revenue,
+            "break_even_usage": np.maximum(break_even_usage, 0.0),
+        }
+
+    def _solve_python(self, hour_rates, usage, current):
+        solution = {"optimal": []}
+        solution.update((field, []) for field in SOLUTION_FIELDS)
+        plans = list(zip(self._cost, self._hours, self._revenue))
+        for rate, share, base in zip(hour_rates, usage, current):
+            rate, share = float(rate), float(share)
+            base_cost, base_hours, base_revenue = plans[base] if base >= 0 else (0.0, 0.0, 0.0)
+            rows = {field: [] for field in SOLUTION_FIELDS}
+            best, best_net = 0, None
+            for i, (cost, hours, revenue) in enumerate(plans):
+                extra_cost = cost - base_cost
+                nominal_hours, nominal_revenue = hours - base_hours, revenue - base_revenue
+                extra_hours, extra_revenue = share * nominal_hours, share * nominal_revenue
+                rows["additional_yearly_gain"].append((extra_hours * rate + extra_revenue - extra_cost) * 12)
+
+                shortfall = extra_cost - extra_revenue
+                rows["break_even_hours"].append(0.0 if shortfall <= 0 else shortfall / rate if rate > 0 else INF)
+                rows["break_even_revenue"].append(max(extra_cost - extra_hours * rate, 0.0))
+                nominal_benefit = nominal_hours * rate + nominal_revenue
+                rows["break_even_usage"].append(
+                    0.0 if extra_cost <= 0 else max(extra_cost / nominal_benefit, 0.0) if nominal_benefit > 0 else INF
+                )
+
+                net = (share * (hours * rate + revenue) - cost) * 12
+                if best_net is None or net > best_net:
+                    best, best_net = i, net
+            solution["optimal"].append(best)
+            for field, values in rows.items():
+                solution[field].append(values)
+        return solution
+
+
+def _client_inputs(client, solver, plan_field, rate_field, usage_field):
+    """(ставка, доля эффекта, текущий тариф) из строки выгрузки или None."""
+    plan = client.get(plan_field) or None
+    if plan is not None and plan not in solver.index:
+        return None
+    try:
+        rate = float(number(client.get(rate_field)))
+        share = client.get(usage_field)
+        share = 1.0 if share in (None, "") else float(number(share))
+    except (TypeError, ValueError):
+        return None
+    if rate < 0 or share < 0:
+        return None
+    return rate, share, plan
+
+
+def solve_clients(clients, solver, chunk_size=10000, plan_field="plan", rate_field="hour_rate",
+                  usage_field="usage", all_plans=False):
+    """
+    Решает задачу для потока клиентов пачками (генератор строк результата).
+
+    Строка результата: исходные поля клиента, optimal_plan и для оптимального
+    тарифа — дополнительная выгода и точки безубыточности; при all_plans —
+    еще колонки по каждому тарифу каталога. Вместо некорректных строк
+    выдается None (чтобы вызывающий код мог их посчитать).
+    """
+    for chunk in iter_chunks(clients, chunk_size):
+        valid, inputs = [], []
+        for client in chunk:
+            values = _client_inputs(client, solver, plan_field, rate_field, usage_field)
+            if values is None:
+                yield None
+                continue
+            valid.append(client)
+            inputs.append(values)
+        if not valid:
+            continue
+        rates, shares, current = zip(*inputs)
+        solution = solver.solve(rates, shares, current)
+        columns = {field: (values.tolist() if hasattr(values, "tolist") else values)
+                   for field, values in solution.items()}
+        for position, client in enumerate(valid):
+            best = columns["optimal"][position]
+            row = dict(client)
+            row["optimal_plan"] = solver.names[best]
+            for field in SOLUTION_FIELDS:
+                row[field] = round(columns[field][position][best], 2)
+            if all_plans:
+                for i, name in enumerate(solver.names):
+                    row[f"gain[{name}]"] = round(columns["additional_yearly_gain"][position][i], 2)
+                    row[f"break_even_hours[{name}]"] = round(columns["break_even_hours"][position][i], 2)
+            yield row
+
+
+def main(argv=None):
+    """Оптимальный тариф и точки безубыточности по файлу выгрузки."""
+    parser = argparse.ArgumentParser(description="Точки безубыточности и оптимальный тариф по каталогу.")
+    parser.add_argument("input", help="Выгрузка клиентов (CSV/JSONL, можно .gz) или '-' для stdin")
+    parser.add_argument("--plans", required=True, help="JSON-файл с каталогом тарифов")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Формат входа (по умолчанию — по расширению)")
+    parser.add_argument("-o", "--output", help="Файл для результатов по клиентам (CSV/JSONL)")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"], help="Формат результатов")
+    parser.add_argument("--all-plans", action="store_true", help="Колонки по каждому тарифу каталога")
+    parser.add_argument("--plan-field", default="plan", help="Поле с текущим тарифом (по умолчанию plan)")
+    parser.add_argument("--rate-field", default="hour_rate",
+                        help="Поле со стоимостью часа сотрудника (по умолчанию hour_rate)")
+    parser.add_argument("--usage-field", default="usage",
+                        help="Поле с долей заявленного эффекта тарифа (по умолчанию usage, пусто — 1.0)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Размер пачки строк")
+    args = parser.parse_args(argv)
+
+    try:
+        solver = PlanSolver(load_plan_catalog(args.plans))
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Ошибка! Каталог тарифов: {e}", file=sys.stderr)
+        return 2
+
+    in_format = args.format or ("jsonl" if args.input == "-" else detect_format(args.input))
+    started = time.perf_counter()
+    optimal = Counter()
+    upgrades = skipped = processed = 0
+    output = open_text(args.output, "w") if args.output else contextlib.nullcontext()
+    with open_text(args.input, "r") as source, output as out:
+        writer = ResultWriter(out, args.output_format or detect_format(args.output)) if out else None
+        rows = solve_clients(read_clients(source, in_format), solver, args.chunk_size, args.plan_field,
+                             args.rate_field, args.usage_field, args.all_plans)
+        for chunk in iter_chunks(rows, args.chunk_size):
+            results = [row for row in chunk if row is not None]
+            skipped += len(chunk) - len(results)
+            processed += len(results)
+            for row in results:
+                optimal[row["optimal_plan"]] += 1
+                if row["optimal_plan"] != (row.get(args.plan_field) or None) and row["additional_yearly_gain"] > 0:
+                    upgrades += 1
+            if writer is not None and results:
+                writer.write_rows(results)
+    elapsed = time.perf_counter() - started
+
+    print(f"🧮 Клиентов: {processed:,} × тарифов: {len(solver.names)} | ⏱️ {elapsed:.2f} с")
+    print(f"🚀 Выгоден переход на другой тариф: {upgrades:,}")
+    print("\n📊 ОПТИМАЛЬНЫЙ ТАРИФ ПО ПОРТФЕЛЮ:")
+    for name in solver.names:
+        share = optimal[name] / processed if processed else 0
+        print(f"   {name}: {optimal[name]:,} ({share:.0%})")
+    if skipped:
+        print(f"⚠️  Пропущено некорректных строк: {skipped:,}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
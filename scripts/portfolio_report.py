@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+Отчеты по портфелю клиентов: еженедельный, по рискам и по MRR.
+
+Все агрегаты (итоги, разбивка по типам, риск-сегменты, распределение health,
+топ клиентов по MRR и в зоне риска) собираются за один проход по клиентам
+источника (ClientStore.index_items) и кешируются в ReportEngine до изменения
+данных: отчеты разных типов строятся из одних и тех же сумм.
+
+Изменения за неделю считаются по снимкам агрегатов: при каждом построении
+отчета снимок за текущий день сохраняется в JSON-файл истории, для сравнения
+берется последний снимок не позже чем неделю назад. Изменение балла по
+каждому клиенту — в score_history.py.
+
+Форматы: Markdown (.md), HTML (.html), CSV (.csv — таблицы отчета подряд).
+
+Пример запуска:
+    python portfolio_report.py portfolio.csv --kind weekly risk mrr --format md html -o reports/
+"""
+
+import argparse
+import csv
+import heapq
+import html
+import io
+import json
+import numbers
+import os
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from itertools import count
+
+from client_store import open_store
+from cs_score_calculator import DEFAULT_MODEL
+from risk_index import RISK_THRESHOLD
+
+REPORT_KINDS = {
+    "weekly": "Еженедельный отчет",
+    "risk": "Отчет по рискам",
+    "mrr": "Отчет по MRR",
+}
+REPORT_FORMATS = ("md", "html", "csv")
+
+# Риск-сегменты по health: (название, нижняя граница); верхняя — начало следующего
+CRITICAL_HEALTH = 40
+RISK_BUCKETS = (
+    ("Критический", 0),
+    ("Высокий", CRITICAL_HEALTH),
+    ("Средний", RISK_THRESHOLD),
+    ("Низкий", DEFAULT_MODEL.thresholds["healthy"]),
+)
+_BUCKET_BOUNDS = [low for _, low in RISK_BUCKETS[1:]]
+
+# Распределение health — интервалы по HEALTH_STEP баллов (последний включает 100)
+HEALTH_STEP = 10
+HEALTH_BINS = 100 // HEALTH_STEP
+
+TOP_CLIENTS = 10
+
+# Снимки старше HISTORY_DAYS дней из файла истории удаляются
+HISTORY_DAYS = 90
+WEEK = timedelta(days=7)
+
+
+class PortfolioAggregates:
+    """
+    Агрегаты портфеля для отчетов, собранные за один проход.
+
+    Health суммируется в десятых долях целым числом — как в PortfolioMetrics.
+    Топ клиентов держится в куче размера top_n, весь портфель не сортируется.
+    """
+
+    def __init__(self, top_n=TOP_CLIENTS):
+        self.top_n = top_n
+        self.clients = 0
+        self.mrr = 0
+        self.at_risk = 0
+        self.at_risk_mrr = 0
+        self._health_tenths = 0
+        self._by_type = {}   # тип -> [клиенты, MRR, health * 10, в риске, MRR в риске]
+        self.buckets = [[0, 0] for _ in RISK_BUCKETS]   # [клиенты, MRR] по риск-сегментам
+        self.histogram = [0] * HEALTH_BINS
+        self._top_mrr = []    # (MRR, -порядковый номер, клиент) — минимум в корне; при равном MRR выше тот, кто раньше
+        self._top_risk = []
+        self._counter = count()
+
+    @classmethod
+    def from_items(cls, items, top_n=TOP_CLIENTS):
+        """Агрегаты по кортежам INDEX_FIELDS (id, name, type, status, health, mrr)."""
+        aggregates = cls(top_n)
+        for item in items:
+            aggregates.add(*item)
+        return aggregates
+
+    def add(self, client_id, name, client_type, status, health, mrr):
+        if not isinstance(health, numbers.Real) or health != health:   # нет балла (None, текст, NaN)
+            return
+        at_risk = health < RISK_THRESHOLD
+        self.clients += 1
+        self.mrr += mrr
+        self._health_tenths += round(health * 10)
+        bucket = self._by_type.get(client_type)
+        if bucket is None:
+            bucket = self._by_type[client_type] = [0, 0, 0, 0, 0]
+        bucket[0] += 1
+        bucket[1] += mrr
+        bucket[2] += round(health * 10)
+        segment = self.buckets[bisect_right(_BUCKET_BOUNDS, health)]
+        segment[0] += 1
+        segment[1] += mrr
+        self.histogram[min(max(int(health // HEALTH_STEP), 0), HEALTH_BINS - 1)] += 1
+
+        entry = (mrr, -next(self._counter), (client_id, name, client_type, health, mrr))
+        self._push(self._top_mrr, entry)
+        if at_risk:
+            self.at_risk += 1
+            self.at_risk_mrr += mrr
+            bucket[3] += 1
+            bucket[4] += mrr
+            self._push(self._top_risk, entry)
+
+    def _push(self, heap, entry):
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, entry)
+        elif entry[0] > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+
+    @property
+    def avg_health(self):
+        return round(self._health_tenths / self.clients / 10, 1) if self.clients else 0.0
+
+    def by_type(self):
+        """Разбивка по типам (по убыванию MRR): {type: {clients, mrr, avg_health, at_risk, at_risk_mrr}}."""
+        return {
+            client_type: {
+                "clients": clients,
+                "mrr": mrr,
+                "avg_health": round(tenths / clients / 10, 1),
+                "at_risk": at_risk,
+                "at_risk_mrr": at_risk_mrr,
+            }
+            for client_type, (clients, mrr, tenths, at_risk, at_risk_mrr)
+            in sorted(self._by_type.items(), key=lambda item: -item[1][1])
+        }
+
+    def top_mrr(self):
+        """Крупнейшие клиенты по MRR: [(id, name, type, health, mrr)]."""
+        return [client for *_, client in sorted(self._top_mrr, reverse=True)]
+
+    def top_at_risk(self):
+        """Клиенты в зоне риска с наибольшим MRR."""
+        return [client for *_, client in sorted(self._top_risk, reverse=True)]
+
+    def snapshot(self):
+        """Итоги для истории (сравнение неделя к неделе)."""
+        return {
+            "clients": self.clients,
+            "mrr": self.mrr,
+            "avg_health": self.avg_health,
+            "at_risk": self.at_risk,
+            "at_risk_mrr": self.at_risk_mrr,
+            "buckets": [clients for clients, _ in self.buckets],
+            "by_type": {
+                client_type: {key: values[key] for key in ("clients", "mrr", "avg_health", "at_risk")}
+                for client_type, values in self.by_type().items()
+            },
+        }
+
+
+class Report:
+    """Отчет: показатели (название, значение, изменение) и таблицы (заголовок, колонки, строки)."""
+
+    def __init__(self, title, created, baseline=None):
+        self.title = title
+        self.created = created
+        self.baseline = baseline   # дата снимка, с которым сравниваются показатели
+        self.summary = []
+        self.tables = []
+
+    def metric(self, label, value, delta=""):
+        self.summary.append((label, value, delta))
+
+    def table(self, title, headers, rows):
+        self.tables.append((title, headers, rows))
+
+    @property
+    def subtitle(self):
+        line = f"Дата: {self.created:%d.%m.%Y %H:%M}"
+        if self.baseline is not None:
+            line += f" | изменения к {self.baseline:%d.%m.%Y}"
+        return line
+
+
+# ---------- Форматирование ----------
+
+def _money(value):
+    return f"{round(value):,} руб."
+
+
+def _share(part, total):
+    return f"{100 * part / total:.1f}%" if total else "—"
+
+
+def _delta(value, previous, digits=0):
+    """Изменение к прошлому снимку: "+1,200", "-3.5" или "—" (снимка нет)."""
+    if previous is None:
+        return "—"
+    change = round(value - previous, digits)
+    if not change:
+        return "0"
+    return f"{change:+,.{digits}f}"
+
+
+def _client_rows(clients):
+    return [[client_id, name, client_type, health, _money(mrr)]
+            for client_id, name, client_type, health, mrr in clients]
+
+
+CLIENT_HEADERS = ["ID", "Клиент", "Тип", "Health", "MRR"]
+
+
+def _bucket_label(i):
+    low = RISK_BUCKETS[i][1]
+    return f"{low}–{RISK_BUCKETS[i + 1][1]}" if i + 1 < len(RISK_BUCKETS) else f"{low}–100"
+
+
+# ---------- Отчеты ----------
+
+def weekly_report(aggregates, previous, created, baseline=None):
+    """Еженедельный отчет: итоги с изменениями, типы клиентов, распределение health, топ рисков."""
+    report = Report(REPORT_KINDS["weekly"], created, baseline)
+    before = previous or {}
+    report.metric("Клиентов", f"{aggregates.clients:,}", _delta(aggregates.clients, before.get("clients")))
+    report.metric("MRR", _money(aggregates.mrr), _delta(aggregates.mrr, before.get("mrr")))
+    report.metric("Средний health", aggregates.avg_health,
+                  _delta(aggregates.avg_health, before.get("avg_health"), 1))
+    report.metric("В зоне риска", f"{aggregates.at_risk:,} ({_share(aggregates.at_risk, aggregates.clients)})",
+                  _delta(aggregates.at_risk, before.get("at_risk")))
+    report.metric("MRR в зоне риска", _money(aggregates.at_risk_mrr),
+                  _delta(aggregates.at_risk_mrr, before.get("at_risk_mrr")))
+
+    previous_types = before.get("by_type", {})
+    rows = []
+    for client_type, values in aggregates.by_type().items():
+        old = previous_types.get(client_type, {}) if previous else None
+        rows.append([
+            client_type, values["clients"], _money(values["mrr"]), values["avg_health"], values["at_risk"],
+            _delta(values["clients"], None if old is None else old.get("clients", 0)),
+            _delta(values["mrr"], None if old is None else old.get("mrr", 0)),
+            _delta(values["avg_health"], None if old is None else old.get("avg_health"), 1),
+        ])
+    report.table("По типам клиентов",
+                 ["Тип", "Клиентов", "MRR", "Средний health", "В риске", "Δ клиентов", "Δ MRR", "Δ health"], rows)
+
+    report.table("Распределение health", ["Health", "Клиентов", "Доля"], [
+        [f"{i * HEALTH_STEP}–{(i + 1) * HEALTH_STEP}", clients, _share(clients, aggregates.clients)]
+        for i, clients in enumerate(aggregates.histogram)
+    ])
+    report.table("В зоне риска: крупнейшие по MRR", CLIENT_HEADERS, _client_rows(aggregates.top_at_risk()))
+    return report
+
+
+def risk_report(aggregates, previous, created, baseline=None):
+    """Отчет по рискам: риск-сегменты, риск по типам, клиенты под угрозой."""
+    report = Report(REPORT_KINDS["risk"], created, baseline)
+    before = previous or {}
+    critical_clients, critical_mrr = aggregates.buckets[0]
+    report.metric(f"В зоне риска (health < {RISK_THRESHOLD})", f"{aggregates.at_risk:,}",
+                  _delta(aggregates.at_risk, before.get("at_risk")))
+    report.metric("MRR под угрозой", _money(aggregates.at_risk_mrr),
+                  _delta(aggregates.at_risk_mrr, before.get("at_risk_mrr")))
+    report.metric("Доля MRR под угрозой", _share(aggregates.at_risk_mrr, aggregates.mrr))
+    previous_buckets = before.get("buckets")
+    report.metric(f"Критических (health < {CRITICAL_HEALTH})", f"{critical_clients:,}",
+                  _delta(critical_clients, previous_buckets[0] if previous_buckets else None))
+    report.metric("MRR критических", _money(critical_mrr))
+
+    rows = []
+    for i, (name, _) in enumerate(RISK_BUCKETS):
+        clients, mrr = aggregates.buckets[i]
+        rows.append([name, _bucket_label(i), clients, _share(clients, aggregates.clients), _money(mrr),
+                     _share(mrr, aggregates.mrr), _delta(clients, previous_buckets[i] if previous_buckets else None)])
+    report.table("Риск-сегменты",
+                 ["Сегмент", "Health", "Клиентов", "Доля клиентов", "MRR", "Доля MRR", "Δ клиентов"], rows)
+
+    report.table("Риск по типам клиентов", ["Тип", "В риске", "Клиентов", "Доля", "MRR под угрозой"], [
+        [client_type, values["at_risk"], values["clients"], _share(values["at_risk"], values["clients"]),
+         _money(values["at_risk_mrr"])]
+        for client_type, values in sorted(aggregates.by_type().items(), key=lambda item: -item[1]["at_risk_mrr"])
+    ])
+    report.table("Клиенты под угрозой: крупнейшие по MRR", CLIENT_HEADERS, _client_rows(aggregates.top_at_risk()))
+    return report
+
+
+def mrr_report(aggregates, previous, created, baseline=None):
+    """Отчет по MRR: структура выручки по типам и риск-сегментам, крупнейшие клиенты."""
+    report = Report(REPORT_KINDS["mrr"], created, baseline)
+    before = previous or {}
+    top = aggregates.top_mrr()
+    top_mrr = sum(client[4] for client in top)
+    report.metric("MRR", _money(aggregates.mrr), _delta(aggregates.mrr, before.get("mrr")))
+    report.metric("Клиентов", f"{aggregates.clients:,}", _delta(aggregates.clients, before.get("clients")))
+    report.metric("Средний MRR на клиента", _money(aggregates.mrr / aggregates.clients if aggregates.clients else 0))
+    report.metric(f"Доля топ-{len(top)} клиентов", _share(top_mrr, aggregates.mrr))
+    report.metric("MRR под угрозой", _money(aggregates.at_risk_mrr),
+                  _delta(aggregates.at_risk_mrr, before.get("at_risk_mrr")))
+
+    previous_types = before.get("by_type", {})
+    report.table("MRR по типам клиентов", ["Тип", "MRR", "Доля", "Клиентов", "Средний MRR", "Δ MRR"], [
+        [client_type, _money(values["mrr"]), _share(values["mrr"], aggregates.mrr), values["clients"],
+         _money(values["mrr"] / values["clients"]),
+         _delta(values["mrr"], previous_types.get(client_type, {}).get("mrr", 0) if previous else None)]
+        for client_type, values in aggregates.by_type().items()
+    ])
+    report.table("MRR по риск-сегментам", ["Сегмент", "Health", "MRR", "Доля"], [
+        [name, _bucket_label(i), _money(aggregates.buckets[i][1]), _share(aggregates.buckets[i][1], aggregates.mrr)]
+        for i, (name, _) in enumerate(RISK_BUCKETS)
+    ])
+    report.table("Крупнейшие клиенты", CLIENT_HEADERS, _client_rows(top))
+    return report
+
+
+REPORT_BUILDERS = {"weekly": weekly_report, "risk": risk_report, "mrr": mrr_report}
+
+
+# ---------- Вывод ----------
+
+def _md_cell(value):
+    return str(value).replace("|", "\\|")
+
+
+def render_markdown(report):
+    lines = [f"# {report.title}", "", f"_{report.subtitle}_", "",
+             "| Показатель | Значение | Δ за неделю |", "|---|---:|---:|"]
+    lines += [f"| {_md_cell(label)} | {_md_cell(value)} | {_md_cell(delta)} |"
+              for label, value, delta in report.summary]
+    for title, headers, rows in report.tables:
+        lines += ["", f"## {title}", ""]
+        if not rows:
+            lines.append("_Нет данных_")
+            continue
+        lines.append("| " + " | ".join(map(_md_cell, headers)) + " |")
+        lines.append("|" + "---|" * len(headers))
+        lines += ["| " + " | ".join(map(_md_cell, row)) + " |" for row in rows]
+    return "\n".join(lines) + "\n"
+
+
+HTML_STYLE = ("body{font-family:sans-serif;margin:2em;color:#222}"
+              "table{border-collapse:collapse;margin:0 0 1.5em}"
+              "th,td{border:1px solid #ccc;padding:4px 10px;text-align:left}"
+              "th{background:#f2f2f2}.sub{color:#666}")
+
+
+def render_html(report):
+    def table(headers, rows):
+        parts = ["<table>", "<tr>" + "".join(f"<th>{html.escape(str(h))}</th>" for h in headers) + "</tr>"]
+        parts += ["<tr>" + "".join(f"<td>{html.escape(str(cell))}</td>" for cell in row) + "</tr>" for row in rows]
+        parts.append("</table>")
+        return parts
+
+    title = html.escape(report.title)
+    lines = ["<!DOCTYPE html>", '<html lang="ru">', "<head>", '<meta charset="utf-8">',
+             f"<title>{title}</title>", f"<style>{HTML_STYLE}</style>", "</head>", "<body>",
+             f"<h1>{title}</h1>", f'<p class="sub">{html.escape(report.subtitle)}</p>']
+    lines += table(["Показатель", "Значение", "Δ за неделю"], report.summary)
+    for name, headers, rows in report.tables:
+        lines.append(f"<h2>{html.escape(name)}</h2>")
+        lines += table(headers, rows) if rows else ["<p>Нет данных</p>"]
+    lines += ["</body>", "</html>"]
+    return "\n".join(lines) + "\n"
+
+
+def render_csv(report):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([report.title, report.subtitle])
+    writer.writerow([])
+    writer.writerow(["Показатель", "Значение", "Δ за неделю"])
+    writer.writerows(report.summary)
+    for title, headers, rows in report.tables:
+        writer.writerow([])
+        writer.writerow([title])
+        writer.writerow(headers)
+        writer.writerows(rows)
+    # BOM — чтобы Excel сразу открывал кириллицу, как и выгрузка клиентов
+    return "\ufeff" + buffer.getvalue()
+
+
+RENDERERS = {"md": render_markdown, "html": render_html, "csv": render_csv}
+
+
+# ---------- Движок ----------
+
+class ReportEngine:
+    """
+    Построение отчетов с кешем агрегатов.
+
+    Агрегаты пересчитываются, только когда меняется ключ данных (например,
+    версия портфеля в дашборде); все отчеты одной версии строятся из одного
+    прохода по клиентам. history_path — JSON-файл снимков для изменений за неделю
+    (None — без сравнения).
+
+    Использование:
+        engine = ReportEngine("report_history.json")
+        files = engine.generate(store.index_items, ["weekly", "risk"], ["md", "html"], "reports/report")
+    """
+
+    def __init__(self, history_path=None, top_n=TOP_CLIENTS):
+        self.history_path = history_path
+        self.top_n = top_n
+        self._cached = None   # (ключ данных, агрегаты)
+        self._lock = threading.Lock()
+
+    def aggregates(self, load_items, key=None):
+        """Агрегаты из кеша или за один проход по load_items() (кортежи INDEX_FIELDS)."""
+        cached = self._cached
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
+        aggregates = PortfolioAggregates.from_items(load_items(), self.top_n)
+        self._cached = (key, aggregates)
+        return aggregates
+
+    def _load_history(self):
+        if not self.history_path or not os.path.exists(self.history_path):
+            return {}
+        try:
+            with open(self.history_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}   # испорченный файл истории не мешает построить отчет
+
+    def record_snapshot(self, aggregates, day):
+        """
+        Сохраняет снимок за день и возвращает снимок для сравнения.
+
+        Возвращает:
+            tuple: (дата снимка, снимок) — последний не позже day - 7 дней, или (None, None).
+        """
+        if not self.history_path:
+            return None, None
+        with self._lock:
+            history = self._load_history()
+            history[day.isoformat()] = aggregates.snapshot()
+            oldest = (day - timedelta(days=HISTORY_DAYS)).isoformat()
+            history = {key: value for key, value in sorted(history.items()) if key >= oldest}
+            with open(self.history_path, "w", encoding="utf-8") as f:
+                json.dump(history, f, ensure_ascii=False)
+        week_ago = (day - WEEK).isoformat()
+        earlier = [key for key in history if key <= week_ago]
+        if not earlier:
+            return None, None
+        return date.fromisoformat(earlier[-1]), history[earlier[-1]]
+
+    def build(self, kind, aggregates, previous=None, created=None, baseline=None):
+        """Отчет типа kind (REPORT_KINDS) по готовым агрегатам."""
+        if kind not in REPORT_BUILDERS:
+            raise ValueError(f"Неизвестный тип отчета: {kind}")
+        return REPORT_BUILDERS[kind](aggregates, previous, created or datetime.now(), baseline)
+
+    def generate(self, load_items, kinds, formats, prefix, key=None, progress=None):
+        """
+        Строит отчеты kinds и пишет каждый во всех форматах formats.
+
+        Аргументы:
+            load_items: Функция, возвращающая кортежи INDEX_FIELDS (вызывается, если кеш устарел).
+            prefix: Начало имени файлов: {prefix}_{kind}.{format}.
+            key: Ключ данных для кеша агрегатов (None — всегда пересчитывать).
+            progress: Функция progress(готово, всего) — после каждого файла.
+
+        Возвращает:
+            list: Имена записанных файлов.
+        """
+        for fmt in formats:
+            if fmt not in RENDERERS:
+                raise ValueError(f"Неизвестный формат отчета: {fmt}")
+        created = datetime.now()
+        aggregates = self.aggregates(load_items, key)
+        baseline, previous = self.record_snapshot(aggregates, created.date())
+        files = []
+        total = len(kinds) * len(formats)
+        for kind in kinds:
+            report = self.build(kind, aggregates, previous, created, baseline)
+            for fmt in formats:
+                filename = f"{prefix}_{kind}.{fmt}"
+                with open(filename, "w", encoding="utf-8", newline="" if fmt == "csv" else None) as f:
+                    f.write(RENDERERS[fmt](report))
+                files.append(filename)
+                if progress is not None:
+                    progress(len(files), total)
+        return files
+
+
+def main(argv=None):
+    """Отчеты по портфелю (CSV/JSONL/SQLite/.cols) в Markdown, HTML и CSV."""
+    parser = argparse.ArgumentParser(description="Отчеты по портфелю клиентов: еженедельный, по рискам, по MRR.")
+    parser.add_argument("source", help="Портфель: CSV, JSONL, SQLite или .cols")
+    parser.add_argument("--table", default="clients", help="Таблица SQLite (по умолчанию clients)")
+    parser.add_argument("--kind", nargs="+", choices=list(REPORT_KINDS), default=list(REPORT_KINDS),
+                        help="Типы отчетов (по умолчанию все)")
+    parser.add_argument("--format", nargs="+", choices=REPORT_FORMATS, default=list(REPORT_FORMATS),
+                        help="Форматы (по умолчанию все)")
+    parser.add_argument("-o", "--output-dir", default=".", help="Каталог для отчетов")
+    parser.add_argument("--history", default="report_history.json",
+                        help="JSON-файл снимков для изменений за неделю ('' — без сравнения)")
+    parser.add_argument("--top", type=int, default=TOP_CLIENTS, help="Клиентов в топ-списках")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    prefix = os.path.join(args.output_dir, f"report_{datetime.now():%Y%m%d_%H%M%S}")
+    engine = ReportEngine(args.history or None, args.top)
+    started = time.perf_counter()
+    try:
+        with open_store(args.source, args.table) as store:
+            files = engine.generate(store.index_items, args.kind, args.format, prefix)
+    except (OSError, ValueError, TypeError, sqlite3.DatabaseError) as e:
+        print(f"❌ Ошибка! {e}", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ Отчетов: {len(files)} | ⏱️ {elapsed:.2f} с")
+    for filename in files:
+        print(f"   {filename}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
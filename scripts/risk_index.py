@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Индекс клиентов по health score для мгновенной сортировки рисков.
+
+Отвечает на вопросы вида "50 самых рисковых клиентов по MRR" и "кто в диапазоне
+40-60 баллов" без пересчета и сортировки всего портфеля: клиенты хранятся
+в отсортированном по баллу списке, поиск — бинарный, обновление одного
+клиента не требует перестройки индекса.
+
+Пример запуска (по результатам cs_score_calculator.py или сырой выгрузке):
+    python risk_index.py scored.jsonl --top 50 --by mrr
+"""
+
+import argparse
+import heapq
+import sys
+from bisect import bisect_left, insort
+from itertools import count, islice
+
+from cs_score_calculator import (
+    DEFAULT_MODEL,
+    detect_format,
+    iter_chunks,
+    open_text,
+    read_clients,
+    score_chunk,
+)
+
+# Порог "в зоне риска" — граница стабильного статуса модели по умолчанию
+RISK_THRESHOLD = DEFAULT_MODEL.thresholds["stable"]
+
+
+class RiskIndex:
+    """
+    Отсортированный по health score индекс клиентов.
+
+    Сложность: поиск по порогу и диапазону — O(log n), топ-K с наименьшим
+    баллом — O(K), обновление клиента — O(log n) на поиск плюс сдвиг
+    элементов списка (быстрое копирование памяти внутри Python).
+    """
+
+    def __init__(self):
+        self._order = []      # (score, порядковый номер, key) — по возрастанию балла
+        self._entries = {}    # key -> (score, порядковый номер, mrr)
+        self._counter = count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @classmethod
+    def from_clients(cls, clients, key_field="id", score_field="health", mrr_field="mrr"):
+        """Строит индекс по списку клиентов одной сортировкой (быстрее поштучных вставок)."""
+        index = cls()
+        index.extend(
+            (client[key_field], client[score_field], client.get(mrr_field) or 0) for client in clients
+        )
+        return index
+
+    def extend(self, items):
+        """
+        Массово добавляет клиентов: items — тройки (key, score, mrr).
+
+        Новые записи дописываются в конец и список сортируется один раз,
+        что при загрузке всего портфеля намного быстрее поштучных вставок.
+        """
+        pending = {key: (score, mrr) for key, score, mrr in items}  # при дублях — последняя запись
+        for key in [key for key in pending if key in self._entries]:
+            self.remove(key)
+        for key, (score, mrr) in pending.items():
+            order = next(self._counter)
+            self._entries[key] = (score, order, mrr)
+            self._order.append((score, order, key))
+        self._order.sort(key=lambda item: (item[0], item[1]))
+
+    def update(self, key, score, mrr=0):
+        """Добавляет клиента или обновляет его балл и MRR."""
+        if key in self._entries:
+            self.remove(key)
+        order = next(self._counter)
+        self._entries[key] = (score, order, mrr)
+        insort(self._order, (score, order, key), key=lambda item: (item[0], item[1]))
+
+    def add_client(self, client, score, status=None, key_field="id", mrr_field="mrr"):
+        """Совместимо с потоковым расчетом cs_score_calculator.score_stream(renderer=...)."""
+        key = client.get(key_field)
+        if key is None:
+            key = client.get("name")
+        self.update(key, score, client.get(mrr_field) or 0)
+
+    def remove(self, key):
+        """Удаляет клиента из индекса (KeyError, если его нет)."""
+        score, order, _ = self._entries.pop(key)
+        position = bisect_left(self._order, (score, order), key=lambda item: (item[0], item[1]))
+        del self._order[position]
+
+    def score(self, key):
+        """Текущий балл клиента."""
+        return self._entries[key][0]
+
+    def mrr(self, key):
+        return self._entries[key][2]
+
+    def lowest(self, k):
+        """K клиентов с наименьшим баллом: список (key, score)."""
+        return [(key, score) for score, _, key in islice(self._order, k)]
+
+    def _position(self, score):
+        return bisect_left(self._order, score, key=lambda item: item[0])
+
+    def count_below(self, threshold=RISK_THRESHOLD):
+        """Сколько клиентов с баллом ниже порога."""
+        return self._position(threshold)
+
+    def in_range(self, low, high):
+        """Клиенты с баллом low <= score < high по возрастанию балла: список (key, score)."""
+        start, end = self._position(low), self._position(high)
+        return [(key, score) for score, _, key in self._order[start:end]]
+
+    def riskiest_by_mrr(self, k, threshold=RISK_THRESHOLD):
+        """K клиентов в зоне риска (балл ниже порога) с наибольшим MRR: список (key, score, mrr)."""
+        end = self._position(threshold)
+        entries = self._entries
+        top = heapq.nlargest(k, islice(self._order, end), key=lambda item: entries[item[2]][2])
+        return [(key, score, entries[key][2]) for score, _, key in top]
+
+
+def main(argv=None):
+    """Топ рисковых клиентов по файлу выгрузки."""
+    parser = argparse.ArgumentParser(description="Топ рисковых клиентов по health score.")
+    parser.add_argument("input", help="Выгрузка (CSV/JSONL, можно .gz; с полем score или сырыми метриками)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Формат входа (по умолчанию — по расширению)")
+    parser.add_argument("--top", type=int, default=50, help="Размер топа (по умолчанию 50)")
+    parser.add_argument("--by", choices=["score", "mrr"], default="score",
+                        help="score — наименьший балл, mrr — наибольший MRR среди рисковых")
+    parser.add_argument("--threshold", type=float, default=RISK_THRESHOLD,
+                        help=f"Порог зоны риска (по умолчанию {RISK_THRESHOLD})")
+    parser.add_argument("--key", default="id", help="Поле с ключом клиента (по умолчанию id)")
+    args = parser.parse_args(argv)
+
+    in_format = args.format or ("jsonl" if args.input == "-" else detect_format(args.input))
+    items = []
+    names = {}
+    with open_text(args.input, "r") as source:
+        for chunk in iter_chunks(read_clients(source, in_format), 10000):
+            if chunk and chunk[0].get("score") in (None, ""):
+                score_chunk(chunk)
+            for client in chunk:
+                key = client.get(args.key)
+                if key is None:   # 0 и "" — допустимые ключи, по имени — только если поля нет
+                    key = client.get("name")
+                mrr = client.get("mrr")
+                items.append((key, float(client["score"]), float(mrr) if mrr not in (None, "") else 0))
+                names[key] = client.get("name", key)
+    index = RiskIndex()
+    index.extend(items)
+
+    print(f"Клиентов в индексе: {len(index):,} | ниже {args.threshold:g} баллов: "
+          f"{index.count_below(args.threshold):,}")
+    if args.by == "mrr":
+        print(f"\n🚨 ТОП-{args.top} РИСКОВЫХ КЛИЕНТОВ ПО MRR:")
+        for i, (key, score, mrr) in enumerate(index.riskiest_by_mrr(args.top, args.threshold), 1):
+            print(f"   {i}. {names[key]}: {score}/100, MRR {mrr:,.0f} руб.")
+    else:
+        print(f"\n🚨 ТОП-{args.top} КЛИЕНТОВ С НАИМЕНЬШИМ HEALTH SCORE:")
+        for i, (key, score) in enumerate(index.lowest(args.top), 1):
+            print(f"   {i}. {names[key]}: {score}/100")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,98 @@
 Идеально для upsell-переговоров и обоснования ценности.
 """
 
+import argparse
+import html
+import json
+import math
+import numbers
+import random
+import sys
+from collections import namedtuple
+from functools import lru_cache
+from itertools import product
+
+from cs_score_calculator import ResultWriter, detect_format, iter_chunks, open_text, read_clients
+
+try:
+    import numpy as np
+except ImportError:  # NumPy не обязателен: пакетный расчет работает и на чистом Python
+    np = None
+
+
+# Колонки результата calculate_roi (в том же порядке, что и в словаре)
+ROI_FIELDS = (
+    "месячная_экономия",
+    "месячная_выгода",
+    "roi_в_месяц",
+    "окупаемость_месяцев",
+    "годовая_чистая_выгода",
+    "годовой_roi",
+)
+
+ROI_INPUTS = ("monthly_cost", "time_saved_hours", "hour_cost", "revenue_increase")
+
+# Размер кэша расчетов ROI по умолчанию (число различных наборов входов)
+ROI_CACHE_SIZE = 4096
+
+
+def _roi_values(monthly_cost, time_saved_hours, hour_cost, revenue_increase):
+    """Все метрики ROI кортежем в порядке ROI_FIELDS (уже округленные)."""
+    # Расчет прямой экономии на зарплатах
+    monthly_savings = time_saved_hours * hour_cost
+    
+    # Общая ежемесячная выгода
+    monthly_total_benefit = monthly_savings + revenue_increase
+    
+    # ROI в процентах
+    roi_percentage = ((monthly_total_benefit - monthly_cost) / monthly_cost) * 100 if monthly_cost > 0 else float('inf')
+    
+    # Срок окупаемости (месяцы)
+    payback_months = monthly_cost / monthly_total_benefit if monthly_total_benefit > 0 else float('inf')
+    
+    # Годовые значения
+    annual_cost = monthly_cost * 12
+    annual_benefit = monthly_total_benefit * 12
+    annual_net_gain = annual_benefit - annual_cost
+    
+    return (
+        round(monthly_savings, 2),
+        round(monthly_total_benefit, 2),
+        round(roi_percentage, 1),
+        round(payback_months, 1),
+        round(annual_net_gain, 2),
+        round((annual_net_gain / annual_cost) * 100, 1) if annual_cost > 0 else 0
+    )
+
+
+def _make_roi_cache(maxsize):
+    # typed=True: 1500 и 1500.0 кэшируются отдельно, иначе результат вернулся бы
+    # с типом первого вызова (30000 вместо 30000.0) и изменил бы форматирование
+    return lru_cache(maxsize=maxsize, typed=True)(_roi_values)
+
+
+_cached_roi_values = _make_roi_cache(ROI_CACHE_SIZE)
+
+
+def configure_roi_cache(maxsize=ROI_CACHE_SIZE):
+    """
+    Задает размер LRU-кэша расчетов ROI (0 — кэш выключен, None — без ограничения).
+    
+    Кэш и счетчики при этом сбрасываются.
+    """
+    global _cached_roi_values
+    _cached_roi_values = _make_roi_cache(maxsize)
+
+
+def roi_cache_info():
+    """Статистика кэша: попадания, промахи, размер (functools.lru_cache.cache_info)."""
+    return _cached_roi_values.cache_info()
+
+
+def clear_roi_cache():
+    _cached_roi_values.cache_clear()
+
+
 def calculate_roi(monthly_cost, time_saved_hours, hour_cost, revenue_increase):
     """
     Расчет возврата на инвестиции (ROI) для клиента.
@@ -17,129 +109,625 @@ def calculate_roi(monthly_cost, time_saved_hours, hour_cost, revenue_increase):
     
     Возвращает:
         dict: Детальный расчет ROI со всеми метриками.
+    
+    Повторные вызовы с теми же входами берутся из LRU-кэша (см. roi_cache_info).
     """
-    # Расчет прямой экономии на зарплатах
-    monthly_savings = time_saved_hours * hour_cost
+    # В кэше хранятся неизменяемые кортежи; каждый вызов получает свой словарь
+    return dict(zip(ROI_FIELDS, _cached_roi_values(monthly_cost, time_saved_hours, hour_cost, revenue_increase)))
+
+
+def _round_numpy(values, ndigits):
+    """
+    Округляет массив так же, как встроенный round().
     
-    # Общая ежемесячная выгода
+    np.round умножает на 10**ndigits и может ошибиться на пограничных
+    значениях (…5 в следующем разряде), поэтому такие элементы
+    доокругляются через round().
+    """
+    rounded = np.round(values, ndigits)
+    scaled = values * 10 ** ndigits
+    with np.errstate(invalid="ignore"):
+        suspicious = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in suspicious:
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
+def _roi_raw_numpy(monthly_cost, time_saved_hours, hour_cost, revenue_increase):
+    """Векторизованный расчет без округления (тот же порядок операций и те же граничные случаи)."""
+    monthly_cost, time_saved_hours, hour_cost, revenue_increase = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (monthly_cost, time_saved_hours, hour_cost, revenue_increase))
+    )
+    monthly_savings = time_saved_hours * hour_cost
     monthly_total_benefit = monthly_savings + revenue_increase
+    annual_cost = monthly_cost * 12
+    annual_net_gain = monthly_total_benefit * 12 - annual_cost
     
-    # ROI в процентах
-    roi_percentage = ((monthly_total_benefit - monthly_cost) / monthly_cost) * 100 if monthly_cost > 0 else float('inf')
+    # Деления только там, где знаменатель положителен; в остальных — inf / 0, как в calculate_roi
+    has_cost = monthly_cost > 0
+    has_benefit = monthly_total_benefit > 0
+    has_annual_cost = annual_cost > 0
+    roi_percentage = np.full(monthly_cost.shape, np.inf)
+    payback_months = np.full(monthly_cost.shape, np.inf)
+    annual_roi = np.zeros(monthly_cost.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        roi_percentage[has_cost] = (((monthly_total_benefit - monthly_cost) / monthly_cost) * 100)[has_cost]
+        payback_months[has_benefit] = (monthly_cost / monthly_total_benefit)[has_benefit]
+        annual_roi[has_annual_cost] = ((annual_net_gain / annual_cost) * 100)[has_annual_cost]
     
-    # Срок окупаемости (месяцы)
-    payback_months = monthly_cost / monthly_total_benefit if monthly_total_benefit > 0 else float('inf')
+    return monthly_savings, monthly_total_benefit, roi_percentage, payback_months, annual_net_gain, annual_roi
+
+
+def _roi_batch_numpy(monthly_cost, time_saved_hours, hour_cost, revenue_increase):
+    """Векторизованный расчет с округлением как в calculate_roi."""
+    raw = _roi_raw_numpy(monthly_cost, time_saved_hours, hour_cost, revenue_increase)
+    return tuple(_round_numpy(column, ndigits) for column, ndigits in zip(raw, (2, 2, 1, 1, 2, 1)))
+
+
+def calculate_roi_batch(monthly_cost, time_saved_hours, hour_cost, revenue_increase, use_numpy=None):
+    """
+    Пакетный расчет ROI: входы — массивы одинаковой длины или скаляры.
     
-    # Годовые значения
-    annual_cost = monthly_cost * 12
-    annual_benefit = monthly_total_benefit * 12
-    annual_net_gain = annual_benefit - annual_cost
+    Скаляры распространяются на все строки (например, одна ставка часа
+    для всех сценариев). Граничные случаи — как в calculate_roi: при нулевой
+    стоимости ROI = inf, при нулевой выгоде окупаемость = inf.
     
-    return {
-        "месячная_экономия": round(monthly_savings, 2),
-        "месячная_выгода": round(monthly_total_benefit, 2),
-        "roi_в_месяц": round(roi_percentage, 1),
-        "окупаемость_месяцев": round(payback_months, 1),
-        "годовая_чистая_выгода": round(annual_net_gain, 2),
-        "годовой_roi": round((annual_net_gain / annual_cost) * 100, 1) if annual_cost > 0 else 0
+    Аргументы:
+        use_numpy (bool): Принудительно включить/выключить NumPy
+            (по умолчанию — если библиотека установлена).
+    
+    Возвращает:
+        dict: Колонки с ключами ROI_FIELDS — массивы NumPy или списки.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        columns = _roi_batch_numpy(monthly_cost, time_saved_hours, hour_cost, revenue_increase)
+    else:
+        inputs = [list(v) if hasattr(v, "__len__") else None
+                  for v in (monthly_cost, time_saved_hours, hour_cost, revenue_increase)]
+        size = max((len(v) for v in inputs if v is not None), default=1)
+        scalars = (monthly_cost, time_saved_hours, hour_cost, revenue_increase)
+        rows = zip(*(column if column is not None else [scalar] * size
+                     for column, scalar in zip(inputs, scalars)))
+        cached = _cached_roi_values
+        values = [cached(*row) for row in rows]
+        columns = tuple(map(list, zip(*values))) if values else tuple([] for _ in ROI_FIELDS)
+    return dict(zip(ROI_FIELDS, columns))
+
+
+def _grid_axis(axis):
+    """Значения оси сетки списком; скаляр (в том числе np.int64 или 0-мерный массив) — одно значение."""
+    if np is not None and isinstance(axis, np.ndarray):
+        return axis.ravel().tolist()
+    if isinstance(axis, numbers.Number):
+        return [axis]
+    return list(axis)
+
+
+def roi_grid(monthly_cost, time_saved_hours, hour_cost, revenue_increase, use_numpy=None):
+    """
+    ROI по всем комбинациям значений (декартово произведение).
+    
+    Пример:
+        roi_grid(monthly_cost=[5000, 10000, 15000], time_saved_hours=range(10, 60, 10),
+                 hour_cost=[1000, 1500], revenue_increase=[0, 10000, 30000])
+    
+    Возвращает:
+        dict: Колонки входов (ROI_INPUTS) и результатов (ROI_FIELDS); строка i —
+        i-я комбинация, последний параметр меняется быстрее всего.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    axes = [_grid_axis(axis) for axis in (monthly_cost, time_saved_hours, hour_cost, revenue_increase)]
+    if use_numpy:
+        mesh = np.meshgrid(*(np.asarray(axis, dtype=np.float64) for axis in axes), indexing="ij")
+        inputs = [grid.ravel() for grid in mesh]
+    else:
+        combos = list(product(*axes))
+        inputs = [list(column) for column in zip(*combos)] if combos else [[] for _ in axes]
+    result = dict(zip(ROI_INPUTS, inputs))
+    result.update(calculate_roi_batch(*inputs, use_numpy=use_numpy))
+    return result
+
+
+# =================== МОДЕЛИРОВАНИЕ НЕОПРЕДЕЛЕННОСТИ ===================
+
+# Метрики, для которых строятся доверительные интервалы
+SIMULATION_FIELDS = ("roi_в_месяц", "окупаемость_месяцев", "годовая_чистая_выгода")
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def _parse_distribution(spec):
+    """
+    Приводит описание входа к виду (тип, параметры, min, max).
+    
+    Допустимые описания:
+        30                          — точное значение
+        (20, 40)                    — равномерно от 20 до 40
+        (20, 30, 50)                — треугольное: минимум, наиболее вероятное, максимум
+        {"dist": "normal", "mean": 30, "std": 5, "min": 0}
+        {"dist": "lognormal", "median": 30, "sigma": 0.3}
+        {"dist": "uniform", "low": 20, "high": 40}
+        {"dist": "triangular", "low": 20, "mode": 30, "high": 50}
+    Ключи min/max (необязательные) обрезают выборку.
+    """
+    if isinstance(spec, numbers.Real):   # в том числе скаляры NumPy (np.int64, np.float32)
+        return "fixed", (float(spec),), None, None
+    if isinstance(spec, (list, tuple)):
+        if len(spec) == 2:
+            spec = {"dist": "uniform", "low": spec[0], "high": spec[1]}
+        elif len(spec) == 3:
+            spec = {"dist": "triangular", "low": spec[0], "mode": spec[1], "high": spec[2]}
+        else:
+            raise ValueError(f"Диапазон должен содержать 2 или 3 числа, получено: {spec!r}")
+    if not isinstance(spec, dict):
+        raise ValueError(f"Неизвестное описание распределения: {spec!r}")
+    
+    params = {
+        "fixed": ("value",),
+        "uniform": ("low", "high"),
+        "triangular": ("low", "mode", "high"),
+        "normal": ("mean", "std"),
+        "lognormal": ("median", "sigma"),
     }
+    kind = spec.get("dist", "fixed")
+    if kind not in params:
+        raise ValueError(f"Неизвестное распределение '{kind}'. Доступны: {', '.join(params)}")
+    missing = [name for name in params[kind] if name not in spec]
+    if missing:
+        raise ValueError(f"Для распределения '{kind}' не заданы параметры: {', '.join(missing)}")
+    values = tuple(float(spec[name]) for name in params[kind])
+    
+    if kind in ("uniform", "triangular") and not values[0] <= values[-1]:
+        raise ValueError(f"Нижняя граница больше верхней: {spec!r}")
+    if kind == "triangular" and not values[0] <= values[1] <= values[2]:
+        raise ValueError(f"Наиболее вероятное значение вне диапазона: {spec!r}")
+    if kind in ("normal", "lognormal") and values[1] < 0:
+        raise ValueError(f"Разброс не может быть отрицательным: {spec!r}")
+    if kind in ("uniform", "triangular") and values[0] == values[-1]:
+        kind, values = "fixed", (values[0],)
+    if kind == "lognormal" and values[0] <= 0:
+        raise ValueError(f"Медиана логнормального распределения должна быть положительной: {spec!r}")
+    low, high = (None if spec.get(name) is None else float(spec[name]) for name in ("min", "max"))
+    if low is not None and high is not None and not low <= high:
+        raise ValueError(f"Ограничение min больше max: {spec!r}")
+    return kind, values, low, high
+
+
+def _sample_numpy(rng, distribution, draws):
+    kind, values, low, high = distribution
+    if kind == "fixed":
+        return np.full(draws, values[0])
+    if kind == "uniform":
+        sample = rng.uniform(values[0], values[1], draws)
+    elif kind == "triangular":
+        sample = rng.triangular(values[0], values[1], values[2], draws)
+    elif kind == "normal":
+        sample = rng.normal(values[0], values[1], draws)
+    else:
+        sample = rng.lognormal(math.log(values[0]), values[1], draws)
+    if low is not None or high is not None:
+        sample = np.clip(sample, low, high)
+    return sample
+
+
+def _sample_python(rng, distribution, draws):
+    kind, values, low, high = distribution
+    if kind == "fixed":
+        return [values[0]] * draws
+    if kind == "uniform":
+        sample = [rng.uniform(values[0], values[1]) for _ in range(draws)]
+    elif kind == "triangular":
+        sample = [rng.triangular(values[0], values[2], values[1]) for _ in range(draws)]
+    elif kind == "normal":
+        sample = [rng.gauss(values[0], values[1]) for _ in range(draws)]
+    else:
+        mu = math.log(values[0])
+        sample = [rng.lognormvariate(mu, values[1]) for _ in range(draws)]
+    if low is not None:
+        sample = [max(low, value) for value in sample]
+    if high is not None:
+        sample = [min(high, value) for value in sample]
+    return sample
+
+
+def _percentile_sorted(values, q):
+    """Перцентиль без интерполяции (значение из выборки) — корректен и при inf."""
+    position = max(0, math.ceil(q / 100 * len(values)) - 1)
+    return float(values[min(position, len(values) - 1)])
 
 
-def create_roi_presentation(client_data, current_plan, new_plan):
+def simulate_roi(monthly_cost, time_saved_hours, hour_cost, revenue_increase,
+                 draws=100_000, percentiles=DEFAULT_PERCENTILES, seed=None, use_numpy=None):
     """
-    Создает наглядную презентацию ROI для сравнения тарифов.
+    Моделирование ROI методом Монте-Карло для неточных оценок.
+    
+    Каждый вход — число или распределение (см. _parse_distribution),
+    например time_saved_hours=(20, 30, 50): "от 20 до 50 часов, скорее всего 30".
     
     Аргументы:
-        client_data (dict): Данные клиента
-        current_plan (dict): Текущий тариф
-        new_plan (dict): Предлагаемый тариф
+        draws (int): Число испытаний (10^5–10^6 считаются за доли секунды с NumPy).
+        percentiles (tuple): Перцентили для интервалов, в процентах.
+        seed (int): Зерно генератора для воспроизводимости.
+        use_numpy (bool): Принудительно включить/выключить NumPy.
+    
+    Возвращает:
+        dict: Для каждой метрики SIMULATION_FIELDS — {перцентиль: значение};
+        "вероятность_окупаемости" — доля испытаний с положительной годовой
+        чистой выгодой; "испытаний" — число испытаний.
     """
-    print("\n" + "="*70)
-    print("📊 КАЛЬКУЛЯТОР ROI ДЛЯ ПЕРЕГОВОРОВ С КЛИЕНТОМ")
-    print("="*70)
+    if draws <= 0:
+        raise ValueError("Число испытаний должно быть положительным")
+    if use_numpy is None:
+        use_numpy = np is not None
+    distributions = [_parse_distribution(spec)
+                     for spec in (monthly_cost, time_saved_hours, hour_cost, revenue_increase)]
     
-    print(f"\n👤 Клиент: {client_data['name']}")
-    print(f"💰 Стоимость часа сотрудника: {client_data['hour_rate']:,} руб./час")
-    
-    print(f"\n📋 ТЕКУЩИЙ ТАРИФ: {current_plan['name']}")
-    print(f"   Стоимость: {current_plan['cost']:,} руб./мес")
-    print("   Включено:")
-    for feature in current_plan['features']:
-        print(f"     • {feature}")
-    
-    print(f"\n🚀 ПРЕДЛАГАЕМЫЙ ТАРИФ: {new_plan['name']}")
-    print(f"   Стоимость: {new_plan['cost']:,} руб./мес")
-    print("   Дополнительные возможности:")
-    for feature in new_plan['features']:
-        print(f"     ✅ {feature}")
-    
-    # Расчет ROI для обоих тарифов
-    roi_current = calculate_roi(
-        monthly_cost=current_plan['cost'],
-        time_saved_hours=current_plan['time_saved'],
-        hour_cost=client_data['hour_rate'],
-        revenue_increase=current_plan['revenue_impact']
-    )
+    if use_numpy:
+        rng = np.random.default_rng(seed)
+        samples = [_sample_numpy(rng, distribution, draws) for distribution in distributions]
+        _, _, roi_percentage, payback_months, annual_net_gain, _ = _roi_raw_numpy(*samples)
+        columns = [np.sort(roi_percentage), np.sort(payback_months), np.sort(annual_net_gain)]
+        positive = int(np.count_nonzero(annual_net_gain > 0))
+    else:
+        rng = random.Random(seed)
+        samples = [_sample_python(rng, distribution, draws) for distribution in distributions]
+        # Без округления: интервалы строятся по точным значениям испытаний
+        roi_percentage, payback_months, annual_net_gain = [], [], []
+        for cost, hours, rate, revenue in zip(*samples):
+            benefit = hours * rate + revenue
+            roi_percentage.append(((benefit - cost) / cost) * 100 if cost > 0 else float('inf'))
+            payback_months.append(cost / benefit if benefit > 0 else float('inf'))
+            annual_net_gain.append(benefit * 12 - cost * 12)
+        columns = [sorted(roi_percentage), sorted(payback_months), sorted(annual_net_gain)]
+        positive = sum(1 for value in annual_net_gain if value > 0)
     
-    roi_new = calculate_roi(
-        monthly_cost=new_plan['cost'],
-        time_saved_hours=new_plan['time_saved'],
-        hour_cost=client_data['hour_rate'],
-        revenue_increase=new_plan['revenue_impact']
-    )
+    result = {
+        field: {q: _percentile_sorted(column, q) for q in percentiles}
+        for field, column in zip(SIMULATION_FIELDS, columns)
+    }
+    result["вероятность_окупаемости"] = positive / draws
+    result["испытаний"] = draws
+    return result
+
+
+# Метрики доверительных интервалов: (название, единица, поле, формат числа)
+INTERVAL_METRICS = (
+    ("📊 ROI в месяц", "%", "roi_в_месяц", ",.1f"),
+    ("⏱️ Окупаемость", "мес.", "окупаемость_месяцев", ",.2f"),
+    ("🏆 Годовая чистая выгода", "руб.", "годовая_чистая_выгода", ",.0f"),
+)
+
+
+def _interval_lines(simulation):
+    """Строки с доверительными интервалами из simulate_roi (крайние перцентили и медиана)."""
+    lines = []
+    for metric_name, unit, field, fmt in INTERVAL_METRICS:
+        bands = simulation[field]
+        low, high = min(bands), max(bands)
+        median = bands.get(50)
+        lines.append(f"\n{metric_name}:")
+        if median is not None:
+            lines.append(f"   Медиана: {format(median, fmt)} {unit}")
+        lines.append(f"   Интервал P{low}–P{high}: {format(bands[low], fmt)} … {format(bands[high], fmt)} {unit}")
+    lines.append(f"\n✅ Вероятность окупаемости: {simulation['вероятность_окупаемости']:.0%} "
+                 f"({simulation['испытаний']:,} испытаний)")
+    return lines
+
+
+def print_roi_intervals(simulation):
+    """Печатает доверительные интервалы из simulate_roi (крайние перцентили и медиану)."""
+    print("\n".join(_interval_lines(simulation)))
+
+
+# =================== СРАВНЕНИЕ ТАРИФОВ ===================
+
+# Метрики сравнительной таблицы: (название, единица, поле calculate_roi)
+COMPARISON_METRICS = (
+    ("💰 Ежемесячная экономия", "руб.", "месячная_экономия"),
+    ("💵 Ежемесячная выгода", "руб.", "месячная_выгода"),
+    ("📊 ROI в месяц", "%", "roi_в_месяц"),
+    ("⏱️ Окупаемость", "мес.", "окупаемость_месяцев"),
+    ("🏆 Годовая чистая выгода", "руб.", "годовая_чистая_выгода"),
+)
+
+class PlanComparison(namedtuple("PlanComparison", [
+    "client",                   # данные клиента (name, hour_rate)
+    "current_plan",             # текущий тариф
+    "new_plan",                 # предлагаемый тариф
+    "roi_current",              # calculate_roi для текущего тарифа
+    "roi_new",                  # calculate_roi для нового тарифа
+    "additional_yearly_gain",   # дополнительная годовая чистая выгода, руб.
+    "additional_monthly_cost",  # доплата за новый тариф, руб./мес
+    "payback_years",            # окупаемость доплаты, лет (None, если апгрейд не выгоден)
+    "gain_per_ruble",           # выгода на рубль доплаты (None, если апгрейд не выгоден)
+    "simulation",               # simulate_roi для нового тарифа или None
+])):
+    """Результат compare_plans: все показатели сравнения, посчитанные один раз."""
     
-    print("\n" + "="*70)
-    print("📈 СРАВНИТЕЛЬНЫЙ АНАЛИЗ ВЫГОДЫ")
-    print("="*70)
+    __slots__ = ()
+    
+    @property
+    def upgrade_recommended(self):
+        return self.additional_yearly_gain > 0
+
+
+def compare_plans(client_data, current_plan, new_plan, uncertainty=None, draws=100_000):
+    """
+    Сравнение текущего и предлагаемого тарифа без вывода на экран.
     
-    # Таблица сравнения
-    metrics = [
-        ("💰 Ежемесячная экономия", "руб.", roi_current["месячная_экономия"], roi_new["месячная_экономия"]),
-        ("💵 Ежемесячная выгода", "руб.", roi_current["месячная_выгода"], roi_new["месячная_выгода"]),
-        ("📊 ROI в месяц", "%", roi_current["roi_в_месяц"], roi_new["roi_в_месяц"]),
-        ("⏱️ Окупаемость", "мес.", roi_current["окупаемость_месяцев"], roi_new["окупаемость_месяцев"]),
-        ("🏆 Годовая чистая выгода", "руб.", roi_current["годовая_чистая_выгода"], roi_new["годовая_чистая_выгода"]),
+    Все показатели считаются один раз; вывод — render_comparison()
+    или create_roi_presentation().
+    
+    Аргументы:
+        client_data (dict): Данные клиента (name, hour_rate)
+        current_plan (dict): Текущий тариф (name, cost, time_saved, revenue_impact, features)
+        new_plan (dict): Предлагаемый тариф
+        uncertainty (dict): Необязательные распределения для входов нового тарифа
+            (см. create_roi_presentation).
+        draws (int): Число испытаний для доверительных интервалов.
+    
+    Возвращает:
+        PlanComparison: Результат сравнения.
+    """
+    hour_rate = client_data['hour_rate']
+    roi_current = calculate_roi(current_plan['cost'], current_plan['time_saved'],
+                                hour_rate, current_plan['revenue_impact'])
+    roi_new = calculate_roi(new_plan['cost'], new_plan['time_saved'],
+                            hour_rate, new_plan['revenue_impact'])
+    
+    additional_yearly_gain = roi_new["годовая_чистая_выгода"] - roi_current["годовая_чистая_выгода"]
+    additional_monthly_cost = new_plan['cost'] - current_plan['cost']
+    additional_yearly_cost = additional_monthly_cost * 12
+    if additional_yearly_gain > 0:
+        payback_years = additional_yearly_cost / additional_yearly_gain
+        gain_per_ruble = additional_yearly_gain / additional_yearly_cost if additional_yearly_cost else float('inf')
+    else:
+        payback_years = gain_per_ruble = None
+    
+    simulation = None
+    if uncertainty:
+        simulation = simulate_roi(
+            monthly_cost=uncertainty.get('cost', new_plan['cost']),
+            time_saved_hours=uncertainty.get('time_saved', new_plan['time_saved']),
+            hour_cost=uncertainty.get('hour_rate', hour_rate),
+            revenue_increase=uncertainty.get('revenue_impact', new_plan['revenue_impact']),
+            draws=draws
+        )
+    
+    return PlanComparison(client_data, current_plan, new_plan, roi_current, roi_new,
+                          additional_yearly_gain, additional_monthly_cost,
+                          payback_years, gain_per_ruble, simulation)
+
+
+def _metric_rows(comparison):
+    """Строки сравнительной таблицы: (название, единица, текущий, новый, изменение)."""
+    for metric_name, unit, field in COMPARISON_METRICS:
+        current_val, new_val = comparison.roi_current[field], comparison.roi_new[field]
+        yield metric_name, unit, current_val, new_val, new_val - current_val
+
+
+def _plain_metric_name(metric_name):
+    """Название метрики без эмодзи (для таблиц и JSON)."""
+    return metric_name.split(" ", 1)[1]
+
+
+def render_text(comparison):
+    """Презентация для терминала (как выводит create_roi_presentation)."""
+    client, current_plan, new_plan = comparison.client, comparison.current_plan, comparison.new_plan
+    lines = [
+        "\n" + "="*70,
+        "📊 КАЛЬКУЛЯТОР ROI ДЛЯ ПЕРЕГОВОРОВ С КЛИЕНТОМ",
+        "="*70,
+        f"\n👤 Клиент: {client['name']}",
+        f"💰 Стоимость часа сотрудника: {client['hour_rate']:,} руб./час",
+        f"\n📋 ТЕКУЩИЙ ТАРИФ: {current_plan['name']}",
+        f"   Стоимость: {current_plan['cost']:,} руб./мес",
+        "   Включено:",
     ]
+    lines.extend(f"     • {feature}" for feature in current_plan.get('features', ()))
+    lines += [
+        f"\n🚀 ПРЕДЛАГАЕМЫЙ ТАРИФ: {new_plan['name']}",
+        f"   Стоимость: {new_plan['cost']:,} руб./мес",
+        "   Дополнительные возможности:",
+    ]
+    lines.extend(f"     ✅ {feature}" for feature in new_plan.get('features', ()))
     
-    for metric_name, unit, current_val, new_val in metrics:
-        diff = new_val - current_val
+    lines += ["\n" + "="*70, "📈 СРАВНИТЕЛЬНЫЙ АНАЛИЗ ВЫГОДЫ", "="*70]
+    for metric_name, unit, current_val, new_val, diff in _metric_rows(comparison):
         diff_sign = "+" if diff > 0 else ""
-        print(f"\n{metric_name}:")
-        print(f"   Текущий: {current_val:,} {unit}")
-        print(f"   Новый:   {new_val:,} {unit}")
+        lines += [
+            f"\n{metric_name}:",
+            f"   Текущий: {current_val:,} {unit}",
+            f"   Новый:   {new_val:,} {unit}",
+        ]
         if unit == "%":
-            print(f"   Изменение: {diff_sign}{diff:+.1f} {unit}")
+            lines.append(f"   Изменение: {diff_sign}{diff:+.1f} {unit}")
         else:
-            print(f"   Изменение: {diff_sign}{diff:+,.0f} {unit}")
+            lines.append(f"   Изменение: {diff_sign}{diff:+,.0f} {unit}")
     
-    print("\n" + "="*70)
-    print("🎯 ВЫВОДЫ И РЕКОМЕНДАЦИИ ДЛЯ ПЕРЕГОВОРОВ")
-    print("="*70)
+    if comparison.simulation is not None:
+        lines += ["\n" + "="*70, f"🎲 ДОВЕРИТЕЛЬНЫЕ ИНТЕРВАЛЫ (тариф '{new_plan['name']}')", "="*70]
+        lines += _interval_lines(comparison.simulation)
     
-    # Автоматические рекомендации
-    additional_yearly_gain = roi_new["годовая_чистая_выгода"] - roi_current["годовая_чистая_выгода"]
-    additional_monthly_cost = new_plan['cost'] - current_plan['cost']
+    lines += ["\n" + "="*70, "🎯 ВЫВОДЫ И РЕКОМЕНДАЦИИ ДЛЯ ПЕРЕГОВОРОВ", "="*70]
     
-    if additional_yearly_gain > 0:
-        print(f"\n✅ АПГРЕЙД ОПРАВДАН: При переходе на тариф '{new_plan['name']}':")
-        print(f"   • Клиент получит ДОПОЛНИТЕЛЬНО {additional_yearly_gain:+,.0f} руб. в год")
-        print(f"   • Окупаемость доп. инвестиций: {additional_monthly_cost * 12 / additional_yearly_gain:.1f} лет")
-        print(f"   • Каждый рубль инвестиций принесет {additional_yearly_gain / (additional_monthly_cost * 12):.2f} руб. выгоды")
-        
-        # Готовые фразы для переговоров
-        print(f"\n💬 КЛЮЧЕВЫЕ АРГУМЕНТЫ ДЛЯ КЛИЕНТА:")
-        print(f"   1. 'Вы инвестируете {additional_monthly_cost:,} руб./мес, но получаете {additional_yearly_gain/12:,.0f} руб./мес дополнительной выгоды'")
-        print(f"   2. 'Новый тариф окупит себя за {additional_monthly_cost * 12 / additional_yearly_gain:.1f} лет, после чего будет приносить чистую прибыль'")
-        print(f"   3. 'Это как нанять дополнительного сотрудника за {additional_monthly_cost:,} руб./мес, который экономит вам {additional_yearly_gain/12:,.0f} руб./мес'")
+    additional_yearly_gain = comparison.additional_yearly_gain
+    additional_monthly_cost = comparison.additional_monthly_cost
+    if comparison.upgrade_recommended:
+        lines += [
+            f"\n✅ АПГРЕЙД ОПРАВДАН: При переходе на тариф '{new_plan['name']}':",
+            f"   • Клиент получит ДОПОЛНИТЕЛЬНО {additional_yearly_gain:+,.0f} руб. в год",
+            f"   • Окупаемость доп. инвестиций: {comparison.payback_years:.1f} лет",
+            f"   • Каждый рубль инвестиций принесет {comparison.gain_per_ruble:.2f} руб. выгоды",
+            
+            # Готовые фразы для переговоров
+            f"\n💬 КЛЮЧЕВЫЕ АРГУМЕНТЫ ДЛЯ КЛИЕНТА:",
+            f"   1. 'Вы инвестируете {additional_monthly_cost:,} руб./мес, но получаете {additional_yearly_gain/12:,.0f} руб./мес дополнительной выгоды'",
+            f"   2. 'Новый тариф окупит себя за {comparison.payback_years:.1f} лет, после чего будет приносить чистую прибыль'",
+            f"   3. 'Это как нанять дополнительного сотрудника за {additional_monthly_cost:,} руб./мес, который экономит вам {additional_yearly_gain/12:,.0f} руб./мес'",
+        ]
     else:
-        print(f"\n⚠️  АПГРЕЙД НЕ РЕКОМЕНДУЕТСЯ")
-        print(f"   Дополнительные инвестиции не принесут достаточной выгоды.")
-        print(f"   Рекомендуем остаться на текущем тарифе или обсудить кастомизацию.")
+        lines += [
+            f"\n⚠️  АПГРЕЙД НЕ РЕКОМЕНДУЕТСЯ",
+            f"   Дополнительные инвестиции не принесут достаточной выгоды.",
+            f"   Рекомендуем остаться на текущем тарифе или обсудить кастомизацию.",
+        ]
     
-    print("\n" + "="*70)
-    print("📄 ПРИМЕЧАНИЕ: Расчет основан на предоставленных данных.")
-    print("   Реальные результаты могут отличаться.")
-    print("="*70)
+    lines += [
+        "\n" + "="*70,
+        "📄 ПРИМЕЧАНИЕ: Расчет основан на предоставленных данных.",
+        "   Реальные результаты могут отличаться.",
+        "="*70,
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def render_markdown(comparison):
+    """Сравнение тарифов в Markdown (для писем, вики и CRM)."""
+    client, current_plan, new_plan = comparison.client, comparison.current_plan, comparison.new_plan
+    lines = [
+        f"## ROI: {client['name']}",
+        "",
+        f"Стоимость часа сотрудника: {client['hour_rate']:,} руб./час",
+        "",
+        f"| Показатель | {current_plan['name']} | {new_plan['name']} | Изменение |",
+        "|---|---:|---:|---:|",
+        f"| Стоимость, руб./мес | {current_plan['cost']:,} | {new_plan['cost']:,} "
+        f"| {comparison.additional_monthly_cost:+,} |",
+    ]
+    for metric_name, unit, current_val, new_val, diff in _metric_rows(comparison):
+        diff_text = f"{diff:+.1f}" if unit == "%" else f"{diff:+,.0f}"
+        lines.append(f"| {_plain_metric_name(metric_name)}, {unit} | {current_val:,} | {new_val:,} | {diff_text} |")
+    lines.append("")
+    if comparison.upgrade_recommended:
+        lines.append(f"**Апгрейд оправдан:** дополнительно {comparison.additional_yearly_gain:+,.0f} руб. в год, "
+                     f"окупаемость {comparison.payback_years:.1f} лет, "
+                     f"{comparison.gain_per_ruble:.2f} руб. выгоды на рубль.")
+    else:
+        lines.append("**Апгрейд не рекомендуется:** дополнительные инвестиции не принесут достаточной выгоды.")
+    simulation = comparison.simulation
+    if simulation is not None:
+        lines += ["", f"Доверительные интервалы ({simulation['испытаний']:,} испытаний, "
+                      f"вероятность окупаемости {simulation['вероятность_окупаемости']:.0%}):", "",
+                  "| Показатель | Медиана | Интервал |", "|---|---:|---:|"]
+        for metric_name, unit, field, fmt in INTERVAL_METRICS:
+            bands = simulation[field]
+            low, high = min(bands), max(bands)
+            median = format(bands[50], fmt) if 50 in bands else "—"
+            lines.append(f"| {_plain_metric_name(metric_name)}, {unit} | {median} "
+                         f"| P{low}–P{high}: {format(bands[low], fmt)} … {format(bands[high], fmt)} |")
+    return "\n".join(lines) + "\n\n"
+
+
+def render_html(comparison):
+    """Сравнение тарифов фрагментом HTML (<section>) — фрагменты можно склеивать в один отчет."""
+    client, current_plan, new_plan = comparison.client, comparison.current_plan, comparison.new_plan
+    esc = html.escape
+    rows = [
+        f"<tr><td>Стоимость, руб./мес</td><td>{current_plan['cost']:,}</td><td>{new_plan['cost']:,}</td>"
+        f"<td>{comparison.additional_monthly_cost:+,}</td></tr>"
+    ]
+    for metric_name, unit, current_val, new_val, diff in _metric_rows(comparison):
+        diff_text = f"{diff:+.1f}" if unit == "%" else f"{diff:+,.0f}"
+        rows.append(f"<tr><td>{esc(_plain_metric_name(metric_name))}, {esc(unit)}</td>"
+                    f"<td>{current_val:,}</td><td>{new_val:,}</td><td>{diff_text}</td></tr>")
+    if comparison.upgrade_recommended:
+        verdict = (f"<p class=\"verdict ok\">Апгрейд оправдан: дополнительно "
+                   f"{comparison.additional_yearly_gain:+,.0f} руб. в год, окупаемость "
+                   f"{comparison.payback_years:.1f} лет.</p>")
+    else:
+        verdict = "<p class=\"verdict warn\">Апгрейд не рекомендуется.</p>"
+    return (
+        f"<section class=\"roi\">\n<h2>ROI: {esc(str(client['name']))}</h2>\n"
+        f"<p>Стоимость часа сотрудника: {client['hour_rate']:,} руб./час</p>\n"
+        f"<table>\n<tr><th>Показатель</th><th>{esc(str(current_plan['name']))}</th>"
+        f"<th>{esc(str(new_plan['name']))}</th><th>Изменение</th></tr>\n"
+        + "\n".join(rows) + f"\n</table>\n{verdict}\n</section>\n"
+    )
+
+
+def _json_number(value):
+    """inf не представим в JSON — заменяется на null."""
+    return None if isinstance(value, float) and math.isinf(value) else value
+
+
+def comparison_to_dict(comparison):
+    """Результат сравнения в виде словаря, пригодного для JSON."""
+    return {
+        "client": comparison.client.get('name'),
+        "hour_rate": comparison.client['hour_rate'],
+        "current_plan": comparison.current_plan['name'],
+        "new_plan": comparison.new_plan['name'],
+        "roi_current": {k: _json_number(v) for k, v in comparison.roi_current.items()},
+        "roi_new": {k: _json_number(v) for k, v in comparison.roi_new.items()},
+        "additional_yearly_gain": comparison.additional_yearly_gain,
+        "additional_monthly_cost": comparison.additional_monthly_cost,
+        "payback_years": comparison.payback_years,
+        "gain_per_ruble": _json_number(comparison.gain_per_ruble),
+        "upgrade_recommended": comparison.upgrade_recommended,
+        "simulation": None if comparison.simulation is None else {
+            k: ({str(q): _json_number(v) for q, v in bands.items()} if isinstance(bands, dict) else bands)
+            for k, bands in comparison.simulation.items()
+        },
+    }
+
+
+def render_json(comparison):
+    """Сравнение тарифов одной строкой JSON (NDJSON при выводе пачкой)."""
+    return json.dumps(comparison_to_dict(comparison), ensure_ascii=False) + "\n"
+
+
+RENDERERS = {
+    "text": render_text,
+    "markdown": render_markdown,
+    "html": render_html,
+    "json": render_json,
+}
+
+
+def render_comparisons(comparisons, fmt="text", stream=None, buffer_size=1 << 16):
+    """
+    Выводит пачку сравнений в выбранном формате (RENDERERS).
+    
+    Текст накапливается в буфере и пишется крупными блоками, поэтому
+    отчеты по всему портфелю не упираются в построчный вывод.
+    """
+    render = RENDERERS[fmt]
+    stream = stream or sys.stdout
+    buffer, size = [], 0
+    for comparison in comparisons:
+        chunk = render(comparison)
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            stream.write("".join(buffer))
+            buffer, size = [], 0
+    if buffer:
+        stream.write("".join(buffer))
+
+
+def create_roi_presentation(client_data, current_plan, new_plan, uncertainty=None, draws=100_000):
+    """
+    Создает наглядную презентацию ROI для сравнения тарифов.
+    
+    Аргументы:
+        client_data (dict): Данные клиента
+        current_plan (dict): Текущий тариф
+        new_plan (dict): Предлагаемый тариф
+        uncertainty (dict): Необязательные распределения для входов нового
+            тарифа, например {"time_saved": (30, 50, 60), "revenue_impact": (10000, 30000, 40000)}.
+            Если заданы — выводятся доверительные интервалы (см. simulate_roi).
+        draws (int): Число испытаний для доверительных интервалов.
+    
+    Возвращает:
+        PlanComparison: Результат сравнения (для дальнейшей обработки).
+    """
+    comparison = compare_plans(client_data, current_plan, new_plan, uncertainty, draws)
+    sys.stdout.write(render_text(comparison))
+    return comparison
 
 
 def interactive_roi_calculator():
@@ -187,8 +775,210 @@ def interactive_roi_calculator():
         print("❌ Ошибка! Деление на ноль. Проверьте введенные данные.")
 
 
+# =================== КОМАНДНАЯ СТРОКА ===================
+
+# Синонимы входных полей: в выгрузках и каталоге тарифов встречаются оба варианта
+INPUT_ALIASES = {
+    "cost": "monthly_cost",
+    "time_saved": "time_saved_hours",
+    "hour_rate": "hour_cost",
+    "revenue_impact": "revenue_increase",
+}
+
+
+def load_plan_catalog(path):
+    """
+    Загружает каталог тарифов: словарь {название: тариф}.
+    
+    Формат — JSON как example_plans: {"Базовый": {"cost": 5000, "time_saved": 20,
+    "revenue_impact": 10000}, ...}, либо список тарифов с полем "name".
+    У каждого тарифа обязательны поля cost, time_saved и revenue_impact.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and isinstance(data.get("plans"), (list, dict)):
+        data = data["plans"]
+    if isinstance(data, list):
+        data = {plan["name"]: plan for plan in data}
+    
+    catalog = {}
+    for name, plan in data.items():
+        missing = [field for field in ("cost", "time_saved", "revenue_impact") if field not in plan]
+        if missing:
+            raise ValueError(f"В тарифе '{name}' не заданы поля: {', '.join(missing)}")
+        catalog[name] = dict(plan, name=name)
+    if not catalog:
+        raise ValueError("Каталог тарифов пуст")
+    return catalog
+
+
+def number(value):
+    """Число из аргумента или ячейки CSV: целые остаются int (как при ручном вызове calculate_roi)."""
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def _roi_inputs(row):
+    """Четыре входа calculate_roi из строки выгрузки (с учетом синонимов) или None."""
+    values = {INPUT_ALIASES.get(key, key): value for key, value in row.items()}
+    try:
+        return [number(values[name]) for name in ROI_INPUTS]
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _plain_row(row):
+    """inf не представим в JSON — в выводе NDJSON заменяется на null."""
+    return {key: _json_number(value) for key, value in row.items()}
+
+
+def _batch_roi(rows, writer, out_format, chunk_size, stream):
+    """Пакетный ROI: к каждой строке дописываются колонки ROI_FIELDS."""
+    processed = skipped = 0
+    for chunk in iter_chunks(rows, chunk_size):
+        valid, inputs = [], []
+        for row in chunk:
+            values = _roi_inputs(row)
+            if values is None:
+                skipped += 1
+                continue
+            valid.append(row)
+            inputs.append(values)
+        if not valid:
+            continue
+        columns = calculate_roi_batch(*zip(*inputs))
+        columns = [column.tolist() if hasattr(column, "tolist") else column for column in columns.values()]
+        for row, values in zip(valid, zip(*columns)):
+            row.update(zip(ROI_FIELDS, values))
+        writer.write_rows([_plain_row(row) for row in valid] if out_format == "jsonl" else valid)
+        stream.flush()  # результаты уходят дальше по конвейеру по мере расчета
+        processed += len(valid)
+    return processed, skipped
+
+
+def _batch_compare(rows, catalog, fmt, chunk_size, stream, new_plan_name=None):
+    """Пакетное сравнение тарифов: строки name, hour_rate, plan и new_plan (или --new)."""
+    processed = skipped = 0
+    for chunk in iter_chunks(rows, chunk_size):
+        comparisons = []
+        for row in chunk:
+            current = catalog.get(row.get("plan"))
+            new = catalog.get(row.get("new_plan") or new_plan_name)
+            try:
+                hour_rate = number(row.get("hour_rate"))
+            except (TypeError, ValueError):
+                hour_rate = None
+            if current is None or new is None or hour_rate is None:
+                skipped += 1
+                continue
+            # Без name строка подписывается ключом клиента — как --client в режиме compare
+            name = row.get("name") or row.get("id") or "Клиент"
+            comparisons.append(compare_plans(dict(row, name=name, hour_rate=hour_rate), current, new))
+        render_comparisons(comparisons, fmt, stream)
+        stream.flush()
+        processed += len(comparisons)
+    return processed, skipped
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(description="Калькулятор ROI без интерактивного ввода.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    single = commands.add_parser("single", help="ROI по одному набору входов")
+    single.add_argument("--cost", type=number, required=True, help="Стоимость продукта, руб./мес")
+    single.add_argument("--hours", type=number, required=True, help="Сэкономленные часы в месяц")
+    single.add_argument("--rate", type=number, required=True, help="Стоимость часа сотрудника, руб.")
+    single.add_argument("--revenue", type=number, default=0, help="Прирост выручки, руб./мес (по умолчанию 0)")
+    single.add_argument("--format", choices=["text", "json"], default="text", help="Формат вывода")
+    
+    compare = commands.add_parser("compare", help="Сравнение двух тарифов каталога для клиента")
+    compare.add_argument("--plans", required=True, help="JSON-файл с каталогом тарифов")
+    compare.add_argument("--current", required=True, help="Текущий тариф (название в каталоге)")
+    compare.add_argument("--new", required=True, help="Предлагаемый тариф (название в каталоге)")
+    compare.add_argument("--rate", type=number, required=True, help="Стоимость часа сотрудника, руб.")
+    compare.add_argument("--client", default="Клиент", help="Название клиента")
+    compare.add_argument("--format", choices=RENDERERS, default="text", help="Формат вывода")
+    
+    batch = commands.add_parser(
+        "batch", help="Пакетный расчет по файлу или stdin (NDJSON/CSV)",
+        description="Без --plans: строки с monthly_cost, time_saved_hours, hour_cost, revenue_increase "
+                    "(или cost, time_saved, hour_rate, revenue_impact) — к ним дописываются метрики ROI. "
+                    "С --plans: строки с name, hour_rate, plan и new_plan — сравнение тарифов."
+    )
+    batch.add_argument("input", nargs="?", default="-", help="Файл (CSV/NDJSON, можно .gz) или '-' для stdin")
+    batch.add_argument("--format", choices=["csv", "jsonl"],
+                       help="Формат входа (по умолчанию — по расширению; для stdin — jsonl)")
+    batch.add_argument("-o", "--output", default="-", help="Куда писать результаты (по умолчанию stdout)")
+    batch.add_argument("--output-format", choices=["csv", "jsonl", *RENDERERS],
+                       help="Формат выхода: csv/jsonl для ROI, text/markdown/html/json для сравнений")
+    batch.add_argument("--plans", help="JSON-файл с каталогом тарифов (режим сравнения)")
+    batch.add_argument("--new", help="Предлагаемый тариф для строк без поля new_plan (только с --plans)")
+    batch.add_argument("--chunk-size", type=int, default=1000, help="Размер пачки строк (по умолчанию 1000)")
+    return parser
+
+
+def main(argv=None):
+    """Точка входа командной строки: никогда не ждет ввода с клавиатуры."""
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "batch" and args.new and not args.plans:
+        parser.error("--new задает тариф из каталога и работает только вместе с --plans")
+    try:
+        if args.command == "single":
+            result = calculate_roi(args.cost, args.hours, args.rate, args.revenue)
+            if args.format == "json":
+                print(json.dumps(_plain_row(result), ensure_ascii=False))
+            else:
+                for key, value in result.items():
+                    print(f"{key}: {value}")
+            return 0
+        
+        catalog = load_plan_catalog(args.plans) if args.plans else None
+        if args.command == "compare":
+            for name in (args.current, args.new):
+                if name not in catalog:
+                    raise ValueError(f"Тарифа '{name}' нет в каталоге")
+            comparison = compare_plans({"name": args.client, "hour_rate": args.rate},
+                                       catalog[args.current], catalog[args.new])
+            render_comparisons([comparison], args.format)
+            return 0
+        
+        in_format = args.format or ("jsonl" if args.input == "-" else detect_format(args.input))
+        with open_text(args.input, "r") as source, open_text(args.output, "w") as out:
+            rows = read_clients(source, in_format)
+            if catalog is not None:
+                if args.new and args.new not in catalog:
+                    raise ValueError(f"Тарифа '{args.new}' нет в каталоге")
+                out_format = args.output_format or "json"
+                if out_format not in RENDERERS:
+                    raise ValueError(f"Для сравнения тарифов формат выхода: {', '.join(RENDERERS)}")
+                processed, skipped = _batch_compare(rows, catalog, out_format, args.chunk_size, out, args.new)
+            else:
+                out_format = args.output_format or (
+                    "jsonl" if args.output == "-" else detect_format(args.output))
+                if out_format not in ("csv", "jsonl"):
+                    raise ValueError("Для пакетного ROI формат выхода: csv или jsonl")
+                processed, skipped = _batch_roi(rows, ResultWriter(out, out_format), out_format,
+                                                args.chunk_size, out)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Ошибка! {e}", file=sys.stderr)
+        return 2
+    
+    print(f"[OK] Обработано строк: {processed:,}", file=sys.stderr)
+    if skipped:
+        print(f"⚠️  Пропущено некорректных строк: {skipped:,}", file=sys.stderr)
+    return 0
+
+
 # =================== ПРИМЕР ИСПОЛЬЗОВАНИЯ ===================
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    
     print("="*70)
     print("🚀 ROI КАЛЬКУЛЯТОР ДЛЯ МЕНЕДЖЕРА ПО РАБОТЕ С КЛИЕНТАМИ")
     print("="*70)
@@ -232,7 +1022,8 @@ if __name__ == "__main__":
     
     # Интерактивный режим
     print("\n" + "="*70)
-    use_interactive = input("✨ Хотите рассчитать ROI для своих данных? (да/нет): ").lower()
+    # Без терминала (cron, конвейер) демонстрация не ждет ввода
+    use_interactive = input("✨ Хотите рассчитать ROI для своих данных? (да/нет): ").lower() if sys.stdin.isatty() else ""
     
     if use_interactive in ['да', 'yes', 'y', 'д']:
         interactive_roi_calculator()
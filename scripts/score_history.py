@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+История health score по дням в компактном колоночном формате.
+
+Каждый день добавляется блок строк (клиент, итоговый балл и баллы по
+компонентам activity/usage/payment/nps). Колонки хранятся в отдельных
+бинарных файлах (целые числа в десятых долях балла) и читаются через
+mmap, поэтому выборки вроде "изменение балла за 30 дней по всем клиентам"
+не требуют загрузки всей истории в словари Python.
+
+Структура каталога истории:
+    clients.txt       — ключи клиентов (номер строки = индекс клиента)
+    days.csv          — блоки по дням: дата (ordinal), первая строка, число строк
+    client.u32        — индекс клиента для каждой строки
+    score.i16, activity.i16, usage.i16, payment.i16, nps.i16 — баллы * 10
+
+Пример запуска:
+    python score_history.py history/ record clients.csv --date 2026-10-18
+    python score_history.py history/ delta --days 30 --top 20
+"""
+
+import argparse
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_right
+from datetime import date, timedelta
+
+from cs_score_calculator import (
+    DEFAULT_MODEL,
+    detect_format,
+    iter_chunks,
+    normalize_client,
+    open_text,
+    read_clients,
+)
+
+try:
+    import numpy as np
+except ImportError:  # Без NumPy выборки считаются на array/memoryview
+    np = None
+
+SCORE_COLUMNS = ("score", "activity", "usage", "payment", "nps")
+
+# Баллы хранятся в десятых долях в int16 — значения за пределами диапазона обрезаются
+_I16_MIN, _I16_MAX = -32768, 32767
+
+
+def _tenths(value):
+    return max(_I16_MIN, min(_I16_MAX, round(value * 10)))
+
+
+class ScoreHistory:
+    """
+    Колоночное хранилище ежедневных health score.
+
+    Дни добавляются строго по возрастанию даты; каждый день — один
+    непрерывный блок строк, поэтому выборка по дате — это срез колонок.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._keys = []
+        self._key_index = {}
+        keys_path = self._path("clients.txt")
+        if os.path.exists(keys_path):
+            with open(keys_path, encoding="utf-8") as f:
+                for line in f:
+                    self._register_key(line.rstrip("\n"))
+        self._days = []   # [(ordinal, start, count)] по возрастанию даты
+        days_path = self._path("days.csv")
+        if os.path.exists(days_path):
+            with open(days_path, encoding="utf-8") as f:
+                for line in f:
+                    ordinal, start, count = map(int, line.split(","))
+                    self._days.append((ordinal, start, count))
+        self._maps = {}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _register_key(self, key):
+        self._key_index[key] = len(self._keys)
+        self._keys.append(key)
+
+    @property
+    def rows(self):
+        """Всего строк в истории."""
+        return self._days[-1][1] + self._days[-1][2] if self._days else 0
+
+    def days(self):
+        """Даты, за которые есть снимки."""
+        return [date.fromordinal(ordinal) for ordinal, _, _ in self._days]
+
+    def client_key(self, index):
+        return self._keys[index]
+
+    # ---------- Запись ----------
+
+    def append_day(self, day, records):
+        """
+        Добавляет снимок за день.
+
+        Аргументы:
+            day (date): Дата снимка (позже всех уже записанных).
+            records (iterable): Кортежи (key, score, activity, usage, payment, nps).
+
+        Возвращает:
+            int: Число записанных строк.
+        """
+        ordinal = day.toordinal()
+        if self._days and ordinal <= self._days[-1][0]:
+            raise ValueError(f"Снимок за {day} не новее последнего ({self.days()[-1]})")
+
+        new_keys = []
+        client_col = array("I")
+        columns = {name: array("h") for name in SCORE_COLUMNS}
+        column_list = [columns[name] for name in SCORE_COLUMNS]
+        for key, *values in records:
+            key = str(key)
+            index = self._key_index.get(key)
+            if index is None:
+                self._register_key(key)
+                index = len(self._keys) - 1
+                new_keys.append(key)
+            client_col.append(index)
+            for column, value in zip(column_list, values):
+                column.append(_tenths(value))
+
+        self._close_maps()
+        self._truncate_to_index()
+        with open(self._path("client.u32"), "ab") as f:
+            client_col.tofile(f)
+        for name, column in columns.items():
+            with open(self._path(f"{name}.i16"), "ab") as f:
+                column.tofile(f)
+        if new_keys:
+            with open(self._path("clients.txt"), "a", encoding="utf-8") as f:
+                f.write("".join(key + "\n" for key in new_keys))
+        # Индекс дней пишется последним: незавершенная запись не попадет в выборки
+        entry = (ordinal, self.rows, len(client_col))
+        with open(self._path("days.csv"), "a", encoding="utf-8") as f:
+            f.write(",".join(map(str, entry)) + "\n")
+        self._days.append(entry)
+        return len(client_col)
+
+    def _truncate_to_index(self):
+        """Отбрасывает хвосты колонок от прерванной записи (не попавшие в days.csv)."""
+        files = [("client.u32", 4)] + [(f"{name}.i16", 2) for name in SCORE_COLUMNS]
+        for filename, itemsize in files:
+            path = self._path(filename)
+            if os.path.exists(path) and os.path.getsize(path) > self.rows * itemsize:
+                os.truncate(path, self.rows * itemsize)
+
+    def record_clients(self, day, clients, key_field="id", model=None, chunk_size=10000):
+        """Считает баллы по компонентам для клиентов и записывает снимок за день."""
+        model = model or DEFAULT_MODEL
+        components, total = model.components, model.total
+
+        def records():
+            for chunk in iter_chunks(clients, chunk_size):
+                for client in chunk:
+                    key = client.get(key_field)
+                    if key is None or normalize_client(client) is None:
+                        continue
+                    inputs = (client["logins"], client["features"], client["days_payment"], client.get("nps"))
+                    # Итог — тем же расчетом модели, что и в cs_score_calculator (округление до 0.1)
+                    yield (key, round(total(*inputs), 1), *components(*inputs))
+
+        return self.append_day(day, records())
+
+    # ---------- Чтение ----------
+
+    def _close_maps(self):
+        for view, mapped in self._maps.values():
+            try:
+                view.release()
+                mapped.close()
+            except BufferError:
+                pass  # на срезы еще есть ссылки — отображение закроется сборщиком мусора
+        self._maps.clear()
+
+    def close(self):
+        self._close_maps()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def column(self, name):
+        """Колонка целиком как memoryview поверх mmap (client — индексы, остальные — баллы * 10)."""
+        if name not in self._maps:
+            filename, fmt = ("client.u32", "I") if name == "client" else (f"{name}.i16", "h")
+            path = self._path(filename)
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                return memoryview(array(fmt))
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[name] = (memoryview(mapped).cast(fmt), mapped)
+        return self._maps[name][0][:self.rows]
+
+    def _block(self, day):
+        """Блок строк последнего снимка на дату day или раньше: (дата, start, count) или None."""
+        position = bisect_right(self._days, (day.toordinal(), float("inf"), 0)) - 1
+        return self._days[position] if position >= 0 else None
+
+    def snapshot(self, day, column="score"):
+        """
+        Снимок на дату (последний не позже day).
+
+        Возвращает:
+            tuple: (дата снимка, индексы клиентов, значения * 10) — срезы memoryview.
+        """
+        block = self._block(day)
+        if block is None:
+            raise LookupError(f"Нет снимков на {day} или раньше")
+        ordinal, start, count = block
+        return (date.fromordinal(ordinal), self.column("client")[start:start + count],
+                self.column(column)[start:start + count])
+
+    def score_deltas(self, day, days_back=30, column="score"):
+        """
+        Изменение балла каждого клиента между снимками на day и на day - days_back.
+
+        Учитываются клиенты, присутствующие в обоих снимках.
+
+        Возвращает:
+            tuple: (индексы клиентов, изменения в баллах) — массивы NumPy
+            или array (без NumPy). Ключ клиента — client_key(индекс).
+        """
+        _, new_clients, new_values = self.snapshot(day, column)
+        _, old_clients, old_values = self.snapshot(day - timedelta(days=days_back), column)
+        size = len(self._keys)
+
+        if np is not None:
+            old = np.full(size, np.iinfo(np.int32).min, dtype=np.int32)
+            old[np.frombuffer(old_clients, dtype=np.uint32)] = np.frombuffer(old_values, dtype=np.int16)
+            new_idx = np.frombuffer(new_clients, dtype=np.uint32)
+            before = old[new_idx]
+            present = before != np.iinfo(np.int32).min
+            deltas = (np.frombuffer(new_values, dtype=np.int16)[present] - before[present]) / 10
+            return new_idx[present], deltas
+
+        missing = _I16_MIN - 1
+        old = array("i", [missing]) * size
+        for index, value in zip(old_clients, old_values):
+            old[index] = value
+        indices, deltas = array("I"), array("d")
+        for index, value in zip(new_clients, new_values):
+            before = old[index]
+            if before != missing:
+                indices.append(index)
+                deltas.append((value - before) / 10)
+        return indices, deltas
+
+    def client_series(self, key, column="score"):
+        """Динамика балла одного клиента: список (дата, балл)."""
+        index = self._key_index.get(str(key))
+        if index is None:
+            return []
+        clients, values = self.column("client"), self.column(column)
+        series = []
+        for ordinal, start, count in self._days:
+            block = clients[start:start + count]
+            if np is not None:
+                hits = np.flatnonzero(np.frombuffer(block, dtype=np.uint32) == index)
+                position = int(hits[0]) if len(hits) else -1
+            else:
+                block = block.tolist()
+                position = block.index(index) if index in block else -1
+            if position >= 0:
+                series.append((date.fromordinal(ordinal), values[start + position] / 10))
+        return series
+
+
+def main(argv=None):
+    """Запись снимков и выборка изменений балла."""
+    parser = argparse.ArgumentParser(description="История health score в колоночном формате.")
+    parser.add_argument("history", help="Каталог истории")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Записать снимок за день по выгрузке клиентов")
+    record.add_argument("input", help="Файл выгрузки (CSV, JSONL, можно .gz) или '-' для stdin")
+    record.add_argument("--date", type=date.fromisoformat, default=date.today(),
+                        help="Дата снимка YYYY-MM-DD (по умолчанию сегодня)")
+    record.add_argument("--format", choices=["csv", "jsonl"], help="Формат входа")
+    record.add_argument("--key", default="id", help="Поле с ключом клиента (по умолчанию id)")
+
+    delta = commands.add_parser("delta", help="Изменение балла за период по всем клиентам")
+    delta.add_argument("--date", type=date.fromisoformat, help="Конечная дата (по умолчанию последний снимок)")
+    delta.add_argument("--days", type=int, default=30, help="Длина периода в днях (по умолчанию 30)")
+    delta.add_argument("--top", type=int, default=20, help="Сколько клиентов с наибольшим падением показать")
+
+    args = parser.parse_args(argv)
+    with ScoreHistory(args.history) as history:
+        try:
+            if args.command == "record":
+                in_format = args.format or ("jsonl" if args.input == "-" else detect_format(args.input))
+                with open_text(args.input, "r") as source:
+                    written = history.record_clients(args.date, read_clients(source, in_format), args.key)
+                print(f"[OK] Снимок за {args.date:%d.%m.%Y}: {written:,} клиентов "
+                      f"(всего строк в истории: {history.rows:,})")
+                return 0
+
+            if not history.days():
+                print("❌ История пуста", file=sys.stderr)
+                return 1
+            end = args.date or history.days()[-1]
+            indices, deltas = history.score_deltas(end, args.days)
+            if np is not None:
+                order = np.argsort(deltas, kind="stable")[:args.top]
+            else:
+                order = sorted(range(len(deltas)), key=deltas.__getitem__)[:args.top]
+            print(f"📉 Изменение health score за {args.days} дн. (до {end:%d.%m.%Y}), "
+                  f"клиентов: {len(deltas):,}")
+            for i in order:
+                print(f"   {history.client_key(int(indices[i]))}: {float(deltas[i]):+.1f}")
+        except (LookupError, ValueError) as e:
+            print(f"❌ Ошибка! {e}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
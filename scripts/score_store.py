@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Хранилище health score с инкрементальным пересчетом.
+
+Для каждого клиента в SQLite сохраняются "отпечаток" входных данных
+(логины, функции, дни с оплаты, NPS), балл и статус. При повторном запуске
+пересчитываются только клиенты, у которых изменились данные, а сводная
+статистика портфеля обновляется на разницу, а не строится заново.
+
+Пример запуска:
+    python score_store.py scores.db clients.csv --key id --prune
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from cs_score_calculator import (
+    DEFAULT_MODEL,
+    INPUT_FIELDS,
+    PortfolioAggregator,
+    ScoringModel,
+    detect_format,
+    iter_chunks,
+    normalize_client,
+    open_text,
+    print_portfolio_summary,
+    read_clients,
+    score_chunk,
+)
+
+# Ограничение SQLite на число параметров в одном запросе (с запасом)
+_QUERY_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    client_key  TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    score       REAL NOT NULL,
+    status      TEXT NOT NULL,
+    segment     TEXT,
+    updated_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aggregates (
+    id    INTEGER PRIMARY KEY CHECK (id = 1),
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def input_fingerprint(client):
+    """Компактный отпечаток входных метрик клиента (после normalize_client)."""
+    return "|".join("" if client[field] is None else repr(client[field]) for field in INPUT_FIELDS)
+
+
+class ScoreStore:
+    """
+    Персистентное хранилище баллов клиентов на SQLite.
+
+    Использование:
+        with ScoreStore("scores.db", segment_field="type") as store:
+            report = store.recompute(read_clients(f, "csv"), key_field="id")
+            print_portfolio_summary(store.stats)
+    """
+
+    def __init__(self, path, segment_field=None, model=None):
+        self.path = path
+        self.model = model or DEFAULT_MODEL
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        # Баллы, посчитанные другой моделью, нельзя обновлять инкрементально
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'model'").fetchone()
+        if row and row[0] != self.model.signature:
+            self.conn.close()
+            raise ValueError("Хранилище заполнено по другой модели расчета. Используйте новый файл хранилища.")
+        row = self.conn.execute("SELECT state FROM aggregates WHERE id = 1").fetchone()
+        if row:
+            self.stats = PortfolioAggregator.from_dict(json.loads(row[0]))
+            if segment_field and self.stats.segment_field != segment_field:
+                self.conn.close()
+                raise ValueError(
+                    f"Хранилище построено с разбивкой по '{self.stats.segment_field}', "
+                    f"а запрошена '{segment_field}'. Используйте новый файл хранилища."
+                )
+        else:
+            self.stats = PortfolioAggregator(segment_field)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, client_key):
+        """Сохраненный результат клиента: dict(score, status, segment) или None."""
+        row = self.conn.execute(
+            "SELECT score, status, segment FROM scores WHERE client_key = ?", (str(client_key),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"score": row[0], "status": row[1], "segment": row[2]}
+
+    def _load_existing(self, keys):
+        """Сохраненные отпечатки и результаты для набора ключей."""
+        existing = {}
+        for i in range(0, len(keys), _QUERY_BATCH):
+            part = keys[i:i + _QUERY_BATCH]
+            placeholders = ",".join("?" * len(part))
+            for key, fingerprint, score, status, segment in self.conn.execute(
+                f"SELECT client_key, fingerprint, score, status, segment FROM scores "
+                f"WHERE client_key IN ({placeholders})", part
+            ):
+                existing[key] = (fingerprint, score, status, segment)
+        return existing
+
+    def recompute(self, clients, key_field="id", chunk_size=10000, prune=False):
+        """
+        Пересчитывает баллы только для новых и изменившихся клиентов.
+
+        Аргументы:
+            clients (iterable): Клиенты (словари) — читаются потоково.
+            key_field (str): Поле с уникальным ключом клиента.
+            chunk_size (int): Размер пачки для пакетного расчета.
+            prune (bool): Удалить клиентов, которых нет во входных данных
+                (если на вход подается полный снимок портфеля).
+
+        Возвращает:
+            dict: Количество новых, измененных, неизменных, удаленных
+            и пропущенных (некорректных) клиентов.
+        """
+        segment_field = self.stats.segment_field
+        report = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0, "skipped": 0}
+        now = datetime.now().isoformat(timespec="seconds")
+
+        with self.conn:  # одна транзакция: баллы и агрегаты меняются атомарно
+            if prune:
+                self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (client_key TEXT PRIMARY KEY)")
+                self.conn.execute("DELETE FROM seen")
+
+            for chunk in iter_chunks(clients, chunk_size):
+                rows = {}
+                for client in chunk:
+                    key = client.get(key_field)
+                    if key is None or normalize_client(client) is None:
+                        report["skipped"] += 1
+                        continue
+                    rows[str(key)] = client  # при дублях ключа побеждает последняя строка
+
+                keys = list(rows)
+                if prune:
+                    self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((k,) for k in keys))
+
+                existing = self._load_existing(keys)
+                changed = []
+                for key, client in rows.items():
+                    fingerprint = input_fingerprint(client)
+                    segment = client.get(segment_field) if segment_field else None
+                    if segment is not None:
+                        segment = str(segment)  # сегменты хранятся строками (как и в агрегатах)
+                    old = existing.get(key)
+                    # Смена одного сегмента тоже перезаписывает клиента: иначе агрегаты по сегментам устареют
+                    if old is not None and old[0] == fingerprint and old[3] == segment:
+                        report["unchanged"] += 1
+                        continue
+                    client["_key"], client["_fingerprint"], client["_segment"] = key, fingerprint, segment
+                    changed.append(client)
+                if not changed:
+                    continue
+
+                # Пакетный расчет только для изменившихся клиентов
+                score_chunk(changed, self.model)
+                updates = []
+                for client in changed:
+                    key, segment = client["_key"], client["_segment"]
+                    old = existing.get(key)
+                    if old is None:
+                        report["added"] += 1
+                    else:
+                        report["changed"] += 1
+                        self.stats.remove(old[1], old[2], old[3])
+                    self.stats.add(client["score"], client["status"], segment)
+                    updates.append((key, client["_fingerprint"], client["score"], client["status"],
+                                    segment, now))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?)", updates
+                )
+
+            if prune:
+                gone = self.conn.execute(
+                    "SELECT client_key, score, status, segment FROM scores "
+                    "WHERE client_key NOT IN (SELECT client_key FROM seen)"
+                ).fetchall()
+                for _, score, status, segment in gone:
+                    self.stats.remove(score, status, segment)
+                self.conn.execute("DELETE FROM scores WHERE client_key NOT IN (SELECT client_key FROM seen)")
+                report["removed"] = len(gone)
+
+            self.conn.execute(
+                "INSERT OR REPLACE INTO aggregates VALUES (1, ?)",
+                (json.dumps(self.stats.to_dict(), ensure_ascii=False),)
+            )
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('model', ?)", (self.model.signature,))
+        return report
+
+
+def main(argv=None):
+    """Инкрементальный пересчет по выгрузке клиентов."""
+    parser = argparse.ArgumentParser(description="Инкрементальный пересчет Customer Health Score.")
+    parser.add_argument("store", help="Файл хранилища SQLite (создается при первом запуске)")
+    parser.add_argument("input", help="Файл выгрузки (CSV, JSONL, можно .gz) или '-' для stdin")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Формат входа (по умолчанию — по расширению)")
+    parser.add_argument("--key", default="id", help="Поле с ключом клиента (по умолчанию id)")
+    parser.add_argument("--segment-field", help="Поле для разбивки статистики по сегментам")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Размер пачки строк")
+    parser.add_argument("--model", help="JSON-файл с параметрами модели расчета")
+    parser.add_argument("--prune", action="store_true",
+                        help="Удалить клиентов, отсутствующих во входных данных (полный снимок)")
+    args = parser.parse_args(argv)
+
+    in_format = args.format or ("jsonl" if args.input == "-" else detect_format(args.input))
+    started = time.perf_counter()
+    try:
+        model = ScoringModel.from_file(args.model) if args.model else None
+        with ScoreStore(args.store, args.segment_field, model) as store, open_text(args.input, "r") as source:
+            report = store.recompute(read_clients(source, in_format), args.key, args.chunk_size, args.prune)
+            print_portfolio_summary(store.stats)
+    except (OSError, ValueError, sqlite3.DatabaseError) as e:
+        print(f"❌ Ошибка! {e}", file=sys.stderr)
+        return 2
+    elapsed = time.perf_counter() - started
+
+    print(f"🔄 Новых: {report['added']:,} | Изменилось: {report['changed']:,} | "
+          f"Без изменений: {report['unchanged']:,} | Удалено: {report['removed']:,}")
+    if report["skipped"]:
+        print(f"⚠️  Пропущено некорректных строк: {report['skipped']:,}")
+    print(f"⏱️  Время пересчета: {elapsed:.2f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
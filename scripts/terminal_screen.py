@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Экранная модель для текстовых интерфейсов без мерцания.
+
+Screen помнит, какие строки сейчас выведены в терминале, и при следующей
+отрисовке перезаписывает только изменившиеся строки (ANSI-позиционирование
+курсора), а хвост старого кадра стирает. Вся отрисовка собирается в одну
+запись в поток — по медленному SSH уходит минимум байт, без вызова clear.
+
+Если вывод идет не в терминал (файл, pipe), кадр просто печатается целиком.
+
+Пример:
+    screen = Screen()
+    screen.render(["Заголовок", "-" * 20, "Строка 1"])
+    screen.render(["Заголовок", "-" * 20, "Строка 2"])   # уйдет только третья строка
+"""
+
+import shutil
+import sys
+
+ESC = "\x1b["
+HIDE_CURSOR = ESC + "?25l"
+SHOW_CURSOR = ESC + "?25h"
+CLEAR_SCREEN = ESC + "H" + ESC + "2J"
+CLEAR_LINE_TAIL = ESC + "K"
+CLEAR_BELOW = ESC + "J"
+
+
+def move_to(row, column=1):
+    """ANSI-команда перевода курсора (нумерация строк и колонок с 1)."""
+    return f"{ESC}{row};{column}H"
+
+
+def terminal_size(default=(80, 24)):
+    """Размер терминала (колонки, строки)."""
+    size = shutil.get_terminal_size(default)
+    return size.columns, size.lines
+
+
+class Screen:
+    """
+    Модель экрана: последний выведенный кадр и его построчная перерисовка.
+
+    render(lines) — вывести кадр (список строк), меняя только отличающиеся строки;
+    invalidate() — забыть кадр (после произвольного вывода поверх экрана),
+    следующий render перерисует экран целиком.
+    reserve — строк под кадром, которые займет вызывающий код (строка ввода):
+    кадр с ними не должен прокручивать терминал.
+    """
+
+    def __init__(self, stream=None, ansi=None, reserve=1):
+        self.stream = stream if stream is not None else sys.stdout
+        self.reserve = reserve
+        if ansi is None:
+            isatty = getattr(self.stream, "isatty", None)
+            ansi = bool(isatty and isatty())
+        self.ansi = ansi
+        self._lines = None   # выведенный кадр; None — экран в неизвестном состоянии
+        self.columns, self.rows = terminal_size()
+
+    def invalidate(self):
+        self._lines = None
+
+    def resize(self):
+        """Перечитывает размер терминала; при изменении следующий кадр рисуется целиком."""
+        size = terminal_size()
+        if size != (self.columns, self.rows):
+            self.columns, self.rows = size
+            self.invalidate()
+        return size
+
+    def _fit(self, lines):
+        # Строки длиннее ширины терминала перенеслись бы и сдвинули координаты кадра
+        width = self.columns
+        return [line if len(line) < width else line[:width - 1] for line in lines]
+
+    def render(self, lines):
+        """Выводит кадр и оставляет курсор на строке сразу под ним. Возвращает число перерисованных строк."""
+        if not self.ansi:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+            return len(lines)
+
+        self.resize()
+        lines = self._fit(lines)
+        previous = self._lines
+        # Кадр выше экрана прокрутит терминал — экранные координаты строк станут неверными
+        limit = self.rows - self.reserve
+        if previous is None or len(lines) >= limit or len(previous) >= limit:
+            out = [HIDE_CURSOR, CLEAR_SCREEN, "\n".join(lines), "\n"]
+            changed = len(lines)
+        else:
+            out = [HIDE_CURSOR]
+            changed = 0
+            for row, line in enumerate(lines):
+                if row < len(previous) and previous[row] == line:
+                    continue
+                out.append(move_to(row + 1) + line + CLEAR_LINE_TAIL)
+                changed += 1
+            # Курсор под кадр; все ниже (старый хвост, введенный ответ) стирается
+            out.append(move_to(len(lines) + 1) + CLEAR_BELOW)
+        out.append(SHOW_CURSOR)
+        self.stream.write("".join(out))
+        self.stream.flush()
+        self._lines = lines
+        return changed
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Рейтинг upsell-возможностей по всему портфелю.
+
+Для каждого клиента из выгрузки (текущий тариф и стоимость часа сотрудника)
+считается ROI текущего тарифа и всех более дорогих тарифов каталога тем же
+расчетом, что и в create_roi_presentation, и формируется общий рейтинг
+переходов по дополнительной годовой выгоде (additional_yearly_gain).
+Клиенты читаются пачками, в памяти держится только топ рейтинга.
+
+Каталог тарифов — JSON в формате example_plans из roi_calculator.py:
+    {"Базовый": {"cost": 5000, "time_saved": 20, "revenue_impact": 10000}, ...}
+или список тарифов с полем "name".
+
+Пример запуска:
+    python upsell_ranking.py clients.csv --plans plans.json --top 500 -o upsell.csv
+"""
+
+import argparse
+import csv
+import heapq
+import math
+import sys
+import time
+from itertools import count
+
+from cs_score_calculator import ResultWriter, detect_format, iter_chunks, open_text, read_clients
+from roi_calculator import calculate_roi_batch, load_plan_catalog
+
+# Поля строки рейтинга (в порядке колонок CSV)
+RANKING_FIELDS = (
+    "rank", "id", "name", "hour_rate", "current_plan", "new_plan",
+    "additional_yearly_gain", "additional_monthly_cost", "payback_years", "gain_per_ruble",
+)
+
+
+class UpsellRanking:
+    """
+    Потоковый расчет рейтинга апгрейдов.
+
+    Использование:
+        ranking = UpsellRanking(load_plan_catalog("plans.json"), top_n=500)
+        ranking.consume(read_clients(f, "csv"))
+        for row in ranking.items(): ...
+    """
+
+    def __init__(self, catalog, top_n=1000, key_field="id", plan_field="plan", rate_field="hour_rate"):
+        self.catalog = catalog
+        self.top_n = top_n
+        self.key_field = key_field
+        self.plan_field = plan_field
+        self.rate_field = rate_field
+        self._plans = list(catalog.values())
+        self._plan_index = {plan["name"]: i for i, plan in enumerate(self._plans)}
+        # Для каждого тарифа — более дорогие тарифы (кандидаты на апгрейд)
+        self._upgrades = [
+            [j for j, other in enumerate(self._plans) if other["cost"] > plan["cost"]]
+            for plan in self._plans
+        ]
+        self._heap = []   # (gain, порядковый номер, клиент, i тарифа, j тарифа) — минимум в корне
+        self._counter = count()
+        self.clients = 0
+        self.opportunities = 0
+        self.skipped = 0
+
+    def _parse_chunk(self, chunk):
+        """Отбирает клиентов с известным тарифом и корректной ставкой часа."""
+        clients, rates, current = [], [], []
+        for client in chunk:
+            plan = self._plan_index.get(client.get(self.plan_field))
+            try:
+                rate = float(client.get(self.rate_field))
+            except (TypeError, ValueError):
+                rate = None
+            if plan is None or rate is None or not math.isfinite(rate) or rate < 0:
+                self.skipped += 1
+                continue
+            clients.append(client)
+            rates.append(rate)
+            current.append(plan)
+        return clients, rates, current
+
+    def add_chunk(self, chunk):
+        """Обрабатывает пачку клиентов (словарей)."""
+        clients, rates, current = self._parse_chunk(chunk)
+        if not clients:
+            return
+        self.clients += len(clients)
+
+        # Годовая чистая выгода каждого тарифа для всех клиентов пачки — тем же расчетом,
+        # что и в create_roi_presentation (с тем же округлением)
+        gains = []
+        for plan in self._plans:
+            column = calculate_roi_batch(plan["cost"], plan["time_saved"], rates,
+                                         plan["revenue_impact"])["годовая_чистая_выгода"]
+            gains.append(column.tolist() if hasattr(column, "tolist") else column)
+
+        heap, top_n = self._heap, self.top_n
+        for position, (client, i) in enumerate(zip(clients, current)):
+            base = gains[i][position]
+            for j in self._upgrades[i]:
+                gain = gains[j][position] - base
+                if gain <= 0:
+                    continue
+                self.opportunities += 1
+                if len(heap) < top_n:
+                    heapq.heappush(heap, (gain, next(self._counter), client, i, j))
+                elif gain > heap[0][0]:
+                    heapq.heapreplace(heap, (gain, next(self._counter), client, i, j))
+
+    def consume(self, clients, chunk_size=10000):
+        for chunk in iter_chunks(clients, chunk_size):
+            self.add_chunk(chunk)
+
+    def items(self):
+        """Рейтинг по убыванию дополнительной годовой выгоды: список словарей RANKING_FIELDS."""
+        ranked = sorted(self._heap, key=lambda item: (-item[0], item[1]))
+        rows = []
+        for rank, (gain, _, client, i, j) in enumerate(ranked, 1):
+            current, new = self._plans[i], self._plans[j]
+            additional_monthly_cost = new["cost"] - current["cost"]
+            rows.append({
+                "rank": rank,
+                "id": client.get(self.key_field),
+                "name": client.get("name"),
+                "hour_rate": float(client[self.rate_field]),
+                "current_plan": current["name"],
+                "new_plan": new["name"],
+                "additional_yearly_gain": round(gain, 2),
+                "additional_monthly_cost": additional_monthly_cost,
+                "payback_years": round(additional_monthly_cost * 12 / gain, 2),
+                "gain_per_ruble": round(gain / (additional_monthly_cost * 12), 2),
+            })
+        return rows
+
+
+def main(argv=None):
+    """Рейтинг upsell-возможностей по файлу выгрузки."""
+    parser = argparse.ArgumentParser(description="Рейтинг upsell-возможностей по ROI.")
+    parser.add_argument("input", help="Выгрузка клиентов (CSV/JSONL, можно .gz) или '-' для stdin")
+    parser.add_argument("--plans", required=True, help="JSON-файл с каталогом тарифов")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Формат входа (по умолчанию — по расширению)")
+    parser.add_argument("-o", "--output", help="Файл для рейтинга (CSV/JSONL); без него — вывод на экран")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"], help="Формат рейтинга")
+    parser.add_argument("--top", type=int, default=1000, help="Размер рейтинга (по умолчанию 1000)")
+    parser.add_argument("--key", default="id", help="Поле с ключом клиента (по умолчанию id)")
+    parser.add_argument("--plan-field", default="plan", help="Поле с текущим тарифом (по умолчанию plan)")
+    parser.add_argument("--rate-field", default="hour_rate",
+                        help="Поле со стоимостью часа сотрудника (по умолчанию hour_rate)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Размер пачки строк")
+    args = parser.parse_args(argv)
+
+    try:
+        catalog = load_plan_catalog(args.plans)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Ошибка! Каталог тарифов: {e}", file=sys.stderr)
+        return 2
+
+    in_format = args.format or ("jsonl" if args.input == "-" else detect_format(args.input))
+    started = time.perf_counter()
+    ranking = UpsellRanking(catalog, args.top, args.key, args.plan_field, args.rate_field)
+    with open_text(args.input, "r") as source:
+        ranking.consume(read_clients(source, in_format), args.chunk_size)
+    rows = ranking.items()
+    elapsed = time.perf_counter() - started
+
+    if args.output:
+        out_format = args.output_format or detect_format(args.output)
+        with open_text(args.output, "w") as out:
+            if rows:
+                ResultWriter(out, out_format).write_rows(rows)
+            elif out_format == "csv":
+                csv.writer(out).writerow(RANKING_FIELDS)   # пустой рейтинг — только заголовок
+    else:
+        print(f"🚀 ТОП-{len(rows)} UPSELL-ВОЗМОЖНОСТЕЙ ПО ДОПОЛНИТЕЛЬНОЙ ГОДОВОЙ ВЫГОДЕ:")
+        for row in rows:
+            print(f"   {row['rank']}. {row['name'] or row['id']}: {row['current_plan']} → {row['new_plan']}, "
+                  f"{row['additional_yearly_gain']:+,.0f} руб./год "
+                  f"(окупаемость {row['payback_years']:.1f} лет)")
+
+    print(f"\n📊 Клиентов: {ranking.clients:,} | Выгодных апгрейдов: {ranking.opportunities:,} | "
+          f"⏱️ {elapsed:.2f} с")
+    if ranking.skipped:
+        print(f"⚠️  Пропущено строк без тарифа или ставки: {ranking.skipped:,}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
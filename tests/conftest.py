@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Скрипты импортируют друг друга как модули верхнего уровня (запуск из scripts/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
@@ -0,0 +1,10 @@
+import benchmark
+
+
+def test_portfolio_file_is_not_written_when_file_cases_are_skipped(monkeypatch, capsys):
+    written = []
+    monkeypatch.setattr(benchmark, "write_portfolio_csv", lambda path, n: written.append(n))
+    results = benchmark.run_benchmarks([2 * 10**6], ["stream_file", "parallel_file"])
+    assert results == []
+    assert written == []
+    assert capsys.readouterr().out.count("пропущен") == 2
@@ -0,0 +1,59 @@
+import csv
+
+from client_export import export_csv
+from client_store import ClientFilter, open_store
+
+
+def _exported_ids(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return [row["ID"] for row in csv.DictReader(f)]
+
+
+def test_filtered_csv_export_skips_lines_without_health(tmp_path):
+    source = tmp_path / "clients.csv"
+    source.write_text(
+        "id,name,type,health,mrr\n"
+        "1,A,Biz,50,100\n"
+        "2,B,Biz,,100\n"
+        "3,C,Biz,70,100\n"
+        "4,D,Biz,80,100\n",
+        encoding="utf-8",
+    )
+    out = tmp_path / "out.csv"
+    with open_store(str(source)) as store:
+        exported, _ = export_csv(store.select(ClientFilter(["Biz"])), str(out))
+    assert exported == 3
+    assert _exported_ids(out) == ["1", "3", "4"]
+
+
+def test_filtered_jsonl_export_skips_blank_lines(tmp_path):
+    source = tmp_path / "clients.jsonl"
+    source.write_text(
+        '{"id": 1, "type": "Biz", "health": 50}\n'
+        "\n"
+        '{"id": 2, "type": "Biz"}\n'
+        '{"id": 3, "type": "Biz", "health": 70}\n'
+        '{"id": 4, "type": "Biz", "health": 80}\n',
+        encoding="utf-8",
+    )
+    out = tmp_path / "out.csv"
+    with open_store(str(source)) as store:
+        assert store.skipped == 1
+        exported, _ = export_csv(store.select(ClientFilter(["Biz"])), str(out))
+    assert exported == 3
+    assert _exported_ids(out) == ["1", "3", "4"]
+
+
+def test_jsonl_store_skips_corrupt_lines(tmp_path):
+    source = tmp_path / "clients.jsonl"
+    source.write_text(
+        '{"id": 1, "type": "Biz", "health": 50}\n'
+        '{"id": 2, "type": "Biz", "hea\n'
+        "[2]\n"
+        '{"id": 3, "type": "Biz", "health": 70}\n',
+        encoding="utf-8",
+    )
+    with open_store(str(source)) as store:
+        assert store.skipped == 2
+        assert [client["id"] for client in store] == [1, 3]
+        assert [client["id"] for client in store.select(ClientFilter(["Biz"]))] == [1, 3]
@@ -0,0 +1,67 @@
+import sqlite3
+
+from client_store import ClientFilter, open_store
+from cs_dashboard import Dashboard
+
+
+def _sqlite_store(tmp_path):
+    path = str(tmp_path / "clients.db")
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE clients (id, name, type, health, mrr, risk, status)")
+        conn.executemany("INSERT INTO clients VALUES (?, ?, ?, ?, ?, ?, ?)", [
+            (1, None, None, 45, 100, None, None),
+            (2, "B", "Biz", "n/a", 200, None, None),
+            (3, "C", "", "72.5", "300", None, ""),
+            (4, "D", "Biz", None, 400, None, None),
+        ])
+    conn.close()
+    return open_store(path)
+
+
+def test_sqlite_store_skips_non_numeric_health_and_defaults_empty_cells(tmp_path):
+    with _sqlite_store(tmp_path) as store:
+        clients = list(store)
+        assert [client["id"] for client in clients] == [1, 3]
+        assert store.index_items() == [
+            (1, "1", "—", "At Risk", 45, 100),
+            (3, "C", "—", "Active", 72.5, 300),
+        ]
+        metrics = store.metrics()
+        assert metrics.total_clients == len(store) == len(clients)
+        assert metrics.total_mrr == 400
+        assert [client["id"] for client in store.select(ClientFilter(health_min=50))] == [3]
+
+
+def test_dashboard_starts_on_sqlite_with_text_health(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    dashboard = Dashboard(_sqlite_store(tmp_path))
+    try:
+        assert len(dashboard.risk_index) == 2
+        assert dashboard.metrics["total_clients"] == 2
+    finally:
+        dashboard.store.close()
+
+
+def test_dashboard_recommendations_survive_missing_client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    dashboard = Dashboard(_sqlite_store(tmp_path))
+    try:
+        dashboard.store.delete(1)
+        assert any("ID 1" in line for line in dashboard.recommendation_lines())
+    finally:
+        dashboard.store.close()
+
+
+def test_client_detail_reports_unknown_name(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    dashboard = Dashboard(_sqlite_store(tmp_path))
+    answers = iter(["Нет такого", ""])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    try:
+        dashboard.client_detail()
+    finally:
+        dashboard.store.close()
+    output = capsys.readouterr().out
+    assert "Клиент 'Нет такого' не найден" in output
+    assert "Введите число" not in output
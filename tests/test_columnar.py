@@ -0,0 +1,20 @@
+from client_store import open_store
+from columnar import ColumnarTable, write_columns
+
+
+def test_integer_column_with_missing_values_round_trips_as_int(tmp_path):
+    path = str(tmp_path / "clients.cols")
+    write_columns(path, {"id": [1, 2, 3], "health": [50, 60, 70], "nps": [7, None, -3]})
+    with ColumnarTable(path) as table:
+        assert table.type_of("nps") == "int64"
+        assert [row["nps"] for row in table.rows(0, 3)] == [7, None, -3]
+        assert all(type(row["nps"]) is int for row in table.rows(0, 3) if row["nps"] is not None)
+
+
+def test_store_skips_missing_integer_health(tmp_path):
+    path = str(tmp_path / "clients.cols")
+    write_columns(path, {"id": [1, 2, 3], "health": [50, None, 70], "mrr": [100, None, 5]})
+    with open_store(path) as store:
+        assert [client["id"] for client in store] == [1, 3]
+        assert [item[0] for item in store.index_items()] == [1, 3]
+        assert store.get(1)["mrr"] == 100
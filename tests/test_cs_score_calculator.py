@@ -0,0 +1,43 @@
+import io
+
+import pytest
+
+from cs_score_calculator import PortfolioAggregator, ResultWriter, ScoringModel, read_clients, score_stream
+
+
+def test_corrupt_jsonl_lines_are_skipped_and_counted():
+    stream = io.StringIO(
+        '{"id": 1, "logins": 10, "features": 5, "days_payment": 3}\n'
+        '{"id": 2, "logi\n'
+        "[1, 2]\n"
+        '{"id": 3, "logins": 12, "features": 5, "days_payment": 3}\n'
+    )
+    stats = PortfolioAggregator()
+    processed, skipped = score_stream(read_clients(stream, "jsonl"), stats)
+    assert (processed, skipped) == (2, 2)
+    assert stats.count == 2
+
+
+@pytest.mark.parametrize("config", [
+    {"nps_default": "50"},
+    {"nps_default": True},
+    {"thresholds": {"healthy": "80"}},
+    {"thresholds": {"helthy": 85}},
+    {"thresholds": [80, 60]},
+    {"weights": {"activity": float("nan"), "usage": 0.3, "payment": 0.2, "nps": 0.1}},
+])
+def test_invalid_model_config_raises_value_error(config):
+    with pytest.raises(ValueError):
+        ScoringModel(config)
+
+
+def test_csv_writer_skips_chunks_without_valid_rows():
+    stream = io.StringIO(
+        '{"id": 1, "logi\n'
+        '{"id": 2, "logins": 10, "features": 5, "days_payment": 3}\n'
+    )
+    out = io.StringIO()
+    processed, skipped = score_stream(read_clients(stream, "jsonl"), PortfolioAggregator(),
+                                      ResultWriter(out, "csv"), chunk_size=1)
+    assert (processed, skipped) == (1, 1)
+    assert len(out.getvalue().splitlines()) == 2
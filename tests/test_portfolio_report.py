@@ -0,0 +1,76 @@
+import json
+from datetime import date, datetime, timedelta
+
+from portfolio_report import PortfolioAggregates, ReportEngine, Report, main, render_csv, render_html, render_markdown
+
+ITEMS = [
+    (1, "Альфа", "Enterprise", "Active", 85, 50000),
+    (2, "Бета", "Enterprise", "At Risk", 35, 30000),
+    (3, "Гамма", "SMB", "At Risk", 55, 10000),
+    (4, "Дельта", "SMB", "Active", "n/a", 7000),
+    (5, "Эпсилон", "SMB", "Active", None, 3000),
+]
+
+
+def test_aggregates_skip_clients_without_numeric_health():
+    aggregates = PortfolioAggregates.from_items(ITEMS)
+    assert aggregates.clients == 3
+    assert aggregates.mrr == 90000
+    assert aggregates.at_risk == 2
+    assert aggregates.avg_health == 58.3
+    assert [client[0] for client in aggregates.top_at_risk()] == [2, 3]
+
+
+def test_engine_reuses_aggregates_for_same_key():
+    engine = ReportEngine()
+    calls = []
+
+    def load_items():
+        calls.append(1)
+        return ITEMS
+
+    first = engine.aggregates(load_items, key=1)
+    assert engine.aggregates(load_items, key=1) is first
+    engine.aggregates(load_items, key=2)
+    assert len(calls) == 2
+
+
+def test_weekly_report_shows_changes_against_week_old_snapshot(tmp_path):
+    history = tmp_path / "history.json"
+    week_ago = (date.today() - timedelta(days=8)).isoformat()
+    previous = PortfolioAggregates.from_items(ITEMS[:2]).snapshot()
+    history.write_text(json.dumps({week_ago: previous}), encoding="utf-8")
+
+    files = ReportEngine(str(history)).generate(lambda: ITEMS, ["weekly"], ["md"], str(tmp_path / "report"))
+
+    assert files == [str(tmp_path / "report_weekly.md")]
+    text = (tmp_path / "report_weekly.md").read_text(encoding="utf-8")
+    assert "| Клиентов | 3 | +1 |" in text
+    assert "| MRR | 90,000 руб. | +10,000 |" in text
+    assert date.today().isoformat() in json.loads(history.read_text(encoding="utf-8"))
+
+
+def test_renderers_escape_cells():
+    report = Report("Отчет <тест>", datetime(2026, 10, 12, 9, 30))
+    report.metric("Клиентов", "3", "+1")
+    report.table("Клиенты", ["ID", "Клиент"], [[1, "A|B <b>"]])
+    report.table("Пусто", ["ID"], [])
+
+    markdown = render_markdown(report)
+    assert "| 1 | A\\|B <b> |" in markdown
+    assert "_Нет данных_" in markdown
+
+    page = render_html(report)
+    assert "<h1>Отчет &lt;тест&gt;</h1>" in page
+    assert "<td>A|B &lt;b&gt;</td>" in page
+
+    table = render_csv(report)
+    assert table.startswith("\ufeffОтчет <тест>,Дата: 12.10.2026 09:30")
+    assert "1,A|B <b>" in table
+
+
+def test_main_reports_broken_sqlite_source(tmp_path, capsys):
+    source = tmp_path / "clients.db"
+    source.write_bytes(b"not a database")
+    assert main([str(source), "--history", "", "-o", str(tmp_path / "out")]) == 2
+    assert "Ошибка" in capsys.readouterr().err
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+import roi_calculator
+from roi_calculator import ROI_FIELDS, calculate_roi, main, roi_grid, simulate_roi
+
+PLANS = {
+    "Базовый": {"cost": 5000, "time_saved": 20, "revenue_impact": 10000},
+    "Про": {"cost": 12000, "time_saved": 45, "revenue_impact": 30000},
+}
+
+
+def test_batch_roi_skips_corrupt_jsonl_lines(tmp_path, capsys):
+    source = tmp_path / "rows.jsonl"
+    source.write_text(
+        '{"cost": 5000, "time_saved": 20, "hour_rate": 1000, "revenue_impact": 0}\n'
+        '{"cost": 50\n'
+        '{"cost": 8000, "time_saved": 30, "hour_rate": 900, "revenue_impact": 5000}\n',
+        encoding="utf-8",
+    )
+    out = tmp_path / "out.jsonl"
+    assert main(["batch", str(source), "-o", str(out)]) == 0
+    assert len(out.read_text(encoding="utf-8").splitlines()) == 2
+    assert "Пропущено некорректных строк: 1" in capsys.readouterr().err
+
+
+def test_batch_new_requires_plans(tmp_path):
+    with pytest.raises(SystemExit) as exc:
+        main(["batch", str(tmp_path / "rows.jsonl"), "--new", "Про"])
+    assert exc.value.code == 2
+
+
+def test_batch_compare_rejects_unknown_new_plan(tmp_path):
+    plans = tmp_path / "plans.json"
+    plans.write_text(json.dumps(PLANS, ensure_ascii=False), encoding="utf-8")
+    source = tmp_path / "rows.jsonl"
+    source.write_text('{"name": "A", "hour_rate": 1000, "plan": "Базовый"}\n', encoding="utf-8")
+    assert main(["batch", str(source), "--plans", str(plans), "--new", "Нет такого"]) == 2
+
+
+@pytest.mark.parametrize("use_numpy", [False, None])
+def test_roi_grid_accepts_numpy_scalars(use_numpy):
+    np = pytest.importorskip("numpy")
+    grid = roi_grid(np.int64(5000), np.arange(10, 40, 10), np.float64(1000), np.array(0), use_numpy=use_numpy)
+    expected = roi_grid(5000, [10, 20, 30], 1000, 0, use_numpy=use_numpy)
+    assert len(grid["monthly_cost"]) == 3
+    assert list(grid["roi_в_месяц"]) == list(expected["roi_в_месяц"])
+
+
+@pytest.mark.parametrize("fmt", ["text", "markdown", "html"])
+def test_batch_compare_labels_rows_without_name(tmp_path, capsys, fmt):
+    plans = tmp_path / "plans.json"
+    plans.write_text(json.dumps(PLANS, ensure_ascii=False), encoding="utf-8")
+    source = tmp_path / "rows.jsonl"
+    source.write_text('{"id": 7, "hour_rate": 1000, "plan": "Базовый"}\n', encoding="utf-8")
+    assert main(["batch", str(source), "--plans", str(plans), "--new", "Про", "--output-format", fmt]) == 0
+    assert "7" in capsys.readouterr().out
+
+
+def test_batch_roi_keeps_integer_inputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(roi_calculator, "np", None)
+    source = tmp_path / "rows.csv"
+    source.write_text("cost,time_saved,hour_rate,revenue_impact\n5000,20,1000,0\n", encoding="utf-8")
+    out = tmp_path / "out.jsonl"
+    assert main(["batch", str(source), "-o", str(out)]) == 0
+    row = json.loads(out.read_text(encoding="utf-8"))
+    assert {key: row[key] for key in ROI_FIELDS} == calculate_roi(5000, 20, 1000, 0)
+    assert type(row["месячная_экономия"]) is int
+
+
+def test_simulation_accepts_numpy_scalar_inputs():
+    np = pytest.importorskip("numpy")
+    result = simulate_roi(np.int64(5000), (20, 30, 50), np.float32(1000), np.int64(0), draws=1000, seed=1)
+    assert result["испытаний"] == 1000
+
+
+@pytest.mark.parametrize("spec", [
+    (40, 20),
+    (20, 60, 50),
+    {"dist": "uniform", "low": 40, "high": 20},
+    {"dist": "triangular", "low": 50, "mode": 30, "high": 20},
+    {"dist": "normal", "mean": 30, "std": 5, "min": 40, "max": 20},
+])
+def test_simulation_rejects_inverted_ranges(spec):
+    with pytest.raises(ValueError):
+        simulate_roi(5000, spec, 1000, 0, draws=100, seed=1, use_numpy=False)
@@ -0,0 +1,36 @@
+from score_store import ScoreStore, main
+
+
+def _client(segment):
+    return {"id": "1", "logins": 10, "features": 5, "days_payment": 20, "nps": 8, "plan": segment}
+
+
+def test_segment_only_change_updates_row_and_aggregates(tmp_path):
+    with ScoreStore(str(tmp_path / "scores.db"), segment_field="plan") as store:
+        store.recompute([_client("Basic")])
+        report = store.recompute([_client("Pro")])
+
+        assert report["changed"] == 1
+        assert report["unchanged"] == 0
+        assert store.get("1")["segment"] == "Pro"
+        segments = {name: sub.count for name, sub in store.stats.segments.items() if sub.count}
+        assert segments == {"Pro": 1}
+
+
+def test_unchanged_client_is_not_rewritten(tmp_path):
+    with ScoreStore(str(tmp_path / "scores.db"), segment_field="plan") as store:
+        store.recompute([_client("Basic")])
+        report = store.recompute([_client("Basic")])
+
+        assert report["unchanged"] == 1
+        assert report["changed"] == 0
+
+
+def test_main_reports_broken_store_and_missing_input(tmp_path, capsys):
+    broken = tmp_path / "scores.db"
+    broken.write_bytes(b"not a database" * 100)
+    source = tmp_path / "clients.jsonl"
+    source.write_text('{"id": "1", "logins": 10, "features": 5, "days_payment": 20}\n', encoding="utf-8")
+    assert main([str(broken), str(source)]) == 2
+    assert main([str(tmp_path / "new.db"), str(tmp_path / "missing.jsonl")]) == 2
+    assert capsys.readouterr().err.count("Ошибка") == 2
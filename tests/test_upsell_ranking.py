@@ -0,0 +1,34 @@
+import csv
+import json
+
+from upsell_ranking import RANKING_FIELDS, main
+
+PLANS = {
+    "Базовый": {"cost": 5000, "time_saved": 20, "revenue_impact": 10000},
+    "Про": {"cost": 12000, "time_saved": 45, "revenue_impact": 30000},
+}
+
+
+def _plans(tmp_path):
+    path = tmp_path / "plans.json"
+    path.write_text(json.dumps(PLANS, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def test_empty_ranking_writes_csv_header_only(tmp_path, capsys):
+    source = tmp_path / "clients.jsonl"
+    source.write_text('{"id": 1, "plan": "Про", "hour_rate": 1000}\n', encoding="utf-8")
+    out = tmp_path / "up.csv"
+    assert main([str(source), "--plans", _plans(tmp_path), "-o", str(out)]) == 0
+    with open(out, encoding="utf-8", newline="") as f:
+        assert list(csv.reader(f)) == [list(RANKING_FIELDS)]
+    assert "Выгодных апгрейдов: 0" in capsys.readouterr().out
+
+
+def test_nan_hour_rate_is_skipped(tmp_path, capsys):
+    source = tmp_path / "clients.csv"
+    source.write_text("id,plan,hour_rate\n1,Базовый,nan\n2,Базовый,1000\n", encoding="utf-8")
+    out = tmp_path / "up.jsonl"
+    assert main([str(source), "--plans", _plans(tmp_path), "-o", str(out)]) == 0
+    assert [json.loads(line)["id"] for line in out.read_text(encoding="utf-8").splitlines()] == ["2"]
+    assert "Пропущено строк без тарифа или ставки: 1" in capsys.readouterr().err